@@ -1,7 +1,15 @@
-import importlib.metadata
+from typing import Any
 
 from .api import Coveralls
 
 
-__version__ = importlib.metadata.version('coveralls')
 __all__ = ['Coveralls']
+
+
+def __getattr__(name: str) -> Any:
+    # Resolving the installed version scans the package metadata, which would
+    # otherwise slow down every import of coveralls (and so every command).
+    if name == '__version__':
+        import importlib.metadata  # pylint: disable=import-outside-toplevel
+        return importlib.metadata.version('coveralls')
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
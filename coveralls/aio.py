@@ -0,0 +1,42 @@
+import asyncio
+from typing import Any
+
+import requests
+
+from .configuration import Config
+from .transport import Client
+
+
+class AsyncClient:
+    """
+    An asyncio counterpart of :class:`.transport.Client`.
+
+    Each request is sent by a :class:`.transport.Client` on a worker thread
+    (see :func:`asyncio.to_thread`), so any number of them can be in flight
+    without blocking the event loop. They share its session: its kept-alive
+    connections, its retries and backoff, its proxy and certificate settings
+    and its mapping of failures to exceptions. How many are sent at once is
+    up to the caller, who should bound it (say, with a semaphore).
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self._client = Client(config)
+
+    async def __aenter__(self) -> 'AsyncClient':
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        self._client.close()
+
+    async def post(self, endpoint: str, **kwargs: Any) -> requests.Response:
+        """
+        POST to a coveralls endpoint, retrying transient failures.
+
+        Takes the arguments of :meth:`.transport.Client.post`, and returns or
+        raises as it does.
+        """
+        return await asyncio.to_thread(self._client.post, endpoint, **kwargs)
@@ -2,87 +2,60 @@ import json
 import logging
 import os
 import pathlib
-import re
+import weakref
+from collections.abc import Iterator
 from typing import Any
-
-import coverage
-import requests
-import urllib3.exceptions
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from typing import BinaryIO
+from typing import TextIO
+from typing import TYPE_CHECKING
 
 from .configuration import Config
 from .configuration import resolve
 from .git import git_info
-from .reporter import CoverallReporter
+from .jsonstream import dump
+from .jsonstream import report_writer
+from .merge import expand
+from .merge import read_reports
+from .merge import SourceFiles
+from .vectors import json_default
+from .vectors import listed
+
+# coverage.py and requests are slow to import, and each command needs at most
+# one of them (finish never measures coverage; save never talks to the API),
+# so they are only imported by the methods that use them.
+if TYPE_CHECKING:
+    import coverage
+    import requests
+
+    from .aio import AsyncClient
+    from .reporter import CoverallReporter
+    from .transport import Client
 
 
 log = logging.getLogger('coveralls.api')
 
-# Transient failures worth retrying: server-side 5xx and rate limiting (429).
-RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
-# urllib3's default allowed_methods excludes POST (non-idempotent); every call
-# we make is a POST, so we must opt POST in explicitly or nothing retries.
-RETRY_METHODS = frozenset({'POST'})
-# Exponential backoff with jitter. backoff_factor sets the base delay
-# (0.5, 1, 2, 4, ... seconds), backoff_jitter adds up to this many seconds of
-# randomness to spread out retries, and backoff_max caps any single wait.
-RETRY_BACKOFF_FACTOR = 0.5
-RETRY_BACKOFF_JITTER = 0.5
-RETRY_BACKOFF_MAX = 60
-
-
-def _build_session(retries: int) -> requests.Session:
-    """
-    Build a requests Session that retries transient HTTP failures.
-
-    With ``retries=0`` this is equivalent to a plain ``requests`` call: a
-    single attempt is made and connect/read timeouts surface as before.
-    ``raise_on_status=False`` keeps the final response (even a 5xx) flowing
-    back to the caller so the existing status handling stays in charge.
-    """
-    # urllib3 treats read=0 and read=False differently: read=0 raises
-    # MaxRetryError on a read timeout (which requests remaps to a bare
-    # ConnectionError), while read=False lets the ReadTimeoutError propagate as
-    # a requests Timeout. Mirror requests' own default (Retry(0, read=False))
-    # so the no-retry path still surfaces read timeouts as TimeoutError.
-    read = retries or False
-    retry = Retry(
-        total=retries, connect=retries, read=read, status=retries,
-        other=retries,
-        status_forcelist=RETRY_STATUSES,
-        allowed_methods=RETRY_METHODS,
-        backoff_factor=RETRY_BACKOFF_FACTOR,
-        backoff_jitter=RETRY_BACKOFF_JITTER,
-        backoff_max=RETRY_BACKOFF_MAX,
-        # Ignore Retry-After and always use our own bounded backoff: a server
-        # can send an arbitrarily large Retry-After (e.g. 3600s), and urllib3
-        # only started clamping it -- to 6 hours -- in 2.6.3, so on our
-        # supported range it is otherwise unbounded and could hang CI for
-        # hours. 429/503 are still retried; only the sleep length differs.
-        respect_retry_after_header=False,
-        raise_on_status=False,
-    )
-    adapter = HTTPAdapter(max_retries=retry)
-    session = requests.Session()
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-    return session
 
+def _redacted(data: dict[str, Any]) -> dict[str, Any]:
+    """Shallow copy of a report (or its header) safe to log: no repo token."""
+    if data.get('repo_token'):
+        return data | {'repo_token': '[secure]'}
+    return data
+
+
+def _log_source_file(source_file: dict[str, Any]) -> None:
+    log.debug(
+        '%s - %d/%d', source_file['name'],
+        sum(filter(None, source_file['coverage'])),
+        len(source_file['coverage']),
+    )
 
-def _caused_by_timeout(exc: requests.exceptions.RequestException) -> bool:
-    """
-    Report whether a request failure was ultimately a timeout.
 
-    A single timeout raises a requests ``Timeout`` directly, but a timeout that
-    exhausts its retries surfaces as a ``ConnectionError`` wrapping a urllib3
-    ``MaxRetryError`` whose ``reason`` is a urllib3 ``TimeoutError``; unwrap
-    that so both read the same to the caller.
-    """
-    if isinstance(exc, requests.exceptions.Timeout):
-        return True
-    reason = getattr(exc.args[0] if exc.args else None, 'reason', None)
-    return isinstance(reason, urllib3.exceptions.TimeoutError)
+def _logged(
+        source_files: Iterator[dict[str, Any]],
+) -> Iterator[dict[str, Any]]:
+    for source_file in source_files:
+        _log_source_file(source_file)
+        yield source_file
 
 
 class Coveralls:
@@ -107,6 +80,11 @@ class Coveralls:
           service_name.
         """
         self._data: dict[str, Any] | None = None
+        # Source files from merged reports, combined with our own by name.
+        self._merged = SourceFiles()
+        # The keep-alive HTTP client, created by the first request.
+        self._client: Client | None = None
+        self._aclient: AsyncClient | None = None
 
         self.config: Config = resolve(
             kwargs, token_required=token_required,
@@ -114,45 +92,161 @@ class Coveralls:
 
         self.config.ensure_token()
 
-    def merge(self, path: str) -> None:
-        extra = json.loads(pathlib.Path(path).read_text(encoding='utf-8'))
-        self.create_data(extra)
+    def merge(self, *paths: str) -> None:
+        """
+        Merge the coveralls-style JSON reports at ``paths`` into this one.
+
+        Each path may also be a glob pattern. Reports are parsed on up to
+        ``jobs`` threads, incrementally, and their source files are folded
+        into the merged ones one at a time as they are read, in the order
+        given. Merging thus holds just a few source file entries in memory
+        on top of the merged result, however large the reports are.
+        """
+        count = 0
+        for count, report in enumerate(
+                read_reports(expand(paths), jobs=self.config.jobs), start=1,
+        ):
+            self._merged.extend(report)
+            if not report.has_source_files:
+                self._warn_nothing_merged()
+        log.debug(
+            'Merged %d reports (%d source files)', count, len(self._merged),
+        )
+
+    def _add_merged(self, extra: dict[str, Any]) -> None:
+        if 'source_files' in extra:
+            self._merged.extend(extra['source_files'])
+        else:
+            self._warn_nothing_merged()
+
+    @staticmethod
+    def _warn_nothing_merged() -> None:
+        log.warning(
+            'No data to be merged; does the json file contain '
+            '"source_files" data?',
+        )
 
     def wear(self, dry_run: bool = False) -> dict[str, Any]:
+        if self.config.spool_dir and not dry_run:
+            # Leave the upload to `coveralls drain` (see :mod:`.spool`).
+            # pylint: disable-next=import-outside-toplevel
+            from .spool import spool_report
+            path = spool_report(self)
+            return {'message': f'Spooled report to {path}'}
+
         json_string = self.create_report()
         if dry_run:
             return {}
         return self.submit_report(json_string)
 
-    def _post(self, endpoint: str, **kwargs: Any) -> requests.Response:
+    async def awear(self, dry_run: bool = False) -> dict[str, Any]:
         """
-        POST to a coveralls endpoint, retrying transient failures.
+        The asyncio counterpart of :meth:`wear`.
 
-        A transient failure that exhausts its retries surfaces as a
-        connection/RetryError rather than a plain Timeout, so both are mapped
-        to clear exceptions here (see :func:`_caused_by_timeout`).
+        Only the upload is asynchronous: building (or spooling) the report
+        still measures and reads source files synchronously.
         """
-        verify = not self.config.skip_ssl_verify
-        timeout = self.config.request_timeout
-        # Each command makes a single POST, so there is no pooling benefit from
-        # the session; it exists only to carry the retry adapter. Close it to
-        # release the connection pool and avoid a ResourceWarning.
-        try:
-            with _build_session(self.config.retries) as session:
-                return session.post(
-                    endpoint, verify=verify, timeout=timeout, **kwargs,
-                )
-        except requests.exceptions.RequestException as e:
-            if _caused_by_timeout(e):
-                raise TimeoutError(
-                    f'Request timeout: {endpoint} (timeout={timeout})',
-                ) from e
-            raise RuntimeError(f'Could not submit coverage: {e}') from e
+        if self.config.spool_dir and not dry_run:
+            return self.wear()
+        json_string = self.create_report()
+        if dry_run:
+            return {}
+        return await self.asubmit_report(json_string)
+
+    def __enter__(self) -> 'Coveralls':
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the connections kept open to coveralls.io, if any."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def __aenter__(self) -> 'Coveralls':
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the connections kept open to coveralls.io, async ones too."""
+        self.close()
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+
+    def _post(self, endpoint: str, **kwargs: Any) -> 'requests.Response':
+        """POST to a coveralls endpoint (see :class:`.transport.Client`)."""
+        if self._client is None:
+            # pylint: disable-next=import-outside-toplevel
+            from .transport import Client
+            self._client = Client(self.config)
+            # Release the connections even if close() is never called.
+            weakref.finalize(self, self._client.close)
+        return self._client.post(endpoint, **kwargs)
+
+    async def _apost(
+            self, endpoint: str, **kwargs: Any,
+    ) -> 'requests.Response':
+        """POST to a coveralls endpoint (see :class:`.aio.AsyncClient`)."""
+        if self._aclient is None:
+            # pylint: disable-next=import-outside-toplevel
+            from .aio import AsyncClient
+            self._aclient = AsyncClient(self.config)
+        return await self._aclient.post(endpoint, **kwargs)
+
+    def submit_report(
+            self, report: str | BinaryIO, compress: bool | None = None,
+    ) -> dict[str, Any]:
+        """
+        Submit a job report to coveralls.io.
+
+        ``report`` is either the JSON string or a binary file holding it, such
+        as one written by ``coveralls save``. A file is streamed into the
+        request body as it is sent instead of being read into memory first;
+        a gzipped file is sent as-is. With ``compress`` (defaulting to the
+        ``compress`` setting) the report is gzipped on the way out at the
+        configured ``compress_level``.
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from .upload import json_file_upload
+
+        level = self._compress_level(compress)
+        with json_file_upload(report, level) as upload:
+            response = self._post(self._endpoint('api/v1/jobs'), **upload)
+        return self._job_submitted(response)
+
+    async def asubmit_report(
+            self, report: str | BinaryIO, compress: bool | None = None,
+    ) -> dict[str, Any]:
+        """
+        Submit a job report to coveralls.io without blocking the event loop.
+
+        The asyncio counterpart of :meth:`submit_report` (see
+        :class:`.aio.AsyncClient`).
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from .upload import json_file_upload
+
+        level = self._compress_level(compress)
+        with json_file_upload(report, level) as upload:
+            response = await self._apost(
+                self._endpoint('api/v1/jobs'), **upload,
+            )
+        return self._job_submitted(response)
+
+    def _compress_level(self, compress: bool | None) -> int | None:
+        if compress is None:
+            compress = self.config.compress
+        return self.config.compress_level if compress else None
 
-    def submit_report(self, json_string: str) -> dict[str, Any]:
-        endpoint = f'{self.config.host.rstrip("/")}/api/v1/jobs'
-        response = self._post(endpoint, files={'json_file': json_string})
+    def _endpoint(self, path: str) -> str:
+        return f'{self.config.host.rstrip("/")}/{path}'
 
+    def _job_submitted(self, response: 'requests.Response') -> dict[str, Any]:
         if response.status_code == 422:
             if self.config.service_name.startswith('github'):
                 log.warning(
@@ -178,6 +272,19 @@ class Coveralls:
 
     # https://docs.coveralls.io/parallel-build-webhook
     def parallel_finish(self) -> dict[str, Any]:
+        response = self._post(
+            self._endpoint('webhook'), json=self._finish_payload(),
+        )
+        return self._finished(response)
+
+    async def aparallel_finish(self) -> dict[str, Any]:
+        """The asyncio counterpart of :meth:`parallel_finish`."""
+        response = await self._apost(
+            self._endpoint('webhook'), json=self._finish_payload(),
+        )
+        return self._finished(response)
+
+    def _finish_payload(self) -> dict[str, Any]:
         payload: dict[str, Any] = {'payload': {'status': 'done'}}
 
         # required args
@@ -196,8 +303,10 @@ class Coveralls:
             # Github Actions only
             payload['repo_name'] = os.environ.get('GITHUB_REPOSITORY')
 
-        endpoint = f'{self.config.host.rstrip("/")}/webhook'
-        response = self._post(endpoint, json=payload)
+        return payload
+
+    @staticmethod
+    def _finished(response: 'requests.Response') -> dict[str, Any]:
         try:
             response.raise_for_status()
             data: dict[str, Any] = response.json()
@@ -217,35 +326,80 @@ class Coveralls:
         """Generate json dumped report for coveralls api."""
         data = self.create_data()
         try:
-            json_string = json.dumps(data)
+            json_string = json.dumps(data, default=json_default)
         except UnicodeDecodeError:
             log.exception('ERROR: While preparing JSON:')
             self.debug_bad_encoding(data)
             raise
 
-        log_string = re.sub(
-            r'"repo_token": "(.+?)"',
-            '"repo_token": "[secure]"',
-            json_string,
-        )
-        log.debug(log_string)
-        log.debug('==\nReporting %s files\n==\n', len(data['source_files']))
-        for source_file in data['source_files']:
+        # Diagnostics cost a full extra pass over the payload (and another
+        # serialized copy of it), so they are only computed when they will
+        # actually be logged.
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(json.dumps(_redacted(data), default=json_default))
             log.debug(
-                '%s - %d/%d', source_file['name'],
-                sum(filter(None, source_file['coverage'])),
-                len(source_file['coverage']),
+                '==\nReporting %s files\n==\n', len(data['source_files']),
             )
+            for source_file in data['source_files']:
+                _log_source_file(source_file)
         return json_string
 
     def save_report(self, file_path: str) -> None:
-        """Write coveralls report to file."""
+        """
+        Write coveralls report to file (see :meth:`write_report_file`).
+
+        A failure to gather coverage is logged rather than raised, and leaves
+        no report behind.
+        """
+        import coverage  # pylint: disable=import-outside-toplevel
+
         try:
-            report = self.create_report()
+            self.write_report_file(file_path)
         except coverage.CoverageException:
             log.exception('Failure to gather coverage:')
+
+    def write_report_file(self, file_path: str) -> pathlib.Path:
+        """
+        Write coveralls report to file, returning the path written.
+
+        The report is streamed out one source file at a time (see
+        :meth:`write_report`) into a temporary sibling that replaces
+        ``file_path`` once complete, so a failure never leaves a truncated
+        report behind. With ``compress`` set, or for a ``.gz`` path, the report
+        is gzipped as it is written, and ``.gz`` is appended to a path that
+        lacks it.
+        """
+        path = pathlib.Path(file_path)
+        compress = self.config.compress or path.suffix == '.gz'
+        if compress and path.suffix != '.gz':
+            path = path.with_name(f'{path.name}.gz')
+            log.info('Writing compressed report to %s', path)
+
+        level = self.config.compress_level if compress else None
+        with report_writer(path, level) as stream:
+            self.write_report(stream)
+        return path
+
+    def write_report(self, stream: TextIO) -> None:
+        """
+        Serialize the report to ``stream`` incrementally.
+
+        Produces exactly what :meth:`create_report` would, but
+        each source file is serialized and written as the reporter yields it,
+        so only one file's entry is ever held in memory rather than the whole
+        payload and its serialized copy.
+        """
+        if self._data:
+            header = dict(self._data)
+            source_files = iter(header.pop('source_files'))
         else:
-            pathlib.Path(file_path).write_text(report, encoding='utf-8')
+            header = git_info() | self.config.to_payload()
+            source_files = self._merged.merged_into(self.iter_coverage())
+
+        if log.isEnabledFor(logging.DEBUG):
+            source_files = _logged(source_files)
+        count = dump(stream, source_files, header)
+        log.debug('==\nReporting %s files\n==\n', count)
 
     def create_data(
         self, extra: dict[str, Any] | None = None,
@@ -253,6 +407,9 @@ class Coveralls:
         r"""
         Generate object for api.
 
+        Source files keep their hits as compact vectors (see :mod:`.vectors`):
+        serialize it with ``json.dumps(data, default=json_default)``.
+
         Example json:
             {
                 "service_job_id": "1234567890",
@@ -275,27 +432,54 @@ class Coveralls:
         if self._data:
             return self._data
 
-        self._data = {'source_files': self.get_coverage()} | git_info()
-        self._data.update(self.config.to_payload())
         if extra:
-            if 'source_files' in extra:
-                self._data['source_files'].extend(extra['source_files'])
-            else:
-                log.warning(
-                    'No data to be merged; does the json file contain '
-                    '"source_files" data?',
-                )
+            self._add_merged(extra)
+
+        source_files = self._merged.merged_into(self._coverage())
+        self._data = {'source_files': list(source_files)} | git_info()
+        self._data.update(self.config.to_payload())
 
         return self._data
 
-    def get_coverage(self) -> list[dict[str, Any]]:
+    def _load_coverage(self) -> 'coverage.Coverage':
+        import coverage  # pylint: disable=import-outside-toplevel
+
         work = coverage.coverage(config_file=self.config.rcfile)
         work.load()
         work.get_data()
+        return work
+
+    def _reporter(
+            self, work: 'coverage.Coverage', lazy: bool = False,
+    ) -> 'CoverallReporter':
+        # pylint: disable=import-outside-toplevel
+        from .cache import ReportCache
+        from .reporter import CoverallReporter
+
+        cache = None
+        if self.config.cache_dir:
+            cache = ReportCache(
+                self.config.cache_dir, self.config.cache_size * 1024 * 1024,
+                max_age=self.config.cache_max_age * 24 * 60 * 60,
+            )
 
         return CoverallReporter(
             work, self.config.base_dir, self.config.src_dir,
-        ).coverage
+            jobs=self.config.jobs, cache=cache, lazy=lazy,
+            digest=self.config.source_digest,
+        )
+
+    def get_coverage(self) -> list[dict[str, Any]]:
+        return list(map(listed, self._coverage()))
+
+    def _coverage(self) -> list[dict[str, Any]]:
+        # get_coverage, with the hits still compact vectors
+        return self._reporter(self._load_coverage()).coverage
+
+    def iter_coverage(self) -> Iterator[dict[str, Any]]:
+        """Yield the source files of :meth:`create_data` one at a time."""
+        work = self._load_coverage()
+        yield from self._reporter(work, lazy=True).iter_report(work)
 
     @staticmethod
     def debug_bad_encoding(data: dict[str, Any]) -> None:
@@ -304,7 +488,7 @@ class Coveralls:
         for source_file_data in data['source_files']:
             for value in source_file_data.values():
                 try:
-                    json.dumps(value)
+                    json.dumps(value, default=json_default)
                 except UnicodeDecodeError:
                     at_fault_files.add(source_file_data['name'])
 
@@ -0,0 +1,112 @@
+import asyncio
+import dataclasses
+import logging
+import os
+import pathlib
+import time
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+from .merge import expand
+
+# Only for annotations: the API imports this module (through .spool) when
+# it needs it.
+if TYPE_CHECKING:
+    from .api import Coveralls
+
+
+log = logging.getLogger('coveralls.batch')
+
+# The reports `coveralls save` writes, as found in a directory.
+REPORT_PATTERNS = ('*.json', '*.json.gz')
+
+
+@dataclasses.dataclass
+class UploadSummary:
+    """What a batch upload sent, what it could not, and how long it took."""
+
+    uploaded: list[str] = dataclasses.field(default_factory=list)
+    failed: dict[str, str] = dataclasses.field(default_factory=dict)
+    size: int = 0
+    seconds: float = 0.0
+
+    def log(self) -> None:
+        total = len(self.uploaded) + len(self.failed)
+        rate = len(self.uploaded) / self.seconds if self.seconds else 0.0
+        log.info(
+            'Uploaded %d of %d reports (%.1f MB) in %.2fs (%.1f reports/s)',
+            len(self.uploaded), total, self.size / 1024 / 1024,
+            self.seconds, rate,
+        )
+        for path, error in self.failed.items():
+            log.error('Failed to upload %s: %s', path, error)
+
+
+def report_paths(patterns: Iterable[str]) -> list[str]:
+    """
+    Expand report paths, glob patterns and directories into report paths.
+
+    A directory stands for the reports (``*.json`` and ``*.json.gz``)
+    directly in it.
+    """
+    paths = []
+    for pattern in patterns:
+        if pathlib.Path(pattern).is_dir():
+            found = expand(
+                os.path.join(pattern, report) for report in REPORT_PATTERNS
+            )
+            paths.extend(sorted(found))
+        else:
+            paths.extend(expand([pattern]))
+    return paths
+
+
+def upload_reports(
+        coverallz: 'Coveralls', patterns: Iterable[str],
+        jobs: int | None = None,
+) -> UploadSummary:
+    """
+    Upload the saved reports at ``patterns`` (see :func:`report_paths`).
+
+    Up to ``jobs`` reports (by default, ``pool_size``) are sent at once, on
+    one event loop, over the connections ``coverallz`` keeps alive; each is
+    retried on its own (see :meth:`.Coveralls.asubmit_report`). A report that
+    still fails does not stop the others: its error is recorded in the
+    returned summary.
+    """
+    if jobs is None:
+        jobs = coverallz.config.pool_size
+    if jobs < 1:
+        raise ValueError(f'Invalid jobs value {jobs!r}: must be at least 1.')
+    paths = report_paths(patterns)
+    if not paths:
+        raise ValueError('No reports to upload')
+    return asyncio.run(_upload_all(coverallz, paths, jobs))
+
+
+async def _upload_all(
+        coverallz: 'Coveralls', paths: list[str], jobs: int,
+) -> UploadSummary:
+    summary = UploadSummary()
+    slots = asyncio.Semaphore(jobs)
+
+    async def upload(path: str) -> None:
+        async with slots:
+            try:
+                with open(path, 'rb') as report:
+                    result = await coverallz.asubmit_report(report)
+                    size = report.seek(0, os.SEEK_END)
+            except (OSError, RuntimeError) as e:
+                summary.failed[path] = str(e)
+                return
+        summary.uploaded.append(path)
+        summary.size += size
+        log.debug('Uploaded %s: %s', path, result.get('url'))
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(upload(path) for path in paths))
+    finally:
+        await coverallz.aclose()
+    summary.seconds = time.perf_counter() - start
+    return summary
@@ -0,0 +1,207 @@
+import contextlib
+import hashlib
+import json
+import logging
+import math
+import os
+import pathlib
+import tempfile
+import time
+from collections.abc import Callable
+from typing import Any
+from typing import TYPE_CHECKING
+from typing import TypeVar
+
+import coverage
+
+from .vectors import json_default
+
+if TYPE_CHECKING:
+    from .sqldata import MeasuredData
+
+
+log = logging.getLogger('coveralls.cache')
+
+T = TypeVar('T')
+
+# Bump whenever the layout of a cached entry changes, so entries written by an
+# older coveralls-python are treated as misses rather than misread.
+CACHE_FORMAT = 1
+
+
+def config_digest(cov: coverage.Coverage, *parts: str) -> bytes:
+    """
+    Digest everything outside a file that shapes its report entry.
+
+    That is the coverage.py version and its resolved configuration (exclusion
+    patterns, partial branches, include/omit, ...) plus any caller-supplied
+    ``parts``, such as the base and source dirs that determine the reported
+    file name.
+    """
+    settings = {
+        key: value for key, value in vars(cov.config).items()
+        if not key.startswith('_')
+    }
+    digest = hashlib.sha256(
+        f'{CACHE_FORMAT}\0{coverage.__version__}\0'.encode(),
+    )
+    digest.update(json.dumps(settings, sort_keys=True, default=repr).encode())
+    for part in parts:
+        digest.update(f'\0{part}'.encode())
+    return digest.digest()
+
+
+def file_key(
+        data: 'coverage.CoverageData | MeasuredData', morf: str, config: bytes,
+        extra: str = '',
+) -> str | None:
+    """
+    Build the cache key for one measured file.
+
+    The key covers the file's path, its source content and the lines (and
+    arcs, when measuring branches) recorded for it in the coverage data, on
+    top of the shared ``config`` digest and any ``extra`` data, such as hit
+    counts. The path matters: the cached entry holds the reported name, so
+    two files with the same content and coverage must not share one.
+    Returns None for files that cannot be cached: those measured through a
+    plugin, whose source and lines only the plugin understands, and those
+    that cannot be read.
+    """
+    if data.file_tracer(morf):
+        return None
+
+    try:
+        source = pathlib.Path(morf).read_bytes()
+    except OSError:
+        return None
+
+    digest = hashlib.sha256(config)
+    digest.update(f'{morf}\0'.encode())
+    digest.update(hashlib.sha256(source).digest())
+    digest.update(repr(sorted(data.lines(morf) or ())).encode())
+    if data.has_arcs():
+        digest.update(repr(sorted(data.arcs(morf) or ())).encode())
+    digest.update(extra.encode())
+    return digest.hexdigest()
+
+
+class ReportCache:
+    """
+    Size-bounded on-disk cache of per-file report entries.
+
+    Each entry is stored as its own file named after its key: JSON for
+    report entries (:meth:`get` and :meth:`put`), or any encoding of the
+    caller's (:meth:`load` and :meth:`store`). Reading an entry refreshes its
+    modification time, so :meth:`prune` can evict the entries unused for
+    ``max_age`` seconds, then the least recently used ones once the directory
+    outgrows ``max_size`` bytes, counting its :meth:`substore` entries too.
+    The cache is an optimization only: any I/O failure is logged and treated
+    as a miss.
+    """
+
+    def __init__(
+            self, directory: str, max_size: int,
+            max_age: float | None = None, suffix: str = '.json',
+    ) -> None:
+        self.directory = pathlib.Path(directory)
+        self.max_size = max_size
+        self.max_age = max_age
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.substores: list[ReportCache] = []
+
+    def substore(self, name: str, suffix: str) -> 'ReportCache':
+        """
+        A cache of its own in the ``name`` subdirectory.
+
+        Its entries are named with ``suffix``. They share this cache's
+        ``max_size`` and ``max_age``, and are evicted by its :meth:`prune`.
+        """
+        store = ReportCache(
+            str(self.directory / name), self.max_size, self.max_age, suffix,
+        )
+        self.substores.append(store)
+        return store
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / f'{key}{self.suffix}'
+
+    def has(self, key: str) -> bool:
+        if self._path(key).exists():
+            return True
+        self.misses += 1
+        return False
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        entry: dict[str, Any] | None = self.load(key, json.loads)
+        return entry
+
+    def put(self, key: str, entry: dict[str, Any]) -> None:
+        self.store(key, json.dumps(entry, default=json_default).encode())
+
+    def load(self, key: str, decode: Callable[[bytes], T]) -> T | None:
+        """
+        Read the entry of ``key`` with ``decode``.
+
+        ``decode`` raises ValueError on an entry it cannot read.
+        """
+        path = self._path(key)
+        try:
+            entry = decode(path.read_bytes())
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry
+
+    def store(self, key: str, data: bytes) -> None:
+        # Write to a temporary file and rename it into place, so a concurrent
+        # or interrupted run never observes a partially written entry.
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        except OSError as e:
+            log.debug('Could not write cache entry %s: %s', key, e)
+            return
+
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(data)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            log.debug('Could not write cache entry %s: %s', key, e)
+            with contextlib.suppress(OSError):
+                pathlib.Path(tmp).unlink()
+
+    def prune(self) -> None:
+        """
+        Evict the entries unused for ``max_age``.
+
+        Then the least recently used entries are evicted beyond ``max_size``.
+        Entries of the :attr:`substores` count towards the same ``max_size``,
+        and are evicted along with this cache's own, oldest first.
+        """
+        try:
+            entries = [
+                (path.stat(), path)
+                for store in (self, *self.substores)
+                for path in store.directory.glob(f'*{store.suffix}')
+            ]
+        except OSError as e:
+            log.debug('Could not prune cache %s: %s', self.directory, e)
+            return
+
+        total = sum(stat.st_size for stat, _ in entries)
+        expired = (
+            time.time() - self.max_age if self.max_age is not None
+            else -math.inf
+        )
+        for stat, path in sorted(entries, key=lambda e: e[0].st_mtime):
+            if total <= self.max_size and stat.st_mtime >= expired:
+                break
+            with contextlib.suppress(OSError):
+                path.unlink()
+            total -= stat.st_size
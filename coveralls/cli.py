@@ -1,10 +1,9 @@
-import importlib.metadata
-import inspect
 import logging
 import pathlib
-from collections.abc import Callable
+from contextlib import closing
 from typing import Annotated
 from typing import Any
+from typing import TYPE_CHECKING
 
 import typer
 from typer._click.exceptions import Abort
@@ -12,6 +11,27 @@ from typer._click.exceptions import ClickException
 from typer._click.exceptions import UsageError
 
 from .api import Coveralls
+from .combine import combine_reports
+from .options import _Branch
+from .options import _Carryforward
+from .options import _DataFile
+from .options import _File
+from .options import _Program
+from .options import _ReadJobs
+from .options import _Reports
+from .options import _Source
+from .options import _SpoolDir
+from .options import _SpoolDirArgument
+from .options import _Tree
+from .options import _UploadJobs
+from .options import _Uploads
+from .options import _Verbose
+from .options import COLLECTION_OPTIONS
+from .options import HTTP_OPTIONS
+from .options import with_options
+
+if TYPE_CHECKING:
+    from .batch import UploadSummary
 
 
 log = logging.getLogger('coveralls')
@@ -45,6 +65,7 @@ app = typer.Typer(
 
 def _show_version(value: bool) -> None:
     if value:
+        import importlib.metadata  # pylint: disable=import-outside-toplevel
         typer.echo(importlib.metadata.version('coveralls'))
         raise typer.Exit()
 
@@ -85,7 +106,12 @@ def _make_coveralls(
     carryforward: str | None = None,
     timeout: float | None = None,
     connect_timeout: float | None = None, read_timeout: float | None = None,
-    retries: int | None = None,
+    retries: int | None = None, pool_size: int | None = None,
+    jobs: int | None = None,
+    cache_dir: str | None = None, cache_size: int | None = None,
+    cache_max_age: int | None = None,
+    spool_dir: str | None = None, source_digest: bool | None = None,
+    compress: bool | None = None, compress_level: int | None = None,
 ) -> Coveralls:
     # pylint: disable=too-many-arguments,too-many-locals
     # Modifiers not exposed by a command default to None; resolve() drops unset
@@ -112,25 +138,37 @@ def _make_coveralls(
         'connect_timeout': connect_timeout,
         'read_timeout': read_timeout,
         'retries': retries,
+        'pool_size': pool_size,
+        'jobs': jobs,
+        'cache_dir': cache_dir,
+        'cache_size': cache_size,
+        'cache_max_age': cache_max_age,
+        'spool_dir': spool_dir,
+        'source_digest': source_digest,
+        'compress': compress,
+        'compress_level': compress_level,
     }
     return Coveralls(token_required, **overrides)
 
 
-def _action_submit(coverallz: Coveralls, merge: str | None) -> None:
+def _action_submit(coverallz: Coveralls, merge: list[str] | None) -> None:
     if merge:
-        coverallz.merge(merge)
+        coverallz.merge(*merge)
     log.info('Submitting coverage to coveralls.io...')
     result = coverallz.wear()
     log.info('Coverage submitted!')
     log.debug(result)
     if result:
         log.info(result.get('message'))
-        log.info(result.get('url'))
+        if 'url' in result:
+            log.info(result['url'])
 
 
-def _action_save(coverallz: Coveralls, merge: str | None, path: str) -> None:
+def _action_save(
+    coverallz: Coveralls, merge: list[str] | None, path: str,
+) -> None:
     if merge:
-        coverallz.merge(merge)
+        coverallz.merge(*merge)
     log.info('Write coverage report to file...')
     coverallz.save_report(path)
 
@@ -139,141 +177,63 @@ def _action_save(coverallz: Coveralls, merge: str | None, path: str) -> None:
 # but the old flat CLI ran it before every action, so the deprecated
 # --submit/--finish paths pass it for identical dispatch.
 def _action_upload(
-    coverallz: Coveralls, path: str, merge: str | None = None,
+    coverallz: Coveralls, path: str, merge: list[str] | None = None,
 ) -> None:
     if merge:
-        coverallz.merge(merge)
-    report = pathlib.Path(path).read_text(encoding='utf-8')
-    coverallz.submit_report(report)
+        coverallz.merge(*merge)
+    with open(path, 'rb') as report:
+        coverallz.submit_report(report)
+
+
+def _action_upload_many(
+    coverallz: Coveralls, patterns: list[str], jobs: int | None,
+) -> None:
+    # asyncio is only needed here, so keep it off every other command's path.
+    # pylint: disable-next=import-outside-toplevel
+    from .batch import upload_reports
 
+    _check_uploaded(upload_reports(coverallz, patterns, jobs))
 
-def _action_finish(coverallz: Coveralls, merge: str | None = None) -> None:
+
+def _action_drain(coverallz: Coveralls, jobs: int | None) -> None:
+    # pylint: disable-next=import-outside-toplevel
+    from .spool import drain as drain_spool
+
+    spool_dir = coverallz.config.spool_dir
+    if not spool_dir:
+        raise UsageError(
+            'No spool directory: pass SPOOL_DIR or set COVERALLS_SPOOL_DIR.',
+        )
+    _check_uploaded(drain_spool(coverallz, spool_dir, jobs))
+
+
+def _check_uploaded(summary: 'UploadSummary') -> None:
+    summary.log()
+    if summary.failed:
+        raise ClickException(
+            f'{len(summary.failed)} of '
+            f'{len(summary.failed) + len(summary.uploaded)} reports failed '
+            f'to upload',
+        )
+
+
+def _action_finish(
+    coverallz: Coveralls, merge: list[str] | None = None,
+) -> None:
     if merge:
-        coverallz.merge(merge)
+        coverallz.merge(*merge)
     log.info('Finishing parallel jobs...')
     coverallz.parallel_finish()
     log.info('Done')
 
 
-def _action_debug(coverallz: Coveralls, merge: str | None) -> None:
+def _action_debug(coverallz: Coveralls, merge: list[str] | None) -> None:
     if merge:
-        coverallz.merge(merge)
+        coverallz.merge(*merge)
     log.info('Testing coveralls-python...')
     coverallz.wear(dry_run=True)
 
 
-# Shared modifier specs, defined once, then bundled into the option groups
-# below. Keeping the option names, help and deprecation status in one place
-# stops them drifting between commands.
-_ServiceName = Annotated[
-    str | None,
-    typer.Option(
-        '--service-name',
-        help='Provide an alternative service name to submit.',
-    ),
-]
-_Service = Annotated[
-    str | None,
-    typer.Option(
-        '--service', hidden=True, help='Deprecated alias for --service-name.',
-    ),
-]
-_Rcfile = Annotated[
-    str | None,
-    typer.Option(
-        '--rcfile',
-        help='Specify the coverage.py config file (default: auto-discovered).',
-    ),
-]
-_BaseDir = Annotated[
-    str | None,
-    typer.Option(
-        '--base-dir',
-        help='Base directory that is removed from reported paths.',
-    ),
-]
-_Basedir = Annotated[
-    str | None,
-    typer.Option(
-        '--basedir', hidden=True, help='Deprecated alias for --base-dir.',
-    ),
-]
-_SrcDir = Annotated[
-    str | None,
-    typer.Option(
-        '--src-dir', help='Source directory added to reported paths.',
-    ),
-]
-_Srcdir = Annotated[
-    str | None,
-    typer.Option(
-        '--srcdir', hidden=True, help='Deprecated alias for --src-dir.',
-    ),
-]
-_Merge = Annotated[
-    str | None,
-    typer.Option('--merge', help='Merge report from file when submitting.'),
-]
-_Parallel = Annotated[
-    bool | None,
-    typer.Option(
-        '--parallel/--no-parallel',
-        help='Submit as one of several parallel jobs to be merged.',
-    ),
-]
-_Host = Annotated[
-    str | None,
-    typer.Option('--host', help='Coveralls API host base URL.'),
-]
-_Carryforward = Annotated[
-    str | None,
-    typer.Option(
-        '--carryforward',
-        help='Comma-separated list of parallel job flags to carry forward '
-             'for missing jobs.',
-    ),
-]
-_SkipSslVerify = Annotated[
-    bool | None,
-    typer.Option(
-        '--skip-ssl-verify/--no-skip-ssl-verify',
-        help='Skip verification of the SSL certificate of the host.',
-    ),
-]
-_Verbose = Annotated[
-    bool,
-    typer.Option(
-        '-v', '--verbose',
-        help='Print extra info, always enabled when debugging.',
-    ),
-]
-_Timeout = Annotated[
-    float | None,
-    typer.Option(
-        '--timeout',
-        help='Connect and read timeout, in seconds (default: 10/60).',
-    ),
-]
-_ConnectTimeout = Annotated[
-    float | None,
-    typer.Option(
-        '--connect-timeout', help='Connect timeout, in seconds (default: 10).',
-    ),
-]
-_ReadTimeout = Annotated[
-    float | None,
-    typer.Option(
-        '--read-timeout', help='Read timeout, in seconds (default: 60).',
-    ),
-]
-_Retries = Annotated[
-    int | None,
-    typer.Option(
-        '--retries',
-        help='Retry transient HTTP failures this many times (default: 0). '
-             'Uses exponential backoff with jitter.',
-    ),
-]
 _Version = Annotated[
     bool | None,
     typer.Option(
@@ -306,76 +266,6 @@ _Finish = Annotated[
     ),
 ]
 
-_File = Annotated[str, typer.Argument(help='Coverage report file path.')]
-
-
-# Options bundled by the concern they serve, so a command opts into a whole
-# block with one entry instead of re-listing every parameter. Add a new
-# modifier to the group and every command in that group gains it (e.g. a future
-# retry flag on HTTP_OPTIONS reaches every command that talks to the API).
-# Each value is (annotated type, default). --merge and --parallel live with the
-# collection options: they shape the report a command builds before submitting.
-CollectionOption = tuple[Any, Any]
-COLLECTION_OPTIONS: dict[str, CollectionOption] = {
-    'service_name': (_ServiceName, None),
-    'service': (_Service, None),
-    'rcfile': (_Rcfile, None),
-    'base_dir': (_BaseDir, None),
-    'basedir': (_Basedir, None),
-    'src_dir': (_SrcDir, None),
-    'srcdir': (_Srcdir, None),
-    'merge': (_Merge, None),
-    'parallel': (_Parallel, None),
-}
-HTTP_OPTIONS: dict[str, CollectionOption] = {
-    'host': (_Host, None),
-    'skip_ssl_verify': (_SkipSslVerify, None),
-    'timeout': (_Timeout, None),
-    'connect_timeout': (_ConnectTimeout, None),
-    'read_timeout': (_ReadTimeout, None),
-    'retries': (_Retries, None),
-}
-
-
-def with_options(
-    *groups: dict[str, CollectionOption],
-) -> Callable[[Callable[..., None]], Callable[..., None]]:
-    """
-    Splice shared option groups into a Typer command's signature.
-
-    Typer derives a command's options purely from its function signature, so
-    sharing a block of options otherwise means repeating those parameters in
-    every command. Instead, each command keeps a ``**opts`` catch-all and this
-    decorator appends the grouped options to the signature Typer introspects;
-    at call time Typer passes their parsed values through ``**opts``.
-    """
-    injected: dict[str, CollectionOption] = {}
-    for group in groups:
-        injected.update(group)
-
-    def decorate(func: Callable[..., None]) -> Callable[..., None]:
-        sig = inspect.signature(func)
-        # Drop the **opts catch-all from the signature Typer sees (it would
-        # otherwise be treated as a positional argument) but keep it on the
-        # real function so the injected values have somewhere to land.
-        params = [
-            p for p in sig.parameters.values()
-            if p.kind is not inspect.Parameter.VAR_KEYWORD
-        ]
-        for name, (annotation, default) in injected.items():
-            params.append(
-                inspect.Parameter(
-                    name, inspect.Parameter.KEYWORD_ONLY,
-                    default=default, annotation=annotation,
-                ),
-            )
-            func.__annotations__[name] = annotation
-        new_signature = sig.replace(parameters=params)
-        func.__signature__ = new_signature  # type: ignore[attr-defined]
-        return func
-
-    return decorate
-
 
 @app.callback(invoke_without_command=True)
 @with_options(COLLECTION_OPTIONS, HTTP_OPTIONS)
@@ -386,6 +276,7 @@ def coveralls(
     submit: _Submit = None,
     finish_flag: _Finish = False,
     version: _Version = None,
+    spool_dir: _SpoolDir = None,
     **opts: Any,
 ) -> None:
     """Collect coverage and submit it to coveralls.io."""
@@ -422,7 +313,8 @@ def coveralls(
     if finish_flag:
         _warn_deprecated_verb('--finish', 'coveralls finish')
         coverallz = _make_coveralls(token_required=True, **opts)
-        _action_finish(coverallz, merge)
+        with closing(coverallz):
+            _action_finish(coverallz, merge)
     elif output is not None:
         _warn_deprecated_verb('--output', 'coveralls save FILE')
         coverallz = _make_coveralls(token_required=False, **opts)
@@ -430,10 +322,14 @@ def coveralls(
     elif submit is not None:
         _warn_deprecated_verb('--submit', 'coveralls upload FILE')
         coverallz = _make_coveralls(token_required=True, **opts)
-        _action_upload(coverallz, submit, merge)
+        with closing(coverallz):
+            _action_upload(coverallz, submit, merge)
     else:
-        coverallz = _make_coveralls(token_required=True, **opts)
-        _action_submit(coverallz, merge)
+        coverallz = _make_coveralls(
+            token_required=True, spool_dir=spool_dir, **opts,
+        )
+        with closing(coverallz):
+            _action_submit(coverallz, merge)
 
 
 @app.command()
@@ -448,16 +344,54 @@ def finish(
     coverallz = _make_coveralls(
         token_required=True, carryforward=carryforward, **opts,
     )
-    _action_finish(coverallz)
+    with closing(coverallz):
+        _action_finish(coverallz)
 
 
 @app.command()
 @with_options(HTTP_OPTIONS)
-def upload(file: _File, verbose: _Verbose = False, **opts: Any) -> None:
-    """Upload a previously generated coverage report FILE."""
+def upload(
+    files: _Uploads,
+    verbose: _Verbose = False,
+    jobs: _UploadJobs = None,
+    **opts: Any,
+) -> None:
+    """
+    Upload previously generated coverage reports FILES.
+
+    Several reports (or a directory of them) are uploaded concurrently, each
+    retried on its own, and summarized at the end.
+    """
     _configure_logging(verbose=verbose)
     coverallz = _make_coveralls(token_required=True, **opts)
-    _action_upload(coverallz, file)
+    with closing(coverallz):
+        if len(files) == 1 and pathlib.Path(files[0]).is_file():
+            _action_upload(coverallz, files[0])
+        else:
+            _action_upload_many(coverallz, files, jobs)
+
+
+@app.command()
+@with_options(HTTP_OPTIONS)
+def drain(
+    spool_dir: _SpoolDirArgument = None,
+    verbose: _Verbose = False,
+    jobs: _UploadJobs = None,
+    **opts: Any,
+) -> None:
+    """
+    Upload the reports spooled in SPOOL_DIR by `coveralls --spool-dir`.
+
+    Uploaded reports are removed from the spool; any that fail stay there for
+    the next drain.
+    """
+    _configure_logging(verbose=verbose)
+    # Spooled reports carry their own repo token.
+    coverallz = _make_coveralls(
+        token_required=False, spool_dir=spool_dir, **opts,
+    )
+    with closing(coverallz):
+        _action_drain(coverallz, jobs)
 
 
 @app.command()
@@ -472,6 +406,53 @@ def save(file: _File, verbose: _Verbose = False, **opts: Any) -> None:
     _action_save(coverallz, merge, file)
 
 
+@app.command()
+def combine(
+    file: _File,
+    reports: _Reports,
+    verbose: _Verbose = False,
+    jobs: _ReadJobs = None,
+    tree: _Tree = False,
+) -> None:
+    """Combine REPORTS written by `coveralls save` into one report FILE."""
+    _configure_logging(verbose=verbose)
+    combine_reports(file, reports, jobs=jobs or 1, tree=tree)
+
+
+@app.command(
+    context_settings={
+        'allow_interspersed_args': False, 'ignore_unknown_options': True,
+    },
+)
+def run(
+    program: _Program,
+    branch: _Branch = False,
+    data_file: _DataFile = '.coverage',
+    source: _Source = None,
+    verbose: _Verbose = False,
+) -> None:
+    """
+    Run PROGRAM and measure its coverage with sys.monitoring (Python 3.12+).
+
+    Writes a coverage.py data file for `coveralls` to report, as `coverage
+    run` would, but with far less overhead. Put `--` before PROGRAM if it
+    takes options of its own.
+    """
+    _configure_logging(verbose=verbose)
+    # pylint: disable-next=import-outside-toplevel
+    from .monitor import measure
+    try:
+        status = measure(
+            program, data_file=data_file, branch=branch, roots=source,
+        )
+    except ValueError as e:
+        raise UsageError(str(e)) from e
+    except RuntimeError as e:
+        raise ClickException(str(e)) from e
+    if status:
+        raise SystemExit(status)
+
+
 @app.command(help=DEBUG_HELP)
 @with_options(COLLECTION_OPTIONS, HTTP_OPTIONS)
 def debug(**opts: Any) -> None:
@@ -0,0 +1,162 @@
+import datetime
+import itertools
+import logging
+import math
+import pathlib
+from collections.abc import Callable
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+from .configuration.helpers import DEFAULT_COMPRESS_LEVEL
+from .jsonstream import dump
+from .jsonstream import report_writer
+from .merge import expand
+from .merge import read_reports
+from .merge import SourceFiles
+
+
+log = logging.getLogger('coveralls.combine')
+
+_DROP = object()
+
+# A partially combined report: the headers of its shards and their merged
+# source files.
+Partial = tuple[list[dict[str, Any]], SourceFiles]
+
+
+def _latest(values: list[Any]) -> Any:
+    # The combined job ran until its last shard did.
+    try:
+        return max(values, key=datetime.datetime.fromisoformat)
+    except (TypeError, ValueError):
+        return values[-1]
+
+
+def _same_commit(values: list[Any]) -> Any:
+    commits = {str(value.get('head', {}).get('id')) for value in values}
+    if len(commits) > 1:
+        raise ValueError(
+            f'Cannot combine reports of different commits: '
+            f'{", ".join(sorted(commits))}',
+        )
+    return values[0]
+
+
+def _drop(values: list[Any]) -> Any:
+    # Each shard ran as its own job; none of them is the combined one.
+    log.debug('Dropping per-shard job ids %s', values)
+    return _DROP
+
+
+# How header fields that differ between shards are reconciled. Any other
+# field keeps its first value, with a warning.
+RECONCILERS: dict[str, Callable[[list[Any]], Any]] = {
+    'run_at': _latest,
+    'git': _same_commit,
+    'service_job_id': _drop,
+}
+
+
+def reconcile(headers: list[dict[str, Any]]) -> dict[str, Any]:
+    """Combine the top-level fields of several reports into one header."""
+    header = {}
+    for key in dict.fromkeys(itertools.chain.from_iterable(headers)):
+        values = [h[key] for h in headers if key in h]
+        if all(value == values[0] for value in values):
+            value = values[0]
+        elif key in RECONCILERS:
+            value = RECONCILERS[key](values)
+        else:
+            log.warning(
+                'Reports disagree on %s; keeping the first value, %r',
+                key, values[0],
+            )
+            value = values[0]
+        if value is not _DROP:
+            header[key] = value
+    return header
+
+
+def _fold(paths: Iterable[str], jobs: int) -> Partial:
+    headers = []
+    source_files = SourceFiles()
+    for report in read_reports(paths, jobs=jobs):
+        source_files.extend(report)
+        headers.append(report.header)
+    return headers, source_files
+
+
+def _fold_run(paths: list[str]) -> Partial:
+    return _fold(paths, jobs=1)
+
+
+def _pair(left: Partial, right: Partial) -> Partial:
+    (left_headers, left_files), (right_headers, right_files) = left, right
+    left_files.extend(right_files)
+    return left_headers + right_headers, left_files
+
+
+def _reduce_tree(paths: list[str], jobs: int) -> Partial:
+    # Each worker process folds one contiguous run of the reports as they are
+    # parsed, so no more than ``jobs`` partial results are ever held. These
+    # are then combined in pairs of neighbours, which keeps the order a fold
+    # would, until one is left.
+    size = math.ceil(len(paths) / jobs)
+    runs = [paths[i:i + size] for i in range(0, len(paths), size)]
+    if len(runs) == 1:
+        return _fold(paths, jobs)
+
+    log.debug(
+        'Combining %d reports with %d worker processes',
+        len(paths), len(runs),
+    )
+    try:
+        with ProcessPoolExecutor(max_workers=len(runs)) as pool:
+            partials = list(pool.map(_fold_run, runs))
+            while len(partials) > 1:
+                paired = list(pool.map(_pair, partials[::2], partials[1::2]))
+                partials = paired + partials[2 * len(paired):]
+    except (OSError, NotImplementedError, BrokenProcessPool) as e:
+        log.warning(
+            'Could not start combine worker processes, falling back to '
+            'folding the reports in one at a time: %s', e,
+        )
+        return _fold(paths, jobs)
+    return partials[0]
+
+
+def combine_reports(
+        out: str, patterns: Iterable[str], jobs: int = 1, tree: bool = False,
+) -> int:
+    """
+    Combine the reports at ``patterns`` (paths or globs) into one at ``out``.
+
+    Source files are merged by name (see :class:`.SourceFiles`) and the other
+    top-level fields reconciled (see :data:`RECONCILERS`); reports of
+    different commits cannot be combined. By default the reports are folded
+    into the result one at a time, as they are parsed on ``jobs`` threads.
+    In ``tree`` mode they are cut into ``jobs`` runs, each folded in a worker
+    process, and the partial results combined in pairs, halving their number
+    each round. A ``.gz`` ``out`` is gzipped. Returns the number of reports
+    combined.
+    """
+    paths = expand(patterns)
+    if not paths:
+        raise ValueError('No reports to combine')
+
+    if tree:
+        headers, source_files = _reduce_tree(paths, jobs)
+    else:
+        headers, source_files = _fold(paths, jobs)
+
+    path = pathlib.Path(out)
+    level = DEFAULT_COMPRESS_LEVEL if path.suffix == '.gz' else None
+    with report_writer(path, level) as stream:
+        count = dump(stream, source_files, reconcile(headers))
+    log.info(
+        'Combined %d reports (%d source files) into %s',
+        len(paths), count, path,
+    )
+    return len(paths)
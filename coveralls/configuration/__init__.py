@@ -65,7 +65,9 @@ def resolve(
     # Coerce the boolean flags: a config file may carry a non-bool (e.g. a
     # quoted ``parallel: "yes"``), which must not reach the API or a client
     # toggle as a stray string.
-    for flag in ('parallel', 'skip_ssl_verify'):
+    for flag in (
+            'parallel', 'skip_ssl_verify', 'compress', 'source_digest',
+    ):
         if flag in merged:
             merged[flag] = bool(merged[flag])
 
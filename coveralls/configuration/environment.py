@@ -2,6 +2,10 @@ import os
 from typing import Any
 
 
+def _enabled(var: str) -> bool:
+    return os.environ.get(var, '').lower() in {'1', 'true', 'yes', 'on'}
+
+
 def _from_environment() -> dict[str, Any]:
     config: dict[str, Any] = {}
 
@@ -12,12 +16,22 @@ def _from_environment() -> dict[str, Any]:
         config['parallel'] = True
     if os.environ.get('COVERALLS_SKIP_SSL_VERIFY'):
         config['skip_ssl_verify'] = True
+    if _enabled('COVERALLS_COMPRESS'):
+        config['compress'] = True
+    if _enabled('COVERALLS_SOURCE_DIGEST'):
+        config['source_digest'] = True
 
     fields = {
         'COVERALLS_BASE_DIR': 'base_dir',
+        'COVERALLS_CACHE_DIR': 'cache_dir',
+        'COVERALLS_CACHE_MAX_AGE': 'cache_max_age',
+        'COVERALLS_CACHE_SIZE': 'cache_size',
         'COVERALLS_CARRYFORWARD': 'carryforward',
+        'COVERALLS_COMPRESS_LEVEL': 'compress_level',
         'COVERALLS_CONNECT_TIMEOUT': 'connect_timeout',
         'COVERALLS_FLAG_NAME': 'flag_name',
+        'COVERALLS_JOBS': 'jobs',
+        'COVERALLS_POOL_SIZE': 'pool_size',
         'COVERALLS_RCFILE': 'rcfile',
         'COVERALLS_READ_TIMEOUT': 'read_timeout',
         'COVERALLS_REPO_TOKEN': 'repo_token',
@@ -27,6 +41,7 @@ def _from_environment() -> dict[str, Any]:
         'COVERALLS_SERVICE_JOB_NUMBER': 'service_job_number',
         'COVERALLS_SERVICE_NAME': 'service_name',
         'COVERALLS_SERVICE_NUMBER': 'service_number',
+        'COVERALLS_SPOOL_DIR': 'spool_dir',
         'COVERALLS_SRC_DIR': 'src_dir',
         'COVERALLS_TIMEOUT': 'timeout',
     }
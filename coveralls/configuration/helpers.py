@@ -26,6 +26,20 @@ DEFAULT_READ_TIMEOUT = 60
 
 DEFAULT_RETRIES = 0
 
+# Connections to the API kept open for reuse (requests' own default).
+DEFAULT_POOL_SIZE = 10
+
+# Report building is serial unless more worker processes are requested.
+DEFAULT_JOBS = 1
+
+# Upper bound, in megabytes, on the per-file report cache (when enabled).
+DEFAULT_CACHE_SIZE = 256
+# Cache entries unused for this many days are evicted, whatever the size.
+DEFAULT_CACHE_MAX_AGE = 30
+
+# gzip level used for compressed reports: zlib's own speed/size trade-off.
+DEFAULT_COMPRESS_LEVEL = 6
+
 
 def default_run_at() -> str:
     """Current local time as an RFC 3339 timestamp, e.g. the /jobs run_at."""
@@ -107,6 +121,22 @@ class Config:
     connect_timeout: float | None = None
     read_timeout: float | None = None
     retries: int = DEFAULT_RETRIES
+    pool_size: int = DEFAULT_POOL_SIZE
+    # Worker processes used to analyze source files when building the report.
+    jobs: int = DEFAULT_JOBS
+    # Directory of the persistent per-file report cache; None disables it.
+    cache_dir: str | None = None
+    cache_size: int = DEFAULT_CACHE_SIZE
+    cache_max_age: int = DEFAULT_CACHE_MAX_AGE
+    # Report each file's source_digest (MD5) in place of its source text, for
+    # repos whose source coveralls.io can read itself.
+    source_digest: bool = False
+    # Directory that wear() spools reports into for `coveralls drain` to
+    # upload, instead of uploading them itself; None uploads directly.
+    spool_dir: str | None = None
+    # Gzip the uploaded json_file (and reports written by save) at this level.
+    compress: bool = False
+    compress_level: int = DEFAULT_COMPRESS_LEVEL
 
     def __post_init__(self) -> None:
         self.timeout = self._validate_timeout('timeout', self.timeout)
@@ -116,7 +146,20 @@ class Config:
         self.read_timeout = self._validate_timeout(
             'read_timeout', self.read_timeout,
         )
-        self.retries = self._validate_retries(self.retries)
+        self.retries = self._validate_count('retries', self.retries)
+        self.pool_size = self._validate_count(
+            'pool_size', self.pool_size, minimum=1,
+        )
+        self.jobs = self._validate_count('jobs', self.jobs, minimum=1)
+        self.cache_size = self._validate_count(
+            'cache_size', self.cache_size, minimum=1,
+        )
+        self.cache_max_age = self._validate_count(
+            'cache_max_age', self.cache_max_age, minimum=1,
+        )
+        self.compress_level = self._validate_count(
+            'compress_level', self.compress_level, maximum=9,
+        )
 
     @staticmethod
     def _validate_timeout(name: str, raw: Any) -> float | None:
@@ -135,7 +178,9 @@ class Config:
         return value
 
     @staticmethod
-    def _validate_retries(raw: Any) -> int:
+    def _validate_count(
+            name: str, raw: Any, minimum: int = 0, maximum: int | None = None,
+    ) -> int:
         # Only genuine ints and integer-valued strings (e.g. "3", from env vars
         # or YAML) are accepted. Bools are excluded despite being ints, so
         # retries=True is not silently read as 1; everything else is routed
@@ -146,11 +191,17 @@ class Config:
             value = int(raw) if is_int else int(str(raw))
         except (TypeError, ValueError) as e:
             raise ValueError(
-                f'Invalid retries value {raw!r}: must be an integer.',
+                f'Invalid {name} value {raw!r}: must be an integer.',
             ) from e
-        if value < 0:
+        if value < minimum:
+            bound = (
+                'not be negative' if minimum == 0
+                else f'be at least {minimum}'
+            )
+            raise ValueError(f'Invalid {name} value {raw!r}: must {bound}.')
+        if maximum is not None and value > maximum:
             raise ValueError(
-                f'Invalid retries value {raw!r}: must not be negative.',
+                f'Invalid {name} value {raw!r}: must be at most {maximum}.',
             )
         return value
 
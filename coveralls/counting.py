@@ -0,0 +1,348 @@
+import atexit
+import contextlib
+import functools
+import glob
+import gzip
+import itertools
+import json
+import logging
+import operator
+import os
+import pathlib
+import random
+import socket
+import sys
+import sysconfig
+from types import CodeType
+from typing import Any
+
+import coverage
+
+
+log = logging.getLogger('coveralls.counting')
+
+# sys.monitoring tool ids to count with: those the standard debugger,
+# coverage, profiler and optimizer ids leave free.
+TOOL_IDS = (3, 4)
+
+# How many times each line, and each (from, to) line arc, ran.
+LineCounts = dict[int, int]
+ArcCounts = dict['Arc', int]
+FileCounts = tuple[LineCounts, ArcCounts]
+Arc = tuple[int, int]
+
+# PEP 669 monitoring, on Python 3.12+.
+_MONITORING: Any = getattr(sys, 'monitoring', None)
+
+# The directory, beside the coverage.py data file, that counts are saved in:
+# outside the ``.coverage.*`` names coverage.py combines and erases.
+COUNTS_DIR = '.coveralls-counts'
+
+# The counter the coverage.py plugin started in this process, if any.
+_plugin_counter: 'HitCounter | None' = None
+
+# Where code is never measured: the standard library, installed packages and
+# coveralls itself.
+_EXCLUDED = tuple(
+    os.path.join(path, '') for path in {
+        *(
+            sysconfig.get_paths()[name] for name in (
+                'stdlib', 'platstdlib', 'purelib', 'platlib',
+            )
+        ),
+        os.path.dirname(os.path.abspath(__file__)),
+    }
+)
+
+
+def counts_path(data_file: str) -> str:
+    """
+    Where the hit counts of the coverage.py ``data_file`` are saved.
+
+    Each counter saves its own, at this path with a suffix of its own.
+    """
+    return os.path.join(
+        os.path.dirname(data_file), COUNTS_DIR, os.path.basename(data_file),
+    )
+
+
+def _saved_counts(data_file: str) -> list[str]:
+    return sorted(glob.glob(f'{glob.escape(counts_path(data_file))}.*'))
+
+
+def clear_counts(data_file: str) -> None:
+    """Remove the hit counts saved for the coverage.py ``data_file``."""
+    for path in _saved_counts(data_file):
+        with contextlib.suppress(OSError):
+            pathlib.Path(path).unlink()
+
+
+def appends(cov: coverage.Coverage, data_file: str) -> bool:
+    """
+    Whether ``cov`` measures on top of the data of earlier runs.
+
+    The counts saved for its ``data_file`` then still add to that data.
+    In parallel mode, each process writes a data file of its own for them all
+    to be combined: those already written, if any, are of the same run. The
+    data file is otherwise overwritten, unless coverage.py read it first to
+    append to it.
+    """
+    if cov.config.parallel:
+        return bool(glob.glob(f'{glob.escape(data_file)}.*'))
+    data = getattr(cov, '_data', None)
+    return data is not None and bool(data.measured_files())
+
+
+def root_dirs(roots: list[str] | None) -> tuple[str, ...]:
+    """The directories to measure code in: ``roots``, or the cwd."""
+    return tuple(
+        os.path.join(os.path.abspath(root), '')
+        for root in roots or [str(pathlib.Path.cwd())]
+    )
+
+
+def is_project_file(filename: str, roots: tuple[str, ...]) -> bool:
+    """
+    Whether to measure the code of ``filename``.
+
+    It must be a source file under one of ``roots`` (see :func:`root_dirs`),
+    outside the standard library and installed packages.
+    """
+    return (
+        filename.startswith(roots)
+        and not filename.startswith(_EXCLUDED)
+        and pathlib.Path(filename).is_file()
+    )
+
+
+class HitCounter:
+    """
+    Count how many times each line and arc of the measured code runs.
+
+    The counts come from ``sys.monitoring`` events (Python 3.12+), which can
+    be collected beside coverage.py's own tracer. Code is counted only in
+    files under ``roots`` (the working directory by default), outside the
+    standard library and installed packages.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, roots: list[str] | None = None) -> None:
+        self.roots = root_dirs(roots)
+        self.counts: dict[str, FileCounts] = {}
+        # Set to only count once coverage.py is measuring.
+        self.require_coverage = False
+        # Set to clear the counts saved for this data file by earlier runs,
+        # once coverage.py is measuring (see :func:`appends`).
+        self.data_file: str | None = None
+        self._code: dict[CodeType, FileCounts | None] = {}
+        # The events of counted code, straight to what they count, as they
+        # come too often to look their code up through :meth:`counted`.
+        self._lines: dict[CodeType, LineCounts] = {}
+        self._branches: dict[
+            tuple[CodeType, int, int], tuple[ArcCounts, Arc | None],
+        ] = {}
+        self._tool: int | None = None
+
+    def counted(self, code: CodeType) -> FileCounts | None:
+        """The counts of the file ``code`` is in, or None if not counted."""
+        # Runs on every event: a single lookup, as code objects are slow to
+        # hash, and no context manager to enter.
+        try:  # noqa: FURB107
+            return self._code[code]
+        except KeyError:
+            pass
+        filename = os.path.abspath(code.co_filename)
+        counts = None
+        if is_project_file(filename, self.roots) and self._measuring():
+            counts = self.counts.setdefault(filename, ({}, {}))
+        self._code[code] = counts
+        return counts
+
+    def _measuring(self) -> bool:
+        if not self.require_coverage:
+            return True
+        cov = coverage.Coverage.current()
+        if cov is None:
+            return False
+        if self.data_file is not None:
+            # The first code measured: the counts of earlier runs go the way
+            # of their coverage data.
+            if not appends(cov, self.data_file):
+                clear_counts(self.data_file)
+            self.data_file = None
+        return True
+
+    def start(self) -> bool:
+        """Start counting; False if no sys.monitoring tool id is available."""
+        if _MONITORING is None:
+            return False
+
+        monitoring = _MONITORING
+        for tool in TOOL_IDS:
+            try:
+                monitoring.use_tool_id(tool, 'coveralls')
+            except ValueError:
+                continue
+            self._tool = tool
+            break
+        else:
+            log.warning('Cannot count hits: no sys.monitoring tool id is free')
+            return False
+
+        events = monitoring.events
+        # 3.14 splits BRANCH into the two ways a branch can go.
+        branches = [
+            getattr(events, name) for name in ('BRANCH_LEFT', 'BRANCH_RIGHT')
+            if hasattr(events, name)
+        ] or [events.BRANCH]
+        monitoring.register_callback(tool, events.LINE, self._on_line)
+        for event in branches:
+            monitoring.register_callback(tool, event, self._on_branch)
+        monitoring.set_events(
+            tool, functools.reduce(operator.or_, branches, events.LINE),
+        )
+        return True
+
+    def stop(self) -> None:
+        if self._tool is None:
+            return
+        _MONITORING.set_events(self._tool, 0)
+        _MONITORING.free_tool_id(self._tool)
+        self._tool = None
+
+    def _on_line(self, code: CodeType, line: int) -> Any:
+        try:
+            lines = self._lines[code]
+        except KeyError:
+            counts = self.counted(code)
+            if counts is None:
+                return _MONITORING.DISABLE
+            lines = self._lines[code] = counts[0]
+        lines[line] = lines.get(line, 0) + 1
+        return None
+
+    def _on_branch(self, code: CodeType, offset: int, destination: int) -> Any:
+        try:
+            arcs, arc = self._branches[code, offset, destination]
+        except KeyError:
+            counts = self.counted(code)
+            if counts is None:
+                return _MONITORING.DISABLE
+            arcs, arc = self._branches[code, offset, destination] = (
+                counts[1], _branch_arc(code, offset, destination),
+            )
+        if arc is not None:
+            arcs[arc] = arcs.get(arc, 0) + 1
+        return None
+
+    def save(self, data_file: str) -> None:
+        """
+        Write the counts for the coverage.py ``data_file``.
+
+        Each counter writes its own file (see :func:`counts_path`), so that
+        processes counting at the same time never overwrite each other. Line
+        numbers and counts are stored as flat lists, gzipped.
+        """
+        counts = {
+            filename: {
+                'lines': list(itertools.chain.from_iterable(lines.items())),
+                'arcs': [
+                    value for (start, end), count in arcs.items()
+                    for value in (start, end, count)
+                ],
+            }
+            for filename, (lines, arcs) in self.counts.items() if lines
+        }
+        if not counts:
+            return
+        path = (
+            f'{counts_path(data_file)}.{socket.gethostname()}.{os.getpid()}.'
+            f'{random.randint(0, 999999):06d}'
+        )
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(f'{path}.partial', 'wt', encoding='utf-8') as stream:
+            json.dump(counts, stream)
+        os.replace(f'{path}.partial', path)
+
+
+def _branch_arc(code: CodeType, offset: int, destination: int) -> Arc | None:
+    """
+    The (from, to) line arc of a branch between bytecode offsets.
+
+    A branch can land on more code of its own line, as a ``for`` loop going
+    round does on storing its target: the arc then goes to the next line run.
+    """
+    lines = {
+        at: line for start, end, line in code.co_lines()
+        if line is not None for at in range(start, end, 2)
+    }
+    start = lines.get(offset)
+    end = lines.get(destination)
+    while end == start and destination in lines:
+        destination += 2
+        end = lines.get(destination, end)
+    if start is None or end is None:
+        return None
+    return start, end
+
+
+def load_counts(data_file: str) -> dict[str, FileCounts]:
+    """
+    Read and sum the hit counts saved for the coverage.py ``data_file``.
+
+    Unreadable count files are skipped.
+    """
+    counts: dict[str, FileCounts] = {}
+    for path in _saved_counts(data_file):
+        if path.endswith('.partial'):
+            continue
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as stream:
+                saved = json.load(stream)
+        except (OSError, ValueError) as e:
+            log.debug('Could not read hit counts %s: %s', path, e)
+            continue
+        for filename, file_counts in saved.items():
+            lines, arcs = counts.setdefault(filename, ({}, {}))
+            flat = file_counts['lines']
+            for line, count in zip(flat[::2], flat[1::2]):
+                lines[line] = lines.get(line, 0) + count
+            flat = file_counts['arcs']
+            for start, end, count in zip(flat[::3], flat[1::3], flat[2::3]):
+                arcs[start, end] = arcs.get((start, end), 0) + count
+    return counts
+
+
+class CountingPlugin(coverage.CoveragePlugin):
+    """
+    Count hits while coverage.py measures, on Python 3.12+.
+
+    Enable it with ``plugins = coveralls.counting`` in coverage.py's ``[run]``
+    configuration. The counts are saved beside the data file when the
+    process exits, for :class:`.CoverallReporter` to report.
+    """
+
+    def configure(self, config: Any) -> None:
+        global _plugin_counter  # pylint: disable=global-statement
+        if _plugin_counter is not None:
+            return
+        if _MONITORING is None:
+            log.warning(
+                'Counting hits needs Python 3.12 or later; reporting lines '
+                'as hit or not',
+            )
+            return
+        data_file = os.path.abspath(str(config.get_option('run:data_file')))
+        _plugin_counter = HitCounter()
+        # coverage.py also loads its plugins when only reporting.
+        _plugin_counter.require_coverage = True
+        _plugin_counter.data_file = data_file
+        if _plugin_counter.start():
+            atexit.register(_plugin_counter.save, data_file)
+
+
+def coverage_init(reg: Any, options: dict[str, str]) -> None:
+    """The coverage.py plugin entry point (see :class:`CountingPlugin`)."""
+    _ = options
+    reg.add_configurer(CountingPlugin())
@@ -0,0 +1,75 @@
+import codecs
+import functools
+import hashlib
+import itertools
+import tokenize
+from collections.abc import Iterator
+from typing import BinaryIO
+
+
+# Source files are digested this many bytes at a time.
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+
+def text_digest(source: str) -> str:
+    """
+    The ``source_digest`` of a source text, as coveralls.io computes it.
+
+    ``source`` is the text as coverage.py reports it, so a file digests the
+    same whether it was sent whole or as a digest, and on every platform.
+    """
+    return hashlib.md5(source.encode('utf-8')).hexdigest()
+
+
+def _normalized(source: BinaryIO) -> Iterator[bytes]:
+    # A file's bytes with the newlines and form feeds coverage.py rewrites
+    # when it reads a Python source, rewritten the same way.
+    pending = b''
+    for chunk in iter(
+            functools.partial(source.read, DIGEST_CHUNK_SIZE), b'',
+    ):
+        chunk = pending + chunk
+        # a \r at the end may be the first half of a \r\n
+        pending = chunk[-1:] if chunk.endswith(b'\r') else b''
+        chunk = chunk[:len(chunk) - len(pending)]
+        chunk = chunk.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        yield chunk.replace(b'\f', b' ')
+    if pending:
+        yield b'\n'
+
+
+def stream_digest(path: str) -> tuple[str, int]:
+    """
+    Digest a Python source file as coverage.py reads it, and count its lines.
+
+    Gives the :func:`text_digest` and :meth:`.CoverallReporter.count_lines` of
+    ``get_python_source(path)``, the file decoded and with its newlines
+    normalized, but reads it a chunk at a time rather than all at once.
+    """
+    digest = hashlib.md5()
+    lines = 0
+    last = ''
+    with open(path, 'rb') as source:
+        chunks = _normalized(source)
+        # The encoding is declared in the first two lines, if at all.
+        head = b''
+        for chunk in chunks:
+            head += chunk
+            if head.count(b'\n') >= 2:
+                break
+        encoding, _ = tokenize.detect_encoding(
+            iter(head.splitlines(keepends=True)).__next__,
+        )
+        decoder = codecs.getincrementaldecoder(encoding)('replace')
+        for text in itertools.chain(
+                [decoder.decode(head)], map(decoder.decode, chunks),
+                [decoder.decode(b'', final=True)],
+        ):
+            digest.update(text.encode('utf-8'))
+            lines += text.count('\n')
+            last = text[-1:] or last
+    # coverage.py ends the last line if the file does not
+    if last not in {'', '\n'}:
+        digest.update(b'\n')
+        lines += 1
+    return digest.hexdigest(), lines
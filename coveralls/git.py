@@ -3,9 +3,30 @@ import os
 import subprocess
 from typing import Any
 
+from .gitdir import read_repository
+from .gitobjects import UnsupportedRepository
 
 log = logging.getLogger('coveralls.git')
 
+# Every HEAD field git_info reports, fetched with a single `git log` in this
+# order. They are NUL-separated, since a subject or name may contain anything
+# but a NUL. %D (HEAD's ref names) comes last and yields the current branch;
+# see HEAD_DECORATIONS.
+HEAD_FIELDS = (
+    ('id', '%H'),
+    ('author_name', '%aN'),
+    ('author_email', '%ae'),
+    ('committer_name', '%cN'),
+    ('committer_email', '%ce'),
+    ('message', '%s'),
+)
+HEAD_FORMAT = '%x00'.join([fmt for _, fmt in HEAD_FIELDS] + ['%D'])
+# Limit %D to HEAD and local branches: "HEAD -> main" on a branch, a bare
+# "HEAD" when detached. Explicit --decorate-refs also override any
+# log.excludeDecoration config that could otherwise hide either, and spare
+# git from loading every tag and remote ref.
+HEAD_DECORATIONS = ('--decorate-refs=HEAD', '--decorate-refs=refs/heads/')
+
 
 def run_command(*args: str) -> str:
     try:
@@ -22,13 +43,48 @@ def run_command(*args: str) -> str:
     return cmd.stdout.decode('utf-8').strip()
 
 
-def gitlog(fmt: str) -> str:
+def gitlog(fmt: str, *args: str) -> str:
     return run_command(
-        'git', '--no-pager', 'log', '-1', f'--pretty=format:{fmt}',
+        'git', '--no-pager', 'log', '-1', f'--pretty=format:{fmt}', *args,
     )
 
 
-def git_branch() -> str | None:
+def git_head() -> tuple[dict[str, str | None], str]:
+    """
+    Collect the HEAD commit's details with a single ``git log`` call.
+
+    Returns the ``head`` entry of :func:`git_info` along with HEAD's ref names
+    (``git log --pretty=%D``), which :func:`git_branch` can read the current
+    branch from.
+    """
+    *values, refs = gitlog(HEAD_FORMAT, *HEAD_DECORATIONS).split('\0')
+    if len(values) != len(HEAD_FIELDS):
+        raise RuntimeError(f'Unexpected git log output: {values!r}')
+    head: dict[str, str | None] = {
+        name: value for (name, _), value in zip(HEAD_FIELDS, values)
+    }
+    return head, refs
+
+
+def _branch_from_refs(refs: str) -> str | None:
+    # A detached HEAD reads as "HEAD", just as `git rev-parse --abbrev-ref`
+    # reports it. Ref names cannot contain spaces, so splitting on ", " is
+    # safe.
+    for ref in refs.split(', '):
+        if ref == 'HEAD':
+            return ref
+        if ref.startswith('HEAD -> '):
+            return ref.removeprefix('HEAD -> ')
+    return None
+
+
+def git_branch(current: str | None = None) -> str | None:
+    """
+    Resolve the branch being built, preferring the CI environment.
+
+    ``current`` is the checked-out branch (``'HEAD'`` when detached), if
+    already known; otherwise git is asked for it.
+    """
     branch = None
     if os.environ.get('GITHUB_ACTIONS'):
         github_ref = os.environ.get('GITHUB_REF')
@@ -53,12 +109,37 @@ def git_branch() -> str | None:
             or os.environ.get('GIT_BRANCH')
             or os.environ.get('TRAVIS_BRANCH')
             or os.environ.get('BRANCH_NAME')
+            or current
             or run_command('git', 'rev-parse', '--abbrev-ref', 'HEAD')
         )
 
     return branch
 
 
+def read_git() -> tuple[
+    dict[str, str | None], str | None, list[dict[str, str | None]],
+]:
+    """
+    Read HEAD's details, the checked-out branch and the remotes.
+
+    The .git directory is read directly (see :class:`coveralls.gitdir.GitDir`)
+    so no git process is spawned; repositories it leaves to git are read with
+    two git commands instead. The branch is None if git did not report it.
+    """
+    try:
+        return read_repository()
+    except UnsupportedRepository as e:
+        log.debug('Reading git data with the git command: %s', e)
+
+    head, refs = git_head()
+    remotes: list[dict[str, str | None]] = [
+        {'name': line.split()[0], 'url': line.split()[1]}
+        for line in run_command('git', 'remote', '-v').splitlines()
+        if '(fetch)' in line
+    ]
+    return head, _branch_from_refs(refs), remotes
+
+
 def git_info() -> dict[str, dict[str, Any]]:
     """
     A hash of Git data that can be used to display more information to users.
@@ -85,20 +166,8 @@ def git_info() -> dict[str, dict[str, Any]]:
     remotes: list[dict[str, str | None]]
 
     try:
-        branch = git_branch()
-        head = {
-            'id': gitlog('%H'),
-            'author_name': gitlog('%aN'),
-            'author_email': gitlog('%ae'),
-            'committer_name': gitlog('%cN'),
-            'committer_email': gitlog('%ce'),
-            'message': gitlog('%s'),
-        }
-        remotes = [
-            {'name': line.split()[0], 'url': line.split()[1]}
-            for line in run_command('git', 'remote', '-v').splitlines()
-            if '(fetch)' in line
-        ]
+        head, current, remotes = read_git()
+        branch = git_branch(current)
     except (RuntimeError, OSError) as ex:
         # When git is not available, try env vars as per Coveralls docs:
         # https://docs.coveralls.io/mercurial-support
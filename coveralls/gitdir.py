@@ -0,0 +1,345 @@
+import os
+import pathlib
+import re
+import struct
+import zlib
+from collections.abc import Iterator
+
+from .gitobjects import OBJ_COMMIT
+from .gitobjects import read_object
+from .gitobjects import UnsupportedRepository
+
+
+# Environment variables that change how git finds or reads a repository. When
+# any is set, reading .git ourselves could disagree with git, so we don't.
+GIT_ENVIRONMENT = (
+    'GIT_DIR',
+    'GIT_WORK_TREE',
+    'GIT_COMMON_DIR',
+    'GIT_OBJECT_DIRECTORY',
+    'GIT_ALTERNATE_OBJECT_DIRECTORIES',
+    'GIT_CEILING_DIRECTORIES',
+    'GIT_DISCOVERY_ACROSS_FILESYSTEM',
+    'GIT_NAMESPACE',
+    'GIT_REPLACE_REF_BASE',
+    'GIT_CONFIG',
+    'GIT_CONFIG_GLOBAL',
+    'GIT_CONFIG_SYSTEM',
+    'GIT_CONFIG_COUNT',
+    'GIT_CONFIG_PARAMETERS',
+)
+# Repository extensions that leave refs and objects readable as usual; any
+# other (sha256 objects, reftable refs, ...) is left to git.
+HARMLESS_EXTENSIONS = frozenset({'noop', 'partialclone', 'preciousobjects'})
+# Config that changes what git would report: included files, URL rewrites and
+# mailmaps.
+UNSUPPORTED_SECTIONS = frozenset({'include', 'includeif', 'url', 'mailmap'})
+
+HEX_SHA = re.compile(r'[0-9a-f]{40}')
+# Same bound git itself puts on chains of symbolic refs.
+MAX_SYMREF_DEPTH = 5
+
+_SECTION = re.compile(
+    r'\[\s*([\w.-]+)\s*(?:"((?:[^"\\]|\\.)*)")?\s*\]\s*(?:[#;].*)?',
+)
+_VARIABLE = re.compile(r'([A-Za-z][\w-]*)\s*(?:=(.*))?')
+_CONFIG_ESCAPES = {'n': '\n', 't': '\t', 'b': '\b', '"': '"', '\\': '\\'}
+
+ConfigEntry = tuple[str, str | None, str, str]
+
+
+def _config_value(raw: str) -> str:
+    value: list[str] = []
+    quoted = False
+    chars = iter(raw.strip())
+    for char in chars:
+        if char == '"':
+            quoted = not quoted
+        elif char == '\\':
+            escaped = next(chars, None)
+            if escaped not in _CONFIG_ESCAPES:
+                # Includes a trailing backslash, i.e. a continued line.
+                raise UnsupportedRepository('unsupported config escape')
+            value.append(_CONFIG_ESCAPES[escaped])
+        elif char in '#;' and not quoted:
+            break
+        else:
+            value.append(char)
+    if quoted:
+        raise UnsupportedRepository('unterminated quote in config')
+    return ''.join(value).rstrip()
+
+
+def parse_config(text: str) -> Iterator[ConfigEntry]:
+    """
+    Parse git config ``text`` into (section, subsection, key, value) entries.
+
+    Section and key names are lowercased, as git compares them
+    case-insensitively; subsections keep their case. A key without a value
+    reads as ``'true'``. Syntax this simple parser does not handle raises
+    :class:`UnsupportedRepository`.
+    """
+    section: tuple[str, str | None] | None = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line[0] in '#;':
+            continue
+        if line.startswith('['):
+            match = _SECTION.fullmatch(line)
+            if not match:
+                raise UnsupportedRepository(f'unsupported config: {line}')
+            name, subsection = match.group(1).lower(), match.group(2)
+            if subsection is not None:
+                subsection = re.sub(r'\\(.)', r'\1', subsection)
+            elif '.' in name:
+                # The deprecated [section.subsection] form.
+                name, subsection = name.split('.', 1)
+            section = (name, subsection)
+            continue
+
+        match = _VARIABLE.fullmatch(line)
+        if not match or section is None:
+            raise UnsupportedRepository(f'unsupported config: {line}')
+        value = match.group(2)
+        yield (
+            *section, match.group(1).lower(),
+            'true' if value is None else _config_value(value),
+        )
+
+
+def _check_config(entries: list[ConfigEntry]) -> None:
+    for section, subsection, key, value in entries:
+        if section == 'extensions':
+            supported = key in HARMLESS_EXTENSIONS
+        elif (section, key) == ('core', 'repositoryformatversion'):
+            supported = int(value) <= 1
+        else:
+            supported = (
+                section not in UNSUPPORTED_SECTIONS
+                and (section, key) != ('i18n', 'logoutputencoding')
+            )
+        if not supported:
+            raise UnsupportedRepository(
+                f'unsupported config: {section}.{subsection}.{key}',
+            )
+
+
+def _ident(value: bytes) -> tuple[str, str]:
+    # "Name <email> timestamp tz"
+    name, _, rest = value.partition(b'<')
+    email, _, _ = rest.partition(b'>')
+    return name.strip().decode('utf-8'), email.decode('utf-8')
+
+
+def _subject(message: bytes) -> str:
+    # Like git's %s: the first paragraph, its lines joined by spaces.
+    lines: list[bytes] = []
+    for line in message.split(b'\n'):
+        line = line.rstrip()
+        if line:
+            lines.append(line)
+        elif lines:
+            break
+    return b' '.join(lines).decode('utf-8')
+
+
+def parse_commit(body: bytes) -> dict[str, str | None]:
+    """Extract the author, committer and subject of a raw commit object."""
+    header, _, message = body.partition(b'\n\n')
+    fields: dict[bytes, bytes] = {}
+    for line in header.split(b'\n'):
+        # Lines starting with a space continue a multi-line header (gpgsig).
+        if not line.startswith(b' '):
+            key, _, value = line.partition(b' ')
+            fields.setdefault(key, value)
+
+    if fields.get(b'encoding', b'utf-8').lower() not in (b'utf-8', b'utf8'):
+        raise UnsupportedRepository('commit is not UTF-8 encoded')
+    author_name, author_email = _ident(fields[b'author'])
+    committer_name, committer_email = _ident(fields[b'committer'])
+    return {
+        'author_name': author_name,
+        'author_email': author_email,
+        'committer_name': committer_name,
+        'committer_email': committer_email,
+        'message': _subject(message),
+    }
+
+
+class GitDir:
+    """
+    Read-only access to the parts of a .git directory coveralls reports.
+
+    Resolves HEAD through loose and packed refs and reads the commit it points
+    at from a loose object or a pack (following delta chains), without running
+    git. Anything beyond the common on-disk layout -- worktrees, alternates,
+    replace refs, mailmaps, includes, URL rewrites -- raises
+    :class:`UnsupportedRepository` so the caller can ask git instead.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self.config = self._read_config()
+        self._packed_refs: dict[str, str] | None = None
+
+    @classmethod
+    def discover(cls, start: str = '.') -> 'GitDir':
+        """Find the .git directory of the work tree containing ``start``."""
+        blocked = [var for var in GIT_ENVIRONMENT if var in os.environ]
+        if blocked:
+            raise UnsupportedRepository(f'{blocked[0]} is set')
+
+        start_path = pathlib.Path(start).resolve()
+        device = start_path.stat().st_dev
+        for directory in (start_path, *start_path.parents):
+            if directory.stat().st_dev != device:
+                # git stops at filesystem boundaries; leave the verdict to it
+                break
+            dotgit = directory / '.git'
+            if dotgit.is_dir():
+                return cls(dotgit)
+            if dotgit.exists():
+                raise UnsupportedRepository('.git is a file (worktree?)')
+        raise UnsupportedRepository('no .git directory found')
+
+    def _read_config(self) -> list[ConfigEntry]:
+        for unsupported in (
+                'commondir', 'objects/info/alternates',
+                'objects/info/http-alternates',
+        ):
+            if (self.path / unsupported).exists():
+                raise UnsupportedRepository(f'repository has {unsupported}')
+        if (self.path.parent / '.mailmap').exists():
+            raise UnsupportedRepository('work tree has a .mailmap')
+
+        home = pathlib.Path(os.path.expanduser('~'))
+        xdg = os.environ.get('XDG_CONFIG_HOME') or home / '.config'
+        entries: list[ConfigEntry] = []
+        paths = [
+            pathlib.Path(xdg, 'git/config'), home / '.gitconfig',
+            self.path / 'config',
+        ]
+        if not os.environ.get('GIT_CONFIG_NOSYSTEM'):
+            paths.insert(0, pathlib.Path('/etc/gitconfig'))
+        for path in paths:
+            try:
+                entries.extend(parse_config(path.read_text(encoding='utf-8')))
+            except FileNotFoundError:
+                continue
+
+        _check_config(entries)
+        return entries
+
+    @property
+    def packed_refs(self) -> dict[str, str]:
+        if self._packed_refs is None:
+            self._packed_refs = {}
+            try:
+                text = (self.path / 'packed-refs').read_text(encoding='utf-8')
+            except FileNotFoundError:
+                text = ''
+            for line in text.splitlines():
+                if line and line[0] not in '#^':
+                    sha, _, name = line.partition(' ')
+                    self._packed_refs[name] = sha
+        return self._packed_refs
+
+    def _ref_exists(self, name: str) -> bool:
+        return (self.path / name).is_file() or name in self.packed_refs
+
+    def resolve(self, name: str) -> str | None:
+        """Resolve ref ``name`` to a commit id, or None if it is missing."""
+        for _ in range(MAX_SYMREF_DEPTH):
+            if '..' in name.split('/'):
+                raise UnsupportedRepository(f'suspicious ref name {name}')
+            try:
+                content = (self.path / name).read_text(encoding='utf-8')
+            except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+                packed = self.packed_refs.get(name)
+                if packed is None:
+                    return None
+                content = packed
+
+            content = content.strip()
+            if content.startswith('ref: '):
+                name = content.removeprefix('ref: ')
+            elif HEX_SHA.fullmatch(content):
+                return content
+            else:
+                raise UnsupportedRepository(f'unsupported ref {name}')
+        raise UnsupportedRepository('symbolic ref chain too deep')
+
+    def head(self) -> tuple[dict[str, str | None], str]:
+        """
+        Read the HEAD commit and the current branch.
+
+        The commit is reported in :func:`coveralls.git.git_info`'s ``head``
+        shape. The branch is named as ``git rev-parse --abbrev-ref HEAD``
+        would: its short name, or ``'HEAD'`` when detached.
+        """
+        content = (self.path / 'HEAD').read_text(encoding='utf-8').strip()
+        if content.startswith('ref: refs/heads/'):
+            branch = content.removeprefix('ref: refs/heads/')
+            # git abbreviates to the shortest unambiguous name; bail out
+            # rather than reimplement that when another ref shares the name.
+            if any(
+                self._ref_exists(ambiguous) for ambiguous in (
+                    f'refs/{branch}', f'refs/tags/{branch}',
+                    f'refs/remotes/{branch}', f'refs/remotes/{branch}/HEAD',
+                )
+            ):
+                raise UnsupportedRepository(f'ambiguous branch {branch}')
+            sha = self.resolve(f'refs/heads/{branch}')
+        elif HEX_SHA.fullmatch(content):
+            branch, sha = 'HEAD', content
+        else:
+            raise UnsupportedRepository(f'unsupported HEAD: {content}')
+        if sha is None:
+            raise UnsupportedRepository('HEAD has no commits yet')
+
+        if (self.path / 'refs/replace').is_dir() and any(
+            (self.path / 'refs/replace').iterdir(),
+        ) or any(ref.startswith('refs/replace/') for ref in self.packed_refs):
+            raise UnsupportedRepository('repository has replace refs')
+
+        kind, body = self.read_object(sha)
+        if kind != OBJ_COMMIT:
+            raise UnsupportedRepository(f'HEAD {sha} is not a commit')
+        return {'id': sha} | parse_commit(body), branch
+
+    def remotes(self) -> list[dict[str, str | None]]:
+        """List remotes and their fetch URLs, as ``git remote -v`` does."""
+        for legacy in ('remotes', 'branches'):
+            folder = self.path / legacy
+            if folder.is_dir() and any(folder.iterdir()):
+                raise UnsupportedRepository(f'repository has {legacy}/')
+
+        urls: dict[str, str] = {}
+        for section, subsection, key, value in self.config:
+            if section == 'remote' and key == 'url' and subsection:
+                urls.setdefault(subsection, value)
+        return [{'name': name, 'url': urls[name]} for name in sorted(urls)]
+
+    def read_object(self, sha: str) -> tuple[int, bytes]:
+        """Read object ``sha`` as its type and raw content."""
+        return read_object(self.path / 'objects', sha)
+
+
+def read_repository(
+        start: str = '.',
+) -> tuple[dict[str, str | None], str, list[dict[str, str | None]]]:
+    """
+    Read HEAD, the current branch and the remotes without running git.
+
+    Any failure to read the repository, including the layouts
+    :class:`GitDir` leaves to git, raises :class:`UnsupportedRepository`.
+    """
+    try:
+        repo = GitDir.discover(start)
+        head, branch = repo.head()
+        return head, branch, repo.remotes()
+    except (
+        OSError, ValueError, KeyError, IndexError, struct.error,
+        zlib.error,
+    ) as e:
+        raise UnsupportedRepository(f'could not read repository: {e}') from e
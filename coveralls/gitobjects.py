@@ -0,0 +1,175 @@
+import mmap
+import pathlib
+import struct
+import zlib
+
+
+PACK_INDEX_MAGIC = b'\377tOc'
+OBJ_COMMIT = 1
+OBJ_OFS_DELTA = 6
+OBJ_REF_DELTA = 7
+# Compressed pack data is inflated this many bytes at a time.
+INFLATE_CHUNK = 64 * 1024
+
+
+class UnsupportedRepository(Exception):
+    """The repository uses something the native reader leaves to git."""
+
+
+def _delta_size(delta: bytes, pos: int) -> tuple[int, int]:
+    size = shift = 0
+    while True:
+        byte = delta[pos]
+        pos += 1
+        size |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return size, pos
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """Rebuild an object from its ``base`` and a pack ``delta`` against it."""
+    source_size, pos = _delta_size(delta, 0)
+    target_size, pos = _delta_size(delta, pos)
+    if source_size != len(base):
+        raise UnsupportedRepository('delta does not match its base')
+
+    target = bytearray()
+    while pos < len(delta):
+        opcode = delta[pos]
+        pos += 1
+        if opcode & 0x80:
+            # Copy a range of the base: the low bits flag which offset and
+            # size bytes follow, least significant first.
+            offset = size = 0
+            for i in range(4):
+                if opcode & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if opcode & (0x10 << i):
+                    size |= delta[pos] << (8 * i)
+                    pos += 1
+            target += base[offset:offset + (size or 0x10000)]
+        elif opcode:
+            # Insert the next ``opcode`` bytes of the delta itself.
+            target += delta[pos:pos + opcode]
+            pos += opcode
+        else:
+            raise UnsupportedRepository('reserved delta opcode')
+
+    if len(target) != target_size:
+        raise UnsupportedRepository('delta produced the wrong size')
+    return bytes(target)
+
+
+def read_object(objects: pathlib.Path, sha: str) -> tuple[int, bytes]:
+    """
+    Read object ``sha`` of an ``objects`` directory as its type and content.
+
+    The object is read from its loose file or else from a pack, following
+    delta chains. Only commits are told apart: any other type reads as 0.
+    """
+    loose = objects / sha[:2] / sha[2:]
+    try:
+        raw = zlib.decompress(loose.read_bytes())
+    except FileNotFoundError:
+        return _read_packed(objects, sha)
+
+    header, _, body = raw.partition(b'\0')
+    kind = header.split(b' ')[0]
+    return (OBJ_COMMIT if kind == b'commit' else 0), body
+
+
+def _read_packed(objects: pathlib.Path, sha: str) -> tuple[int, bytes]:
+    binsha = bytes.fromhex(sha)
+    for index in sorted((objects / 'pack').glob('*.idx')):
+        offset = _pack_offset(index, binsha)
+        if offset is not None:
+            with index.with_suffix('.pack').open('rb') as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ,
+            ) as pack:
+                return _unpack(objects, pack, offset)
+    raise UnsupportedRepository(f'object {sha} not found')
+
+
+def _unpack(
+        objects: pathlib.Path, pack: mmap.mmap, offset: int,
+) -> tuple[int, bytes]:
+    # Walk a delta chain down to its base, then apply the deltas back up.
+    deltas: list[bytes] = []
+    while True:
+        kind, pos = _pack_header(pack, offset)
+        if kind == OBJ_OFS_DELTA:
+            byte = pack[pos]
+            pos += 1
+            distance = byte & 0x7f
+            while byte & 0x80:
+                byte = pack[pos]
+                pos += 1
+                distance = ((distance + 1) << 7) | (byte & 0x7f)
+            deltas.append(_inflate(pack, pos))
+            offset -= distance
+        elif kind == OBJ_REF_DELTA:
+            base = pack[pos:pos + 20].hex()
+            deltas.append(_inflate(pack, pos + 20))
+            kind, data = read_object(objects, base)
+            break
+        else:
+            data = _inflate(pack, pos)
+            break
+
+    for delta in reversed(deltas):
+        data = apply_delta(data, delta)
+    return kind, data
+
+
+def _pack_offset(index: pathlib.Path, binsha: bytes) -> int | None:
+    # Binary search a version 2 pack index for the object's pack offset.
+    with index.open('rb') as f, mmap.mmap(
+        f.fileno(), 0, access=mmap.ACCESS_READ,
+    ) as idx:
+        if idx[:8] != PACK_INDEX_MAGIC + struct.pack('>I', 2):
+            raise UnsupportedRepository(f'unsupported pack index {index}')
+        fanout = struct.unpack_from('>256I', idx, 8)
+        count = fanout[255]
+        names = 8 + 256 * 4
+        low = fanout[binsha[0] - 1] if binsha[0] else 0
+        high = fanout[binsha[0]]
+        while low < high:
+            mid = (low + high) // 2
+            name = idx[names + mid * 20:names + mid * 20 + 20]
+            if name < binsha:
+                low = mid + 1
+            elif name > binsha:
+                high = mid
+            else:
+                offsets = names + count * 24
+                (offset,) = struct.unpack_from('>I', idx, offsets + mid * 4)
+                if offset & 0x80000000:
+                    large = offsets + count * 4 + (offset & 0x7fffffff) * 8
+                    (offset,) = struct.unpack_from('>Q', idx, large)
+                return int(offset)
+    return None
+
+
+def _pack_header(pack: mmap.mmap, offset: int) -> tuple[int, int]:
+    # Type in bits 4-6 of the first byte, then the (unneeded) size varint.
+    byte = pack[offset]
+    kind = (byte >> 4) & 7
+    while byte & 0x80:
+        offset += 1
+        byte = pack[offset]
+    return kind, offset + 1
+
+
+def _inflate(pack: mmap.mmap, pos: int) -> bytes:
+    inflater = zlib.decompressobj()
+    data = []
+    while not inflater.eof:
+        chunk = pack[pos:pos + INFLATE_CHUNK]
+        if not chunk:
+            raise UnsupportedRepository('truncated pack')
+        data.append(inflater.decompress(chunk))
+        pos += len(chunk)
+    return b''.join(data)
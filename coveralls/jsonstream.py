@@ -0,0 +1,182 @@
+import codecs
+import contextlib
+import gzip
+import json
+import pathlib
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import Any
+from typing import cast
+from typing import IO
+from typing import TextIO
+
+from .vectors import json_default
+
+# Bytes read from the report at a time. A value that does not fit in what has
+# been read so far makes the next read as large as everything buffered, so
+# however large an entry is, it is parsed in a few passes, not many.
+CHUNK_SIZE = 1024 * 1024
+WHITESPACE = ' \t\n\r'
+GZIP_MAGIC = b'\x1f\x8b'
+_DECODER = json.JSONDecoder()
+
+
+class ReportReader:
+    """
+    Incrementally parse a coveralls-style JSON report from a binary file.
+
+    Iterating yields the entries of the report's ``source_files`` list one at
+    a time, as they are read; every other top-level value is collected into
+    ``header``. Only the entry being parsed (and a chunk of the file) is held
+    in memory at any time, rather than the whole file and the whole object
+    tree that ``json.load`` builds. Raises ValueError on malformed JSON.
+    """
+
+    def __init__(self, fileobj: IO[bytes]) -> None:
+        self.has_source_files = False
+        self.header: dict[str, Any] = {}
+        self._file = fileobj
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Read more of the file into the buffer; False once it is all read."""
+        if self._eof:
+            return False
+        size = max(CHUNK_SIZE, len(self._buffer) - self._pos)
+        data = self._file.read(size)
+        self._eof = not data
+        self._buffer = (
+            self._buffer[self._pos:]
+            + self._decoder.decode(data, final=self._eof)
+        )
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Skip whitespace and return the next character ('' at the end)."""
+        while True:
+            while (
+                    self._pos < len(self._buffer)
+                    and self._buffer[self._pos] in WHITESPACE
+            ):
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill():
+                return self._buffer[self._pos:self._pos + 1]
+
+    def _expect(self, *chars: str) -> str:
+        char = self._peek()
+        if not char or char not in chars:
+            found = repr(char) if char else 'end of file'
+            raise ValueError(
+                f'Malformed report: expected {" or ".join(chars)}, found '
+                f'{found}',
+            )
+        self._pos += 1
+        return char
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Possibly just cut off by the end of the buffer.
+                if not self._fill():
+                    raise
+                continue
+            # A number ending the buffer may continue past it.
+            if end < len(self._buffer) or not self._fill():
+                self._pos = end
+                return value
+
+    def __iter__(self) -> Iterator[Any]:
+        self._expect('{')
+        if self._peek() == '}':
+            return
+        while True:
+            key = self._value()
+            if not isinstance(key, str):
+                raise ValueError('Malformed report: expected a key')
+            self._expect(':')
+            if key == 'source_files':
+                self.has_source_files = True
+                yield from self._list()
+            else:
+                self.header[key] = self._value()
+            if self._expect(',', '}') == '}':
+                return
+
+    def _list(self) -> Iterator[Any]:
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._expect(',', ']') == ']':
+                return
+
+
+def open_report(path: str) -> IO[bytes]:
+    """Open a report for reading, decompressing it if it is gzipped."""
+    # pylint: disable-next=consider-using-with
+    report = open(path, 'rb')
+    if report.read(len(GZIP_MAGIC)) == GZIP_MAGIC:
+        report.close()
+        return cast(IO[bytes], gzip.open(path, 'rb'))
+    report.seek(0)
+    return report
+
+
+def dump(
+        stream: TextIO, source_files: Iterable[dict[str, Any]],
+        header: dict[str, Any],
+) -> int:
+    """
+    Serialize a report to ``stream`` one source file at a time.
+
+    Writes exactly what ``json.dumps({'source_files': [...], **header})``
+    would, hit vectors (see :mod:`.vectors`) as lists, and returns the number
+    of source files written.
+    """
+    count = 0
+    stream.write('{"source_files": [')
+    for source_file in source_files:
+        if count:
+            stream.write(', ')
+        stream.write(json.dumps(source_file, default=json_default))
+        count += 1
+    stream.write(']')
+    for key, value in header.items():
+        stream.write(f', {json.dumps(key)}: {json.dumps(value)}')
+    stream.write('}')
+    return count
+
+
+@contextlib.contextmanager
+def report_writer(
+        path: pathlib.Path, compress_level: int | None = None,
+) -> Iterator[TextIO]:
+    """
+    Open ``path`` for writing a report, gzipped at ``compress_level`` if set.
+
+    The report goes to a temporary sibling that replaces ``path`` only once
+    the block completes, so a failure never leaves a truncated report behind.
+    """
+    partial = path.with_name(f'{path.name}.partial')
+    stream: TextIO
+    try:
+        if compress_level is None:
+            stream = partial.open('w', encoding='utf-8')
+        else:
+            stream = gzip.open(
+                partial, 'wt', encoding='utf-8', compresslevel=compress_level,
+            )
+        with stream:
+            yield stream
+        partial.replace(path)
+    finally:
+        partial.unlink(missing_ok=True)
@@ -0,0 +1,248 @@
+import collections
+import glob
+import itertools
+import logging
+import queue
+import threading
+from collections.abc import Generator
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from .digest import text_digest
+from .jsonstream import open_report
+from .jsonstream import ReportReader
+from .vectors import Branches
+from .vectors import compact
+from .vectors import LineHits
+
+
+log = logging.getLogger('coveralls.merge')
+
+# Source files parsed ahead of the merge, per report being read.
+READ_AHEAD = 64
+_END = object()
+
+
+def source_digest(source_file: dict[str, Any]) -> str | None:
+    """The MD5 of a source file entry's source, as coveralls.io computes it."""
+    if 'source_digest' in source_file:
+        digest: str = source_file['source_digest']
+        return digest
+    if 'source' in source_file:
+        return text_digest(source_file['source'])
+    return None
+
+
+def combine_coverage(
+        first: Sequence[int | None], second: Sequence[int | None],
+) -> LineHits:
+    """
+    Sum two per-line hit arrays.
+
+    A line stays None (not relevant) only if it is None in both; otherwise the
+    hits are added, treating None as zero.
+    """
+    return LineHits(
+        None if a is b is None else (a or 0) + (b or 0)
+        for a, b in itertools.zip_longest(first, second)
+    )
+
+
+def combine_branches(
+        first: Sequence[int], second: Sequence[int],
+) -> Branches:
+    """
+    Union two flat ``[line, block, branch, hits, ...]`` branch lists.
+
+    Branches present in both have their hits summed; the rest keep their
+    order, those of ``first`` first.
+    """
+    hits: dict[tuple[int, ...], int] = {}
+    for branches in (first, second):
+        for i in range(0, len(branches), 4):
+            key = tuple(branches[i:i + 3])
+            hits[key] = hits.get(key, 0) + branches[i + 3]
+    return Branches(
+        value for key, count in hits.items() for value in (*key, count)
+    )
+
+
+def combine(
+        first: dict[str, Any], second: dict[str, Any],
+) -> dict[str, Any]:
+    """
+    Combine two entries for the same source file into a new one.
+
+    Raises ValueError if they were made from different versions of the file,
+    in which case their line numbers (and so their hits) do not correspond.
+    """
+    digests = (source_digest(first), source_digest(second))
+    if None not in digests and digests[0] != digests[1]:
+        raise ValueError(
+            f'Cannot merge coverage of {first["name"]}: the reports were '
+            f'made from different versions of the file',
+        )
+
+    combined = first.copy()
+    for key, value in second.items():
+        combined.setdefault(key, value)
+    combined['coverage'] = combine_coverage(
+        first.get('coverage', []), second.get('coverage', []),
+    )
+    if 'branches' in first or 'branches' in second:
+        combined['branches'] = combine_branches(
+            first.get('branches', []), second.get('branches', []),
+        )
+    return combined
+
+
+class SourceFiles:
+    """
+    Source file entries indexed by name.
+
+    Adding an entry for a file that is already present combines the two (see
+    :func:`combine`) instead of reporting the file twice, so merging any
+    number of reports takes time linear in their total number of files.
+    Entries are held with their hits as compact vectors (see :mod:`.vectors`).
+    """
+
+    def __init__(self) -> None:
+        self._files: dict[str, dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        return iter(self._files.values())
+
+    def add(self, source_file: dict[str, Any]) -> None:
+        # compacted in a copy: the caller's entry is left as it was given
+        source_file = compact(source_file.copy())
+        name = source_file['name']
+        if name in self._files:
+            source_file = combine(self._files[name], source_file)
+        self._files[name] = source_file
+
+    def extend(self, source_files: Iterable[dict[str, Any]]) -> None:
+        for source_file in source_files:
+            self.add(source_file)
+
+    def merged_into(
+            self, source_files: Iterable[dict[str, Any]],
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Yield ``source_files`` combined with these, then the remaining ones.
+
+        ``source_files`` is consumed lazily, one entry at a time, and neither
+        it nor this index is modified.
+        """
+        seen = set()
+        for source_file in source_files:
+            name = source_file['name']
+            if name in self._files:
+                seen.add(name)
+                source_file = combine(source_file, self._files[name])
+            yield source_file
+
+        for name, source_file in self._files.items():
+            if name not in seen:
+                yield source_file
+
+
+def expand(patterns: Iterable[str]) -> list[str]:
+    """
+    Expand glob patterns into the report paths they match, in sorted order.
+
+    Plain paths are kept as given (even if missing, so that reading them
+    reports the error); a pattern matching nothing is only warned about.
+    """
+    paths = []
+    for pattern in patterns:
+        if not glob.has_magic(pattern):
+            paths.append(pattern)
+            continue
+        matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches:
+            log.warning('No reports to merge match %s', pattern)
+        paths.extend(matches)
+    return paths
+
+
+class ReportStream:
+    """
+    The source files of one report, parsed on a worker thread.
+
+    Iterating yields the entries as the worker parses them (see
+    :class:`.ReportReader`), which stays at most ``READ_AHEAD`` entries ahead,
+    and re-raises any error it hit. Once iteration is over,
+    ``has_source_files`` tells whether the report had a ``source_files``
+    list at all, and ``header`` holds its other top-level values.
+    """
+
+    def __init__(self, path: str, closed: threading.Event) -> None:
+        self.path = path
+        self.has_source_files = False
+        self.header: dict[str, Any] = {}
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=READ_AHEAD)
+        self._closed = closed
+
+    def produce(self) -> None:
+        """Parse the report into the queue; runs on a worker thread."""
+        try:
+            with open_report(self.path) as report:
+                reader = ReportReader(report)
+                for source_file in reader:
+                    if not self._put(source_file):
+                        return
+            self.has_source_files = reader.has_source_files
+            self.header = reader.header
+            self._put(_END)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self._put(e)
+
+    def _put(self, item: Any) -> bool:
+        # Give up once the queue is full and nothing will consume it, so an
+        # abandoned merge does not leave the worker blocked forever.
+        while True:
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if self._closed.is_set():
+                    return False
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        while (item := self._queue.get()) is not _END:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+def read_reports(
+        paths: Iterable[str], jobs: int = 1,
+) -> Generator[ReportStream, None, None]:
+    """
+    Read and parse the reports at ``paths`` on ``jobs`` threads.
+
+    Reports are yielded in the order of ``paths``, each to be consumed before
+    the next. At most ``jobs`` of them are read ahead of the one being
+    consumed, each only by ``READ_AHEAD`` entries, so memory stays bounded by
+    a few entries however many and however large the reports are.
+    """
+    closed = threading.Event()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        try:
+            pending: collections.deque[ReportStream] = collections.deque()
+            for path in paths:
+                stream = ReportStream(path, closed)
+                pool.submit(stream.produce)
+                pending.append(stream)
+                if len(pending) > jobs:
+                    yield pending.popleft()
+            while pending:
+                yield pending.popleft()
+        finally:
+            closed.set()
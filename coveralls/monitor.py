@@ -0,0 +1,335 @@
+import contextlib
+import dis
+import functools
+import logging
+import os
+import pathlib
+import runpy
+import shutil
+import sys
+import traceback
+from collections.abc import Callable
+from types import CodeType
+from typing import Any
+
+import coverage
+from coverage.exceptions import NotPython
+from coverage.parser import PythonParser
+
+from .counting import is_project_file
+from .counting import root_dirs
+from .counting import TOOL_IDS
+
+
+log = logging.getLogger('coveralls.monitor')
+
+# PEP 669 monitoring, on Python 3.12+.
+_MONITORING: Any = getattr(sys, 'monitoring', None)
+# 3.14 splits BRANCH into the two ways a branch can go.
+_SPLIT_BRANCHES = hasattr(getattr(_MONITORING, 'events', None), 'BRANCH_LEFT')
+
+# A (from, to) line arc, as coverage.py records it.
+Arc = tuple[int, int]
+
+# Instructions that leave the code object, always jump elsewhere, or may.
+_RETURNS = frozenset({'RETURN_VALUE', 'RETURN_CONST'})
+_JUMPS = frozenset({
+    'JUMP_FORWARD', 'JUMP_BACKWARD', 'JUMP_BACKWARD_NO_INTERRUPT',
+})
+_BRANCHES = frozenset(dis.hasjrel + dis.hasjabs)
+# How many instructions to follow from where a branch lands to the line it
+# leads to.
+_MAX_STEPS = 32
+
+
+class _BranchResolver:
+    """
+    Map the branches of one code object onto coverage.py's line arcs.
+
+    A branch lands on an instruction, which need not start the line the arc
+    goes to: a loop going round first stores its target, say, and a branch
+    leaving the function lands on its implicit ``return``. The resolver
+    follows the code from there to the first line the branch's own line has
+    a possible arc (per coverage.py's parser) to. It stops at another branch
+    on the way, such as the next condition of an ``and``: where that one
+    goes is for its own event to tell.
+    """
+
+    def __init__(
+            self, code: CodeType, parser: PythonParser | None,
+    ) -> None:
+        self.code = code
+        self.possible = set(parser.arcs()) if parser is not None else None
+        self.first_line: Callable[[int], int] = (
+            parser.first_line if parser is not None else int
+        )
+        self.lines = {
+            at: line for start, end, line in code.co_lines()
+            if line is not None for at in range(start, end, 2)
+        }
+        instructions = list(dis.get_instructions(code))
+        self.instructions = {
+            instruction.offset: instruction for instruction in instructions
+        }
+        self.next = {
+            instruction.offset: following.offset
+            for instruction, following in zip(instructions, instructions[1:])
+        }
+
+    def resolve(self, offset: int, destination: int) -> Arc | None:
+        start = self.lines.get(offset)
+        if start is None:
+            return None
+        start = self.first_line(start)
+        if self.possible is not None:
+            arc = self._follow(start, destination)
+            if arc is not None:
+                return arc
+        # not a branch the parser knows of: take the lines as they are
+        end = self.lines.get(destination)
+        if end is None or self.first_line(end) == start:
+            return None
+        return start, self.first_line(end)
+
+    def _follow(self, start: int, at: int) -> Arc | None:
+        assert self.possible is not None
+        for _ in range(_MAX_STEPS):
+            instruction = self.instructions.get(at)
+            if instruction is None:
+                return None
+            line = self.lines.get(at)
+            if line is not None and self.first_line(line) != start:
+                arc = start, self.first_line(line)
+                if arc in self.possible:
+                    return arc
+            if instruction.opname in _RETURNS:
+                arc = start, -self.code.co_firstlineno
+                return arc if arc in self.possible else None
+            if instruction.opname in _JUMPS:
+                at = instruction.argval
+            elif instruction.opcode in _BRANCHES:
+                return None
+            elif at in self.next:
+                at = self.next[at]
+            else:
+                return None
+        return None
+
+
+class Collector:
+    """
+    Record which lines (and branches) of the measured code run.
+
+    Lines and branches are seen with ``sys.monitoring`` (Python 3.12+).
+    Each line's event is disabled once it has fired, and each branch's once
+    it has gone both ways, so measured code soon runs at nearly full speed.
+    The data is saved as coverage.py would record it; as in coverage.py's own
+    ``sysmon`` core, lines are recorded as ``(line, line)`` arcs when
+    measuring branches. Code is measured only in files under ``roots`` (the
+    working directory by default), outside the standard library and
+    installed packages.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+            self, roots: list[str] | None = None, branch: bool = False,
+    ) -> None:
+        self.roots = root_dirs(roots)
+        self.branch = branch
+        self.lines: dict[str, set[int]] = {}
+        self.arcs: dict[str, set[Arc]] = {}
+        self._files: dict[CodeType, str | None] = {}
+        self._parsers: dict[str, PythonParser | None] = {}
+        self._resolvers: dict[CodeType, _BranchResolver] = {}
+        # The (offset, destination) branches seen taken in each code object.
+        self._taken: dict[CodeType, set[tuple[int, int]]] = {}
+        self._tool: int | None = None
+
+    def measured(self, code: CodeType) -> str | None:
+        """The file ``code`` is in, or None if it is not measured."""
+        with contextlib.suppress(KeyError):
+            return self._files[code]
+        filename = os.path.abspath(code.co_filename)
+        measured = filename if is_project_file(filename, self.roots) else None
+        self._files[code] = measured
+        return measured
+
+    def start(self) -> bool:
+        """Start measuring; False if no sys.monitoring tool id is free."""
+        monitoring = _MONITORING
+        for tool in (monitoring.COVERAGE_ID, *TOOL_IDS):
+            try:
+                monitoring.use_tool_id(tool, 'coveralls')
+            except ValueError:
+                continue
+            self._tool = tool
+            break
+        else:
+            log.warning('Cannot measure: no sys.monitoring tool id is free')
+            return False
+
+        events = monitoring.events
+        monitoring.register_callback(tool, events.LINE, self._on_line)
+        selected = events.LINE
+        if self.branch:
+            for event in (
+                    (events.BRANCH_LEFT, events.BRANCH_RIGHT)
+                    if _SPLIT_BRANCHES else (events.BRANCH,)
+            ):
+                monitoring.register_callback(tool, event, self._on_branch)
+                selected |= event
+        monitoring.set_events(tool, selected)
+        return True
+
+    def stop(self) -> None:
+        if self._tool is None:
+            return
+        _MONITORING.set_events(self._tool, 0)
+        _MONITORING.free_tool_id(self._tool)
+        self._tool = None
+
+    def _on_line(self, code: CodeType, line: int) -> Any:
+        filename = self.measured(code)
+        if filename is not None:
+            self.lines.setdefault(filename, set()).add(line)
+        return _MONITORING.DISABLE
+
+    def _on_branch(self, code: CodeType, offset: int, destination: int) -> Any:
+        taken = self._taken.get(code)
+        if taken is None:
+            taken = self._taken[code] = set()
+        elif (offset, destination) in taken:
+            # Before 3.14, one event covers both ways of a branch, so it
+            # keeps firing until the other way has been taken too.
+            return None
+        filename = self.measured(code)
+        if filename is None:
+            return _MONITORING.DISABLE
+        taken.add((offset, destination))
+        arc = self._resolver(code, filename).resolve(offset, destination)
+        if arc is not None:
+            self.arcs.setdefault(filename, set()).add(arc)
+        if _SPLIT_BRANCHES or any(
+                seen == offset and other != destination
+                for seen, other in taken
+        ):
+            return _MONITORING.DISABLE
+        return None
+
+    def _resolver(self, code: CodeType, filename: str) -> _BranchResolver:
+        with contextlib.suppress(KeyError):
+            return self._resolvers[code]
+        if filename not in self._parsers:
+            self._parsers[filename] = _parse(filename)
+        resolver = self._resolvers[code] = _BranchResolver(
+            code, self._parsers[filename],
+        )
+        return resolver
+
+    def save(self, data_file: str) -> None:
+        """Write the data to the coverage.py ``data_file``, replacing it."""
+        data = coverage.CoverageData(basename=data_file)
+        data.erase()
+        if self.branch:
+            data.add_arcs({
+                filename: {(line, line) for line in lines}
+                | self.arcs.get(filename, set())
+                for filename, lines in self.lines.items()
+            })
+        else:
+            data.add_lines(self.lines)
+        data.write()
+        log.info(
+            'Wrote coverage data of %d files to %s',
+            len(self.lines), data_file,
+        )
+
+
+def _parse(filename: str) -> PythonParser | None:
+    parser = PythonParser(filename=filename)
+    try:
+        parser.parse_source()
+    except (NotPython, OSError) as e:
+        log.debug('Could not parse %s: %s', filename, e)
+        return None
+    return parser
+
+
+def _program(argv: list[str]) -> Callable[[], object]:
+    """
+    Prepare to run ``argv`` as ``python`` would: a script, or ``-m MODULE``.
+
+    A command that is not a file is looked up on the PATH, so that a Python
+    console script (``pytest``, say) can be run by name. The returned
+    function sets up ``sys.argv`` and ``sys.path`` for the program and runs
+    it.
+    """
+    if argv[0] == '-m':
+        if len(argv) < 2:
+            raise ValueError('No module to run after -m')
+        program_argv, path0 = argv[1:], str(pathlib.Path.cwd())
+        run = functools.partial(
+            runpy.run_module, argv[1], run_name='__main__', alter_sys=True,
+        )
+    else:
+        path = (
+            argv[0] if pathlib.Path(argv[0]).is_file()
+            else shutil.which(argv[0])
+        )
+        if path is None:
+            raise ValueError(f'No such program: {argv[0]}')
+        program_argv = [path, *argv[1:]]
+        path0 = os.path.dirname(os.path.abspath(path))
+        run = functools.partial(runpy.run_path, path, run_name='__main__')
+
+    def program() -> object:
+        sys.argv = program_argv
+        sys.path[0] = path0
+        return run()
+
+    return program
+
+
+def _exit_status(program: Callable[[], object]) -> int:
+    try:
+        program()
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except Exception:  # pylint: disable=broad-except
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def measure(
+        argv: list[str], data_file: str = '.coverage', branch: bool = False,
+        roots: list[str] | None = None,
+) -> int:
+    """
+    Run a Python program, measuring its coverage into ``data_file``.
+
+    The program is run in this process (see :func:`_program`), under a
+    :class:`Collector`; subprocesses it starts are not measured. Returns the
+    exit status of the program, as ``python`` would exit with.
+    """
+    if _MONITORING is None:
+        raise RuntimeError(
+            'Measuring with sys.monitoring needs Python 3.12 or later; use '
+            'coverage run instead.',
+        )
+    program = _program(argv)
+    collector = Collector(roots, branch=branch)
+    if not collector.start():
+        raise RuntimeError('No sys.monitoring tool id is free')
+    data_file = os.path.abspath(data_file)
+    saved = sys.argv, sys.path.copy()
+    try:
+        return _exit_status(program)
+    finally:
+        collector.stop()
+        sys.argv, sys.path[:] = saved
+        collector.save(data_file)
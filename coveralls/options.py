@@ -0,0 +1,326 @@
+import inspect
+from collections.abc import Callable
+from typing import Annotated
+from typing import Any
+
+import typer
+
+
+# Shared modifier specs, defined once, then bundled into the option groups
+# below. Keeping the option names, help and deprecation status in one place
+# stops them drifting between commands.
+_ServiceName = Annotated[
+    str | None,
+    typer.Option(
+        '--service-name',
+        help='Provide an alternative service name to submit.',
+    ),
+]
+_Service = Annotated[
+    str | None,
+    typer.Option(
+        '--service', hidden=True, help='Deprecated alias for --service-name.',
+    ),
+]
+_Rcfile = Annotated[
+    str | None,
+    typer.Option(
+        '--rcfile',
+        help='Specify the coverage.py config file (default: auto-discovered).',
+    ),
+]
+_BaseDir = Annotated[
+    str | None,
+    typer.Option(
+        '--base-dir',
+        help='Base directory that is removed from reported paths.',
+    ),
+]
+_Basedir = Annotated[
+    str | None,
+    typer.Option(
+        '--basedir', hidden=True, help='Deprecated alias for --base-dir.',
+    ),
+]
+_SrcDir = Annotated[
+    str | None,
+    typer.Option(
+        '--src-dir', help='Source directory added to reported paths.',
+    ),
+]
+_Srcdir = Annotated[
+    str | None,
+    typer.Option(
+        '--srcdir', hidden=True, help='Deprecated alias for --src-dir.',
+    ),
+]
+_Merge = Annotated[
+    list[str] | None,
+    typer.Option(
+        '--merge',
+        help='Merge report from file (or glob pattern) when submitting. '
+             'Repeat to merge several.',
+    ),
+]
+_Parallel = Annotated[
+    bool | None,
+    typer.Option(
+        '--parallel/--no-parallel',
+        help='Submit as one of several parallel jobs to be merged.',
+    ),
+]
+_Jobs = Annotated[
+    int | None,
+    typer.Option(
+        '--jobs',
+        help='Analyze source files with this many worker processes, and '
+             'read --merge reports with as many threads (default: 1).',
+    ),
+]
+_CacheDir = Annotated[
+    str | None,
+    typer.Option(
+        '--cache-dir',
+        help='Reuse report entries for unchanged files from this directory.',
+    ),
+]
+_SpoolDir = Annotated[
+    str | None,
+    typer.Option(
+        '--spool-dir',
+        help='Write the report into this directory for `coveralls drain` to '
+             'upload, instead of uploading it.',
+    ),
+]
+_SourceDigest = Annotated[
+    bool | None,
+    typer.Option(
+        '--source-digest/--no-source-digest',
+        help="Send each file's MD5 digest instead of its source.",
+    ),
+]
+_CacheSize = Annotated[
+    int | None,
+    typer.Option(
+        '--cache-size',
+        help='Maximum size of the report cache, in MB (default: 256).',
+    ),
+]
+_CacheMaxAge = Annotated[
+    int | None,
+    typer.Option(
+        '--cache-max-age',
+        help='Evict cache entries unused for this many days (default: 30).',
+    ),
+]
+_Host = Annotated[
+    str | None,
+    typer.Option('--host', help='Coveralls API host base URL.'),
+]
+_Carryforward = Annotated[
+    str | None,
+    typer.Option(
+        '--carryforward',
+        help='Comma-separated list of parallel job flags to carry forward '
+             'for missing jobs.',
+    ),
+]
+_SkipSslVerify = Annotated[
+    bool | None,
+    typer.Option(
+        '--skip-ssl-verify/--no-skip-ssl-verify',
+        help='Skip verification of the SSL certificate of the host.',
+    ),
+]
+_Verbose = Annotated[
+    bool,
+    typer.Option(
+        '-v', '--verbose',
+        help='Print extra info, always enabled when debugging.',
+    ),
+]
+_Timeout = Annotated[
+    float | None,
+    typer.Option(
+        '--timeout',
+        help='Connect and read timeout, in seconds (default: 10/60).',
+    ),
+]
+_ConnectTimeout = Annotated[
+    float | None,
+    typer.Option(
+        '--connect-timeout', help='Connect timeout, in seconds (default: 10).',
+    ),
+]
+_ReadTimeout = Annotated[
+    float | None,
+    typer.Option(
+        '--read-timeout', help='Read timeout, in seconds (default: 60).',
+    ),
+]
+_Retries = Annotated[
+    int | None,
+    typer.Option(
+        '--retries',
+        help='Retry transient HTTP failures this many times (default: 0). '
+             'Uses exponential backoff with jitter.',
+    ),
+]
+_PoolSize = Annotated[
+    int | None,
+    typer.Option(
+        '--pool-size',
+        help='Keep up to this many connections to the API open for reuse '
+             '(default: 10).',
+    ),
+]
+_Compress = Annotated[
+    bool | None,
+    typer.Option(
+        '--compress/--no-compress',
+        help='Gzip the report sent to (or saved for) coveralls.io.',
+    ),
+]
+_CompressLevel = Annotated[
+    int | None,
+    typer.Option(
+        '--compress-level',
+        help='gzip level for --compress, from 0 to 9 (default: 6).',
+    ),
+]
+_File = Annotated[str, typer.Argument(help='Coverage report file path.')]
+_Uploads = Annotated[
+    list[str],
+    typer.Argument(
+        help='Report files, directories of them, or glob patterns to upload.',
+    ),
+]
+_UploadJobs = Annotated[
+    int | None,
+    typer.Option(
+        '--jobs',
+        help='Upload this many reports at once (default: --pool-size).',
+    ),
+]
+_SpoolDirArgument = Annotated[
+    str | None,
+    typer.Argument(
+        help='Directory of spooled reports (default: $COVERALLS_SPOOL_DIR).',
+    ),
+]
+_Reports = Annotated[
+    list[str],
+    typer.Argument(help='Report files (or glob patterns) to combine.'),
+]
+_ReadJobs = Annotated[
+    int | None,
+    typer.Option('--jobs', help='Read reports on this many threads.'),
+]
+_Tree = Annotated[
+    bool,
+    typer.Option(
+        '--tree',
+        help='Fold the reports in --jobs worker processes at once, then '
+             'combine the results in pairs.',
+    ),
+]
+
+_Program = Annotated[
+    list[str],
+    typer.Argument(
+        metavar='PROGRAM...',
+        help='Python script, console script or -m MODULE to run, with its '
+             'arguments.',
+    ),
+]
+_Branch = Annotated[
+    bool,
+    typer.Option('--branch', help='Measure branch coverage too.'),
+]
+_DataFile = Annotated[
+    str,
+    typer.Option('--data-file', help='coverage.py data file to write.'),
+]
+_Source = Annotated[
+    list[str] | None,
+    typer.Option(
+        '--source',
+        help='Measure code under this directory (default: the current '
+             'one). Repeat to measure several.',
+    ),
+]
+
+# Options bundled by the concern they serve, so a command opts into a whole
+# block with one entry instead of re-listing every parameter. Add a new
+# modifier to the group and every command in that group gains it (e.g. a future
+# retry flag on HTTP_OPTIONS reaches every command that talks to the API).
+# Each value is (annotated type, default). --merge and --parallel live with the
+# collection options: they shape the report a command builds before submitting.
+CollectionOption = tuple[Any, Any]
+COLLECTION_OPTIONS: dict[str, CollectionOption] = {
+    'service_name': (_ServiceName, None),
+    'service': (_Service, None),
+    'rcfile': (_Rcfile, None),
+    'base_dir': (_BaseDir, None),
+    'basedir': (_Basedir, None),
+    'src_dir': (_SrcDir, None),
+    'srcdir': (_Srcdir, None),
+    'merge': (_Merge, None),
+    'parallel': (_Parallel, None),
+    'jobs': (_Jobs, None),
+    'cache_dir': (_CacheDir, None),
+    'cache_size': (_CacheSize, None),
+    'cache_max_age': (_CacheMaxAge, None),
+    'source_digest': (_SourceDigest, None),
+}
+HTTP_OPTIONS: dict[str, CollectionOption] = {
+    'host': (_Host, None),
+    'skip_ssl_verify': (_SkipSslVerify, None),
+    'timeout': (_Timeout, None),
+    'connect_timeout': (_ConnectTimeout, None),
+    'read_timeout': (_ReadTimeout, None),
+    'retries': (_Retries, None),
+    'pool_size': (_PoolSize, None),
+    'compress': (_Compress, None),
+    'compress_level': (_CompressLevel, None),
+}
+
+
+def with_options(
+    *groups: dict[str, CollectionOption],
+) -> Callable[[Callable[..., None]], Callable[..., None]]:
+    """
+    Splice shared option groups into a Typer command's signature.
+
+    Typer derives a command's options purely from its function signature, so
+    sharing a block of options otherwise means repeating those parameters in
+    every command. Instead, each command keeps a ``**opts`` catch-all and this
+    decorator appends the grouped options to the signature Typer introspects;
+    at call time Typer passes their parsed values through ``**opts``.
+    """
+    injected: dict[str, CollectionOption] = {}
+    for group in groups:
+        injected.update(group)
+
+    def decorate(func: Callable[..., None]) -> Callable[..., None]:
+        sig = inspect.signature(func)
+        # Drop the **opts catch-all from the signature Typer sees (it would
+        # otherwise be treated as a positional argument) but keep it on the
+        # real function so the injected values have somewhere to land.
+        params = [
+            p for p in sig.parameters.values()
+            if p.kind is not inspect.Parameter.VAR_KEYWORD
+        ]
+        for name, (annotation, default) in injected.items():
+            params.append(
+                inspect.Parameter(
+                    name, inspect.Parameter.KEYWORD_ONLY,
+                    default=default, annotation=annotation,
+                ),
+            )
+            func.__annotations__[name] = annotation
+        new_signature = sig.replace(parameters=params)
+        func.__signature__ = new_signature  # type: ignore[attr-defined]
+        return func
+
+    return decorate
@@ -1,9 +1,17 @@
+import heapq
 import logging
+import math
+import operator
 import pathlib
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Any
 
 import coverage
 from coverage.plugin import FileReporter
+from coverage.python import get_python_source
+from coverage.python import PythonFileReporter
 from coverage.results import Analysis
 
 try:
@@ -14,24 +22,106 @@ except ImportError:
         get_analysis_to_report,
     )
 
+from .cache import config_digest
+from .cache import file_key
+from .cache import ReportCache
+from .counting import ArcCounts
+from .counting import FileCounts
+from .counting import LineCounts
+from .counting import load_counts
+from .digest import stream_digest
+from .digest import text_digest
+from .sqldata import MeasuredData
+from .sqldata import read_data
+from .statements import ANALYZES_DATA
+from .statements import StatementCache
+from .vectors import Branches
+from .vectors import compact
+from .vectors import LineHits
+
 
 log = logging.getLogger('coveralls.reporter')
 
+# Each worker receives several small slices rather than one large one, so a
+# slice of unusually expensive files cannot leave the other workers idle.
+CHUNKS_PER_JOB = 4
+
+# Per-process state for report workers, set once by _init_worker so every slice
+# a worker handles reuses the same loaded coverage data.
+_worker_state: 'tuple[coverage.Coverage, CoverallReporter] | None' = None
+
+# A report entry paired with the file name that orders it in the report.
+NamedEntry = tuple[str, dict[str, Any]]
+
+
+def _init_worker(
+        cov_kwargs: dict[str, Any], base_dir: str, src_dir: str, digest: bool,
+        cache_args: tuple[str, int, float | None] | None,
+) -> None:
+    # pylint: disable=too-many-arguments
+    global _worker_state  # pylint: disable=global-statement
+    cov = coverage.Coverage(**cov_kwargs)
+    cov.load()
+    reporter = CoverallReporter(
+        cov, base_dir, src_dir, lazy=True, digest=digest,
+        cache=ReportCache(*cache_args) if cache_args else None,
+    )
+    reporter.load_data(cov)
+    _worker_state = (cov, reporter)
+
+
+def _report_chunk(morfs: list[str]) -> list[NamedEntry]:
+    assert _worker_state is not None
+    cov, reporter = _worker_state
+    return list(reporter.analyze_serial(cov, morfs))
+
 
 class CoverallReporter:
-    """Custom coverage.py reporter for coveralls.io."""
+    """
+    Custom coverage.py reporter for coveralls.io.
+
+    By default the report entries of all files are built into
+    :attr:`coverage` on construction. Pass ``lazy=True`` to skip that and
+    stream them one file at a time from :meth:`iter_report` instead. With
+    ``digest=True``, entries carry the MD5 ``source_digest`` of each file in
+    place of its ``source``. Lines and branches are reported as hit once,
+    unless hit counts were saved beside the coverage data (see
+    :mod:`.counting`).
+
+    Where it can, files are analyzed against the coverage data read in bulk
+    (see :mod:`.sqldata`) and cached statement tables (see :mod:`.statements`).
+    """
+
+    # pylint: disable=too-many-instance-attributes
 
     def __init__(
             self,
             cov: coverage.Coverage,
             base_dir: str = '',
             src_dir: str = '',
+            jobs: int = 1,
+            morfs: list[str] | None = None,
+            cache: ReportCache | None = None,
+            lazy: bool = False,
+            digest: bool = False,
     ) -> None:
+        # pylint: disable=too-many-arguments
         self.base_dir = self.sanitize_dir(base_dir)
         self.src_dir = self.sanitize_dir(src_dir)
+        self.jobs = jobs
+        self.morfs = morfs
+        self.cache = cache
+        self.digest = digest
+        self.hit_counts: dict[str, FileCounts] = {}
+        self.data: MeasuredData | None = None
+        self.statements = StatementCache(
+            cov,
+            None if cache is None else cache.substore('statements', '.stmt'),
+        )
 
         self.coverage: list[dict[str, Any]] = []
-        self.report(cov)
+        if not lazy:
+            self.report(cov)
 
     @staticmethod
     def sanitize_dir(directory: str) -> str:
@@ -41,15 +131,211 @@ class CoverallReporter:
                 directory += '/'
         return directory
 
+    def load_data(self, cov: coverage.Coverage) -> None:
+        """Load the hit counts, and the coverage data in bulk where it can."""
+        data_file = cov.get_data().data_filename()
+        self.hit_counts = load_counts(data_file)
+        if self.hit_counts:
+            log.debug('Reporting hit counts of %d files', len(self.hit_counts))
+        self.data = None
+        if ANALYZES_DATA and not cov.config.report_contexts:
+            self.data = read_data(data_file)
+
     def report(self, cov: coverage.Coverage) -> None:
+        self.coverage = list(self.iter_report(cov))
+
+    def iter_report(self, cov: coverage.Coverage) -> Iterator[dict[str, Any]]:
+        """
+        Yield the report entry of every file, in file name order.
+
+        Files with a cached entry are served from the cache and only the rest
+        are analyzed; both streams are merged by name, which is the order
+        coverage.py reports files in. At most one file's entry is held at a
+        time, plus whatever the worker pool has in flight.
+        """
+        self.load_data(cov)
+        morfs = sorted(
+            (self.data or cov.get_data()).measured_files()
+            if self.morfs is None else self.morfs,
+        )
+        if not morfs:
+            return
+
+        keys, cached = self.cache_lookup(cov, morfs)
+        analyzed: Iterator[NamedEntry] = iter(())
+        misses = [morf for morf in morfs if morf not in cached]
+        if misses:
+            analyzed = self.analyze(cov, misses)
+
+        hits: Iterator[NamedEntry | tuple[str, None]] = (
+            (morf, None) for morf in morfs if morf in cached
+        )
+        merged = heapq.merge(hits, analyzed, key=operator.itemgetter(0))
+        for name, entry in merged:
+            if entry is None:
+                entry = self.cached_entry(cov, name, keys[name])
+            elif self.cache is not None and name in keys:
+                self.cache.put(
+                    keys[name], {
+                        field: value for field, value in entry.items()
+                        if field != 'source'
+                    },
+                )
+            if entry is not None:
+                yield entry
+
+        if self.cache is not None:
+            log.debug(
+                'Report cache: %d hits, %d misses',
+                self.cache.hits, self.cache.misses,
+            )
+            self.cache.prune()
+
+    def cache_lookup(
+            self, cov: coverage.Coverage, morfs: list[str],
+    ) -> tuple[dict[str, str], set[str]]:
+        """
+        Find which of ``morfs`` have a cached report entry.
+
+        Returns the cache key of every cacheable file, so entries for the
+        misses can be stored once analyzed, and the set of cached files.
+        """
+        keys: dict[str, str] = {}
+        cached: set[str] = set()
+        if self.cache is None:
+            return keys, cached
+
+        config = config_digest(
+            cov, self.base_dir, self.src_dir,
+            *(['source_digest'] if self.digest else []),
+        )
+        data = self.data or cov.get_data()
+        for morf in morfs:
+            lines, arcs = self.hit_counts.get(morf, ({}, {}))
+            key = file_key(
+                data, morf, config,
+                repr((sorted(lines.items()), sorted(arcs.items()))),
+            )
+            if key is None:
+                continue
+            keys[morf] = key
+            if self.cache.has(key):
+                cached.add(morf)
+        return keys, cached
+
+    def cached_entry(
+            self, cov: coverage.Coverage, morf: str, key: str,
+    ) -> dict[str, Any] | None:
+        """
+        Rebuild a file's report entry from the cache.
+
+        Only the computed fields (including any ``source_digest``) are cached;
+        the source is re-read, decoded and normalized exactly as coverage.py
+        would. If the entry vanished
+        since it was found (e.g. evicted by a concurrent run), the file is
+        analyzed after all.
+        """
+        assert self.cache is not None
+        entry = self.cache.get(key)
+        if entry is None:
+            return next(
+                (entry for _, entry in self.analyze_serial(cov, [morf])),
+                None,
+            )
+        compact(entry)
+        if self.digest:
+            return entry
+        return {
+            'name': entry['name'],
+            'source': get_python_source(morf),
+        } | {field: value for field, value in entry.items() if field != 'name'}
+
+    def analyze(
+            self, cov: coverage.Coverage, morfs: list[str],
+    ) -> Iterator[NamedEntry]:
+        """Analyze ``morfs``, yielding each file's name and report entry."""
+        if self.jobs > 1 and len(morfs) > 1:
+            return self.analyze_parallel(cov, morfs)
+        return self.analyze_serial(cov, morfs)
+
+    def analyze_serial(
+            self, cov: coverage.Coverage, morfs: list[str],
+    ) -> Iterator[NamedEntry]:
         try:
-            for (fr, analysis) in get_analysis_to_report(cov, None):
-                self.parse_file(fr, analysis)
+            for (fr, analysis) in (
+                    get_analysis_to_report(cov, morfs) if self.data is None
+                    else self.statements.analyze(cov, self.data, morfs)
+            ):
+                yield fr.filename, self.parse_file(fr, analysis)
         except coverage.exceptions.NoDataError:
             return
         except Exception as e:
             raise RuntimeError(f'Got coverage library error: {e}') from e
 
+    def analyze_parallel(
+            self, cov: coverage.Coverage, morfs: list[str],
+    ) -> Iterator[NamedEntry]:
+        """
+        Analyze ``morfs`` across a pool of worker processes.
+
+        The file list is cut into slices that are handed out to the workers;
+        each worker loads the coverage data once, from the same config and
+        data file as ``cov``. Slices are yielded back in order.
+
+        When the pool cannot be used (e.g. process spawning is not permitted)
+        the slices not yet reported are analyzed serially instead. Analysis
+        errors raised by a worker propagate.
+        """
+        size = math.ceil(len(morfs) / (self.jobs * CHUNKS_PER_JOB))
+        chunks = [morfs[i:i + size] for i in range(0, len(morfs), size)]
+        cov_kwargs = {
+            'config_file': cov.config.config_file or False,
+            'data_file': cov.config.data_file,
+        }
+
+        log.debug(
+            'Reporting %d files with %d worker processes',
+            len(morfs), self.jobs,
+        )
+        done = 0
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(self.jobs, len(chunks)),
+                initializer=_init_worker,
+                initargs=(
+                    cov_kwargs, self.base_dir, self.src_dir, self.digest,
+                    None if self.cache is None else (
+                        str(self.cache.directory), self.cache.max_size,
+                        self.cache.max_age,
+                    ),
+                ),
+            ) as executor:
+                for result in executor.map(_report_chunk, chunks):
+                    yield from result
+                    done += 1
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            log.warning(
+                'Could not start report worker processes, falling back to '
+                'serial reporting: %s', e,
+            )
+            for chunk in chunks[done:]:
+                yield from self.analyze_serial(cov, chunk)
+
+    @staticmethod
+    def count_lines(source: str) -> int:
+        r"""
+        Count the lines coverage.py reports for a Python source text.
+
+        Equivalent to ``len(list(cu.source_token_lines()))`` without running
+        the tokenizer: every ``\n`` ends a line (so ``\r\n`` counts once),
+        and a final line with no trailing newline counts only when it holds
+        more than whitespace, since the tokenizer emits nothing for it.
+        """
+        lines = source.count('\n')
+        if source[source.rfind('\n') + 1:].strip():
+            lines += 1
+        return lines
+
     @staticmethod
     def get_hits(line_num: int, analysis: Analysis) -> int | None:
         """
@@ -70,7 +356,26 @@ class CoverallReporter:
         return 1
 
     @staticmethod
-    def get_arcs(analysis: Analysis) -> list[int]:
+    def get_line_hits(
+            analysis: Analysis, line_count: int,
+            counts: LineCounts | None = None,
+    ) -> LineHits:
+        """
+        Source file stats for every line, as :meth:`get_hits` would give.
+
+        Builds the whole vector in one pass over the analysis sets rather than
+        testing each line for membership: every line starts out irrelevant,
+        statements are marked covered, then missing statements uncovered.
+        A covered line found in ``counts`` is reported as hit that many times.
+        """
+        return LineHits.of(
+            line_count, analysis.statements, analysis.missing, counts or {},
+        )
+
+    @staticmethod
+    def get_arcs(
+            analysis: Analysis, counts: ArcCounts | None = None,
+    ) -> Branches:
         """
         Hit stats for each branch.
 
@@ -78,8 +383,10 @@ class CoverallReporter:
         1. line-number
         2. block-number (not used)
         3. branch-number
-        4. hits (we only get 1/0 from coverage.py)
+        4. hits (coverage.py only gives 1/0; a taken branch found in
+           ``counts`` is reported as hit that many times)
         """
+        counts = counts or {}
         has_arcs: bool
         try:
             has_arcs = analysis.has_arcs()  # type: ignore[operator]
@@ -88,7 +395,7 @@ class CoverallReporter:
             has_arcs = analysis.has_arcs
 
         if not has_arcs:
-            return []
+            return Branches()
 
         missing_arcs: dict[int, list[int]] = analysis.missing_branch_arcs()
         executed_arcs = analysis.executed_branch_arcs()
@@ -96,14 +403,40 @@ class CoverallReporter:
         branches: list[int] = []
         for l1, l2s in executed_arcs.items():
             for l2 in l2s:
-                branches.extend((l1, 0, abs(l2), 1))
+                hits = max(counts.get((l1, l2), 1), 1)
+                branches.extend((l1, 0, abs(l2), hits))
         for l1, l2s in missing_arcs.items():
             for l2 in l2s:
                 branches.extend((l1, 0, abs(l2), 0))
 
-        return branches
+        return Branches(branches)
+
+    def read_source(self, cu: FileReporter) -> tuple[dict[str, str], int]:
+        """
+        The source field of a file's entry, and its number of lines.
+
+        In digest mode the field is source_digest instead, and a Python file
+        on disk is streamed through :func:`.stream_digest`, never read into
+        memory whole.
+        """
+        is_python = isinstance(cu, PythonFileReporter)
+        if self.digest and is_python and pathlib.Path(cu.filename).is_file():
+            digest, line_count = stream_digest(cu.filename)
+            return {'source_digest': digest}, line_count
+
+        source = cu.source()
+        if is_python:
+            line_count = self.count_lines(source)
+        else:
+            # Plugins define their own notion of a line; ask them.
+            line_count = sum(1 for _ in cu.source_token_lines())
+        if self.digest:
+            return {'source_digest': text_digest(source)}, line_count
+        return {'source': source}, line_count
 
-    def parse_file(self, cu: FileReporter, analysis: Analysis) -> None:
+    def parse_file(
+            self, cu: FileReporter, analysis: Analysis,
+    ) -> dict[str, Any]:
         """Generate data for single file."""
         # ensure results are properly merged between platforms
         posix_filename = pathlib.PurePath(cu.relative_filename()).as_posix()
@@ -111,20 +444,18 @@ class CoverallReporter:
             posix_filename = posix_filename[len(self.base_dir):]
         posix_filename = self.src_dir + posix_filename
 
-        token_lines = cu.source_token_lines()
-        coverage_lines = [
-            self.get_hits(i, analysis)
-            for i, _ in enumerate(token_lines, 1)
-        ]
+        source, line_count = self.read_source(cu)
+        lines, arcs = self.hit_counts.get(cu.filename, ({}, {}))
+        coverage_lines = self.get_line_hits(analysis, line_count, lines)
 
         results = {
             'name': posix_filename,
-            'source': cu.source(),
+            **source,
             'coverage': coverage_lines,
         }
 
-        branches = self.get_arcs(analysis)
+        branches = self.get_arcs(analysis, arcs)
         if branches:
             results['branches'] = branches
 
-        self.coverage.append(results)
+        return results
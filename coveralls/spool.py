@@ -0,0 +1,98 @@
+import contextlib
+import logging
+import pathlib
+import time
+import urllib.parse
+import uuid
+from typing import TYPE_CHECKING
+
+from .batch import report_paths
+from .batch import upload_reports
+from .batch import UploadSummary
+from .transport import backoff_time
+
+# Only for annotations: the API imports this module when it needs it.
+if TYPE_CHECKING:
+    from .api import Coveralls
+
+
+log = logging.getLogger('coveralls.spool')
+
+SUFFIXES = ('.json', '.json.gz')
+# Reports that fail to upload are tried again, after a backoff, this many
+# times before drain leaves them in the spool. This is on top of any
+# ``retries`` of each request: a report is drained long after it was made,
+# when waiting out an outage is usually better than giving up.
+DRAIN_RETRIES = 3
+
+
+def _spool_name(coverallz: 'Coveralls') -> str:
+    config = coverallz.config
+    if config.service_job_id:
+        return urllib.parse.quote(
+            f'{config.service_name}-{config.service_job_id}', safe='',
+        )
+    return uuid.uuid4().hex
+
+
+def spool_report(coverallz: 'Coveralls') -> pathlib.Path:
+    """
+    Write the report of ``coverallz`` into its ``spool_dir``, to upload later.
+
+    A job with a ``service_job_id`` has one place in the spool, so spooling
+    it again (say, when a CI job is re-run) replaces its earlier report
+    rather than uploading the job twice; other reports get a unique name.
+    The report is written atomically (see
+    :meth:`.Coveralls.write_report_file`), so :func:`drain` never sees half
+    of one; a failure to gather coverage raises, leaving none at all.
+    """
+    directory = pathlib.Path(coverallz.config.spool_dir or '.')
+    directory.mkdir(parents=True, exist_ok=True)
+    name = _spool_name(coverallz)
+    suffix, other = SUFFIXES[::-1] if coverallz.config.compress else SUFFIXES
+    path = directory / f'{name}{suffix}'
+    coverallz.write_report_file(str(path))
+    # an earlier report of the job, spooled with(out) compression
+    (directory / f'{name}{other}').unlink(missing_ok=True)
+    return path
+
+
+def drain(
+        coverallz: 'Coveralls', spool_dir: str, jobs: int | None = None,
+) -> UploadSummary:
+    """
+    Upload every report spooled in ``spool_dir``, removing those sent.
+
+    Reports are uploaded as by :func:`.batch.upload_reports`. Those that
+    fail are uploaded again up to :data:`DRAIN_RETRIES` times, with the
+    backoff of :func:`.transport.backoff_time` before each attempt. A report
+    that still fails stays in the spool for the next drain, as does one
+    spooled again while it was being uploaded.
+    """
+    spooled = {
+        path: pathlib.Path(path).stat().st_mtime_ns
+        for path in report_paths([spool_dir])
+    }
+    if not spooled:
+        log.info('No spooled reports in %s', spool_dir)
+        return UploadSummary()
+    summary = upload_reports(coverallz, list(spooled), jobs)
+    for errors in range(2, DRAIN_RETRIES + 2):
+        if not summary.failed:
+            break
+        delay = backoff_time(errors)
+        log.info(
+            'Retrying %d failed reports in %.1fs', len(summary.failed), delay,
+        )
+        time.sleep(delay)
+        retried = upload_reports(coverallz, list(summary.failed), jobs)
+        summary = UploadSummary(
+            uploaded=summary.uploaded + retried.uploaded,
+            failed=retried.failed, size=summary.size + retried.size,
+            seconds=summary.seconds + retried.seconds,
+        )
+    for path in summary.uploaded:
+        with contextlib.suppress(FileNotFoundError):
+            if pathlib.Path(path).stat().st_mtime_ns == spooled[path]:
+                pathlib.Path(path).unlink()
+    return summary
@@ -0,0 +1,119 @@
+import contextlib
+import logging
+import pathlib
+import sqlite3
+
+from coverage.numbits import numbits_to_nums
+
+
+log = logging.getLogger('coveralls.sqldata')
+
+# The coverage.py data file schema this reader understands (coverage.py 5.0
+# through 7.x).
+SCHEMA_VERSION = 7
+
+# A (from, to) line arc, as coverage.py records it.
+Arc = tuple[int, int]
+
+
+class MeasuredData:
+    """
+    The lines and arcs of a coverage.py data file, read in bulk.
+
+    Answers the subset of :class:`coverage.CoverageData` queries that report
+    building makes, from memory rather than with a query per file (see
+    :func:`read_data`). Lines and arcs of all measurement contexts are
+    combined, as coverage.py combines them when reporting.
+    """
+
+    def __init__(
+            self, has_arcs: bool, files: set[str], lines: dict[str, set[int]],
+            arcs: dict[str, set[Arc]], tracers: dict[str, str],
+    ) -> None:
+        # pylint: disable=too-many-arguments
+        self._has_arcs = has_arcs
+        self._files = files
+        self._lines = lines
+        self._arcs = arcs
+        self._tracers = tracers
+
+    def has_arcs(self) -> bool:
+        return self._has_arcs
+
+    def measured_files(self) -> set[str]:
+        return self._files.copy()
+
+    def lines(self, filename: str) -> set[int] | None:
+        if filename not in self._files:
+            return None
+        if self._has_arcs:
+            return {
+                line for arc in self._arcs.get(filename, ())
+                for line in arc if line > 0
+            }
+        return self._lines.get(filename, set())
+
+    def arcs(self, filename: str) -> set[Arc] | None:
+        if filename not in self._files or not self._has_arcs:
+            return None
+        return self._arcs.get(filename, set())
+
+    def file_tracer(self, filename: str) -> str | None:
+        return self._tracers.get(filename)
+
+
+def read_data(data_file: str) -> MeasuredData | None:
+    """
+    Read the coverage.py SQLite data file at ``data_file`` in bulk.
+
+    Every file's lines (or arcs) are fetched with a single query over the
+    whole data file, and every plugin file tracer with another. Returns None
+    when the file cannot be read this way (it is missing, or of a schema
+    this reader does not know), for the caller to fall back to coverage.py.
+    """
+    path = pathlib.Path(data_file)
+    if not path.is_file():
+        return None
+    try:
+        connection = sqlite3.connect(
+            f'{path.absolute().as_uri()}?mode=ro', uri=True,
+        )
+        with contextlib.closing(connection):
+            return _read(connection)
+    except (sqlite3.Error, ValueError) as e:
+        log.debug('Could not read %s directly: %s', data_file, e)
+        return None
+
+
+def _read(connection: sqlite3.Connection) -> MeasuredData | None:
+    (version,), = connection.execute('SELECT version FROM coverage_schema')
+    if version != SCHEMA_VERSION:
+        log.debug('Unknown coverage data schema %s', version)
+        return None
+
+    meta = dict(connection.execute('SELECT key, value FROM meta'))
+    has_arcs = bool(int(meta.get('has_arcs') or 0))
+    files = {path for path, in connection.execute('SELECT path FROM file')}
+
+    lines: dict[str, set[int]] = {}
+    arcs: dict[str, set[Arc]] = {}
+    if has_arcs:
+        for filename, fromno, tono in connection.execute(
+                'SELECT file.path, arc.fromno, arc.tono '
+                'FROM arc JOIN file ON file.id = arc.file_id',
+        ):
+            arcs.setdefault(filename, set()).add((fromno, tono))
+    else:
+        for filename, numbits in connection.execute(
+                'SELECT file.path, line_bits.numbits '
+                'FROM line_bits JOIN file ON file.id = line_bits.file_id',
+        ):
+            lines.setdefault(filename, set()).update(numbits_to_nums(numbits))
+
+    tracers = {
+        filename: tracer for filename, tracer in connection.execute(
+            'SELECT file.path, tracer.tracer '
+            'FROM tracer JOIN file ON file.id = tracer.file_id',
+        ) if tracer
+    }
+    return MeasuredData(has_arcs, files, lines, arcs, tracers)
@@ -0,0 +1,356 @@
+import array
+import contextlib
+import dataclasses
+import hashlib
+import itertools
+import logging
+import pathlib
+import sys
+import types
+import zlib
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+
+import coverage
+from coverage.config import CoverageConfig
+from coverage.exceptions import NotPython
+from coverage.parser import PythonParser
+from coverage.plugin import FileReporter
+from coverage.python import PythonFileReporter
+from coverage.results import Analysis
+
+try:
+    # coverage v7.5+ moved get_analysis_to_report into report_core, and
+    # analyzes a file reporter against any data object
+    from coverage.files import GlobMatcher
+    from coverage.files import prep_patterns
+    from coverage.report_core import get_analysis_to_report
+    from coverage.results import analysis_from_file_reporter
+    ANALYZES_DATA = True
+except ImportError:
+    ANALYZES_DATA = False
+
+from .cache import config_digest
+from .cache import ReportCache
+from .sqldata import MeasuredData
+
+
+log = logging.getLogger('coveralls.statements')
+
+# Bump whenever the binary layout of a statement table changes.
+TABLE_FORMAT = 1
+
+# A (from, to) line arc, as coverage.py records it.
+Arc = tuple[int, int]
+# How coverage.py fixes up the arcs of jumps out of a ``with`` block: each
+# measured arc, and the arcs it stands for.
+WithJumps = dict[Arc, tuple[Arc, Arc]]
+
+
+def _multiline_attribute() -> str:
+    """
+    The attribute coverage.py's parser keeps its multi-line map in.
+
+    Empty if the parser lacks any of the state a statement table copies.
+    """
+    parser = PythonParser(text='pass\n')
+    if not (
+            hasattr(parser, '_with_jump_fixers')
+            and hasattr(PythonParser, 'fix_with_jumps')
+    ):
+        return ''
+    # coverage v7.12+ made the multi-line map public
+    for name in ('multiline_map', '_multiline'):
+        if hasattr(parser, name):
+            return name
+    return ''
+
+
+# Checked once: with a parser that keeps its state elsewhere, tables would
+# silently miss it, so files are left to coverage.py's own analysis.
+_MULTILINE = _multiline_attribute()
+if not _MULTILINE:
+    ANALYZES_DATA = False
+
+
+@dataclasses.dataclass
+class StatementTable:
+    """
+    What coverage.py's parser finds in one source file, as analysis needs it.
+
+    The possible ``arcs``, ``exit_counts`` and ``with_jumps`` are only
+    worked out when branches are measured.
+    """
+
+    statements: set[int]
+    excluded: set[int]
+    no_branch: set[int]
+    # the first line of every line of a multi-line statement
+    multiline: dict[int, int]
+    arcs: set[Arc] | None = None
+    exit_counts: dict[int, int] | None = None
+    with_jumps: WithJumps = dataclasses.field(default_factory=dict)
+
+    @classmethod
+    def parse(
+            cls, reporter: PythonFileReporter, arcs: bool,
+    ) -> 'StatementTable':
+        """Build the table of ``reporter``'s file, parsing it."""
+        parser = reporter.parser
+        table = cls(
+            statements=reporter.lines().copy(),
+            excluded=reporter.excluded_lines().copy(),
+            no_branch=reporter.no_branch_lines().copy(),
+            multiline=dict(getattr(parser, _MULTILINE)),
+        )
+        if arcs:
+            table.arcs = reporter.arcs().copy()
+            table.exit_counts = reporter.exit_counts().copy()
+            table.with_jumps = dict(getattr(parser, '_with_jump_fixers'))
+        return table
+
+    def encode(self) -> bytes:
+        """
+        The table in a compact binary form, for :meth:`decode`.
+
+        Each field is a run of int32s, little-endian: its length (-1 for a
+        field that was not worked out), then its sorted numbers, pairs
+        flattened. The whole is zlib-compressed.
+        """
+        fields: list[list[int] | None] = [
+            sorted(self.statements),
+            sorted(self.excluded),
+            sorted(self.no_branch),
+            _flatten(self.multiline.items()),
+            None if self.arcs is None else _flatten(self.arcs),
+            None if self.exit_counts is None
+            else _flatten(self.exit_counts.items()),
+            _flatten(
+                (*arc, *start_next, *end_next)
+                for arc, (start_next, end_next) in self.with_jumps.items()
+            ),
+        ]
+        values = array.array('i', [TABLE_FORMAT])
+        for field in fields:
+            if field is None:
+                values.append(-1)
+            else:
+                values.append(len(field))
+                values.extend(field)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return zlib.compress(values.tobytes())
+
+    @classmethod
+    def decode(cls, blob: bytes) -> 'StatementTable':
+        """Read an :meth:`encode`-d table; ValueError if it is not one."""
+        values = array.array('i')
+        try:
+            values.frombytes(zlib.decompress(blob))
+        except zlib.error as e:
+            raise ValueError(f'Not a statement table: {e}') from e
+        if sys.byteorder == 'big':
+            values.byteswap()
+        if not values or values[0] != TABLE_FORMAT:
+            raise ValueError('Not a statement table of this format')
+
+        fields: list[list[int] | None] = []
+        at = 1
+        for _ in range(7):
+            if at >= len(values):
+                raise ValueError('Truncated statement table')
+            size = values[at]
+            fields.append(
+                None if size < 0 else values[at + 1:at + 1 + size].tolist(),
+            )
+            at += 1 + max(size, 0)
+        if at != len(values):
+            raise ValueError('Truncated statement table')
+
+        # pylint: disable-next=unbalanced-tuple-unpacking
+        statements, excluded, no_branch, multiline, arcs, exits, jumps = fields
+        return cls(
+            statements=set(statements or ()),
+            excluded=set(excluded or ()),
+            no_branch=set(no_branch or ()),
+            multiline=dict(_pairs(multiline or [])),
+            arcs=None if arcs is None else set(_pairs(arcs)),
+            exit_counts=None if exits is None else dict(_pairs(exits)),
+            with_jumps={
+                (a, b): ((c, d), (e, f))
+                for a, b, c, d, e, f in zip(*[iter(jumps or [])] * 6)
+            },
+        )
+
+
+def _flatten(rows: Iterable[tuple[int, ...]]) -> list[int]:
+    return list(itertools.chain.from_iterable(sorted(rows)))
+
+
+def _pairs(values: list[int]) -> Iterator[tuple[int, int]]:
+    return zip(values[::2], values[1::2])
+
+
+class TableFileReporter(PythonFileReporter):
+    """
+    A :class:`PythonFileReporter` that answers from a statement table.
+
+    Analysis queries are answered from its :class:`StatementTable` rather
+    than by parsing its file.
+    """
+
+    def __init__(
+            self, morf: str, cov: coverage.Coverage, table: StatementTable,
+    ) -> None:
+        super().__init__(morf, cov)
+        self.table = table
+
+    def lines(self) -> set[int]:
+        return self.table.statements
+
+    def excluded_lines(self) -> set[int]:
+        return self.table.excluded
+
+    def no_branch_lines(self) -> set[int]:
+        return self.table.no_branch
+
+    def arcs(self) -> set[Arc]:
+        if self.table.arcs is None:
+            return super().arcs()
+        return self.table.arcs
+
+    def exit_counts(self) -> dict[int, int]:
+        if self.table.exit_counts is None:
+            return super().exit_counts()
+        return self.table.exit_counts
+
+    def first_line(self, line: int) -> int:
+        if line < 0:
+            return -self.table.multiline.get(-line, -line)
+        return self.table.multiline.get(line, line)
+
+    def translate_lines(self, lines: Iterable[int]) -> set[int]:
+        return {self.first_line(line) for line in lines}
+
+    def translate_arcs(self, arcs: Iterable[Arc]) -> set[Arc]:
+        if self.table.with_jumps:
+            # coverage.py's own fix-up, run on the cached fixers
+            arcs = PythonParser.fix_with_jumps(
+                types.SimpleNamespace(  # type: ignore[arg-type]
+                    _with_jump_fixers=self.table.with_jumps,
+                ),
+                arcs,
+            )
+        return {(self.first_line(a), self.first_line(b)) for a, b in arcs}
+
+
+class StatementCache:
+    """
+    The statement tables of source files.
+
+    They are kept in ``store`` across runs, so an unchanged file is not
+    parsed again.
+
+    Tables are keyed by the file's content, the coverage.py configuration
+    (which decides what is excluded) and the Python version (whose compiler
+    decides the possible arcs). Without a ``store``, every file is parsed.
+    """
+
+    def __init__(
+            self, cov: coverage.Coverage, store: ReportCache | None = None,
+    ) -> None:
+        self.config = config_digest(
+            cov, 'statements', sys.implementation.cache_tag,
+        )
+        self.store = store
+
+    def reporter(
+            self, cov: coverage.Coverage, morf: str, arcs: bool,
+    ) -> PythonFileReporter:
+        """
+        The file reporter of ``morf``, answering from its statement table.
+
+        A file that cannot be read gets a plain reporter, which raises the
+        error coverage.py would when used.
+        """
+        try:
+            source = pathlib.Path(morf).read_bytes()
+        except OSError:
+            return PythonFileReporter(morf, cov)
+
+        digest = hashlib.sha256(self.config)
+        digest.update(b'arcs' if arcs else b'lines')
+        digest.update(source)
+        key = digest.hexdigest()
+        table = None
+        if self.store is not None:
+            table = self.store.load(key, StatementTable.decode)
+        if table is None:
+            table = StatementTable.parse(PythonFileReporter(morf, cov), arcs)
+            if self.store is not None:
+                self.store.store(key, table.encode())
+        return TableFileReporter(morf, cov, table)
+
+    def analyze(
+            self, cov: coverage.Coverage, data: MeasuredData,
+            morfs: list[str],
+    ) -> Iterator[tuple[FileReporter, Analysis]]:
+        """
+        Analyze ``morfs`` as :func:`get_analysis_to_report` would.
+
+        They are analyzed against the bulk-read ``data`` and the statement
+        tables instead, but filtered, and their errors handled, as
+        coverage.py does. Files measured through a plugin are left to
+        coverage.py.
+        """
+        reported = _report_filter(cov.config)
+        for morf in morfs:
+            if data.file_tracer(morf):
+                with contextlib.suppress(coverage.exceptions.NoDataError):
+                    yield from get_analysis_to_report(cov, [morf])
+                continue
+            fr = PythonFileReporter(morf, cov)
+            if reported(fr.filename):
+                analyzed = self._analyze_file(cov, data, fr, morf)
+                if analyzed is not None:
+                    yield analyzed
+
+    def _analyze_file(
+            self, cov: coverage.Coverage, data: MeasuredData,
+            fr: PythonFileReporter, morf: str,
+    ) -> tuple[FileReporter, Analysis] | None:
+        config = cov.config
+        try:
+            table = self.reporter(cov, morf, data.has_arcs())
+            analysis = analysis_from_file_reporter(
+                data,  # type: ignore[arg-type]
+                config.precision, table, morf,
+            )
+        except NotPython:
+            if fr.should_be_python():
+                if not config.ignore_errors:
+                    raise
+                log.warning("Couldn't parse Python file '%s'", fr.filename)
+            return None
+        except Exception as e:  # pylint: disable=broad-except
+            if not config.ignore_errors:
+                raise
+            log.warning("Couldn't parse '%s': %s", fr.filename, e)
+            return None
+        return table, analysis
+
+
+def _report_filter(config: CoverageConfig) -> Callable[[str], bool]:
+    """Whether coverage.py would report a file, per report include/omit."""
+    include = omit = None
+    if config.report_include:
+        include = GlobMatcher(
+            prep_patterns(config.report_include), 'report_include',
+        )
+    if config.report_omit:
+        omit = GlobMatcher(prep_patterns(config.report_omit), 'report_omit')
+    return lambda filename: (
+        (include is None or include.match(filename))
+        and (omit is None or not omit.match(filename))
+    )
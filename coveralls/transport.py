@@ -0,0 +1,143 @@
+import random
+from typing import Any
+
+import requests
+import urllib3.exceptions
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .configuration import Config
+from .configuration.helpers import DEFAULT_POOL_SIZE
+
+
+# Transient failures worth retrying: server-side 5xx and rate limiting (429).
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# urllib3's default allowed_methods excludes POST (non-idempotent); every call
+# we make is a POST, so we must opt POST in explicitly or nothing retries.
+RETRY_METHODS = frozenset({'POST'})
+# Exponential backoff with jitter. backoff_factor sets the base delay
+# (0.5, 1, 2, 4, ... seconds), backoff_jitter adds up to this many seconds of
+# randomness to spread out retries, and backoff_max caps any single wait.
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_BACKOFF_JITTER = 0.5
+RETRY_BACKOFF_MAX = 60
+
+
+def backoff_time(errors: int) -> float:
+    """
+    Seconds to wait before retrying a request that has failed ``errors`` times.
+
+    The same policy urllib3's ``Retry`` applies for :func:`build_session`: no
+    wait before the first retry, then exponential backoff with jitter, capped.
+    """
+    if errors <= 1:
+        return 0
+    delay = (
+        RETRY_BACKOFF_FACTOR * 2 ** (errors - 1)
+        + random.random() * RETRY_BACKOFF_JITTER
+    )
+    return float(min(RETRY_BACKOFF_MAX, delay))
+
+
+def build_session(
+        retries: int, pool_size: int = DEFAULT_POOL_SIZE,
+) -> requests.Session:
+    """
+    Build a requests Session that retries transient HTTP failures.
+
+    The session keeps up to ``pool_size`` connections per host open, so
+    requests made through it reuse them rather than reconnecting each time.
+
+    With ``retries=0`` this is equivalent to a plain ``requests`` call: a
+    single attempt is made and connect/read timeouts surface as before.
+    ``raise_on_status=False`` keeps the final response (even a 5xx) flowing
+    back to the caller so the existing status handling stays in charge.
+    """
+    # urllib3 treats read=0 and read=False differently: read=0 raises
+    # MaxRetryError on a read timeout (which requests remaps to a bare
+    # ConnectionError), while read=False lets the ReadTimeoutError propagate as
+    # a requests Timeout. Mirror requests' own default (Retry(0, read=False))
+    # so the no-retry path still surfaces read timeouts as TimeoutError.
+    read = retries or False
+    retry = Retry(
+        total=retries, connect=retries, read=read, status=retries,
+        other=retries,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        backoff_jitter=RETRY_BACKOFF_JITTER,
+        backoff_max=RETRY_BACKOFF_MAX,
+        # Ignore Retry-After and always use our own bounded backoff: a server
+        # can send an arbitrarily large Retry-After (e.g. 3600s), and urllib3
+        # only started clamping it -- to 6 hours -- in 2.6.3, so on our
+        # supported range it is otherwise unbounded and could hang CI for
+        # hours. 429/503 are still retried; only the sleep length differs.
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def caused_by_timeout(exc: requests.exceptions.RequestException) -> bool:
+    """
+    Report whether a request failure was ultimately a timeout.
+
+    A single timeout raises a requests ``Timeout`` directly, but a timeout that
+    exhausts its retries surfaces as a ``ConnectionError`` wrapping a urllib3
+    ``MaxRetryError`` whose ``reason`` is a urllib3 ``TimeoutError``; unwrap
+    that so both read the same to the caller.
+    """
+    if isinstance(exc, requests.exceptions.Timeout):
+        return True
+    reason = getattr(exc.args[0] if exc.args else None, 'reason', None)
+    return isinstance(reason, urllib3.exceptions.TimeoutError)
+
+
+class Client:
+    """
+    A keep-alive HTTP client for the coveralls.io API.
+
+    Every request goes through one session (see :func:`build_session`) sized
+    to ``config.pool_size``, so consecutive requests -- a job submission then
+    the parallel webhook, or many submissions -- reuse the open connections
+    instead of paying for a new TCP and TLS handshake each time. Close the
+    client, or use it as a context manager, to release them.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self._session = build_session(config.retries, config.pool_size)
+
+    def __enter__(self) -> 'Client':
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._session.close()
+
+    def post(self, endpoint: str, **kwargs: Any) -> requests.Response:
+        """
+        POST to a coveralls endpoint, retrying transient failures.
+
+        A transient failure that exhausts its retries surfaces as a
+        connection/RetryError rather than a plain Timeout, so both are mapped
+        to clear exceptions here (see :func:`caused_by_timeout`).
+        """
+        timeout = self.config.request_timeout
+        try:
+            return self._session.post(
+                endpoint, verify=not self.config.skip_ssl_verify,
+                timeout=timeout, **kwargs,
+            )
+        except requests.exceptions.RequestException as e:
+            if caused_by_timeout(e):
+                raise TimeoutError(
+                    f'Request timeout: {endpoint} (timeout={timeout})',
+                ) from e
+            raise RuntimeError(f'Could not submit coverage: {e}') from e
@@ -0,0 +1,174 @@
+import contextlib
+import functools
+import gzip
+import io
+import logging
+import tempfile
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import Any
+from typing import IO
+
+from urllib3.fields import RequestField
+from urllib3.filepost import choose_boundary
+
+from .jsonstream import GZIP_MAGIC
+
+
+log = logging.getLogger('coveralls.upload')
+
+# The report is compressed (and encoded) this many bytes at a time.
+CHUNK_SIZE = 1024 * 1024
+# Compressed reports up to this size stay in memory; larger ones spill to a
+# temporary file, so compressing never holds a whole large report in memory.
+SPOOL_SIZE = 16 * 1024 * 1024
+
+
+class MultipartBody(io.RawIOBase):
+    """
+    A multipart/form-data request body streamed from a binary file.
+
+    Frames ``fileobj`` as a single file field exactly as ``requests`` does for
+    ``files={name: ...}``, but reads the payload lazily from the file as the
+    body is sent rather than copying it into memory first. The body reports
+    its length, so it is sent with a Content-Length rather than chunked, and
+    is seekable, so urllib3 can rewind it when retrying the request.
+    """
+
+    def __init__(
+            self, fileobj: IO[bytes], name: str = 'json_file',
+            filename: str | None = None, content_type: str | None = None,
+    ) -> None:
+        super().__init__()
+        boundary = choose_boundary()
+        field = RequestField(name=name, data=b'', filename=filename or name)
+        field.make_multipart(content_type=content_type)
+        self.content_type = f'multipart/form-data; boundary={boundary}'
+
+        self._head = (
+            f'--{boundary}\r\n{field.render_headers()}'.encode('latin-1')
+        )
+        self._tail = f'\r\n--{boundary}--\r\n'.encode('latin-1')
+        self._file = fileobj
+        self._start = fileobj.tell()
+        self._size = fileobj.seek(0, io.SEEK_END) - self._start
+        fileobj.seek(self._start)
+        self._pos = 0
+
+    def __len__(self) -> int:
+        return len(self._head) + self._size + len(self._tail)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self)
+        if offset < 0:
+            raise ValueError(f'negative seek position {offset}')
+        self._pos = offset
+        return self._pos
+
+    def readinto(self, buffer: Any) -> int:
+        view = memoryview(buffer).cast('B')
+        head, body_end = len(self._head), len(self._head) + self._size
+        if self._pos < head:
+            chunk = self._head[self._pos:self._pos + len(view)]
+        elif self._pos < body_end:
+            self._file.seek(self._start + self._pos - head)
+            chunk = self._file.read(min(len(view), body_end - self._pos))
+            if not chunk:
+                raise OSError('report file was truncated while uploading')
+        else:
+            chunk = self._tail[self._pos - body_end:][:len(view)]
+
+        view[:len(chunk)] = chunk
+        self._pos += len(chunk)
+        return len(chunk)
+
+
+def is_gzipped(fileobj: IO[bytes]) -> bool:
+    """Check for the gzip magic number without moving the file position."""
+    start = fileobj.tell()
+    magic = fileobj.read(len(GZIP_MAGIC))
+    fileobj.seek(start)
+    return magic == GZIP_MAGIC
+
+
+def compress(chunks: Iterable[bytes], level: int) -> IO[bytes]:
+    """
+    Gzip ``chunks`` into a seekable temporary file, one chunk at a time.
+
+    The result is rewound and ready to be sent; the caller closes it.
+    """
+    # pylint: disable-next=consider-using-with
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    size = 0
+    # mtime=0 keeps the output reproducible for identical reports.
+    with gzip.GzipFile(
+            fileobj=spool, mode='wb', compresslevel=level, mtime=0,
+    ) as stream:
+        for chunk in chunks:
+            size += len(chunk)
+            stream.write(chunk)
+    compressed = spool.tell()
+    spool.seek(0)
+    log.info(
+        'Compressed report from %d to %d bytes (level %d)',
+        size, compressed, level,
+    )
+    return spool
+
+
+@contextlib.contextmanager
+def json_file_upload(
+        report: str | IO[bytes], compress_level: int | None = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    Yield the ``requests`` arguments that send ``report`` as the json_file.
+
+    ``report`` is the JSON string or a binary file holding it, possibly
+    already gzipped (as written by ``coveralls save --compress``). Given a
+    ``compress_level``, an uncompressed report is gzipped at that level on
+    the way out. Files and compressed reports are streamed into the request
+    body; a plain string is handed to ``requests`` as-is.
+    """
+    if isinstance(report, str):
+        if compress_level is None:
+            yield {'files': {'json_file': report}}
+            return
+        chunks: Iterable[bytes] = _encode(report)
+    elif is_gzipped(report):
+        yield _streamed(report, gzipped=True)
+        return
+    elif compress_level is None:
+        yield _streamed(report)
+        return
+    else:
+        chunks = iter(functools.partial(report.read, CHUNK_SIZE), b'')
+
+    with compress(chunks, compress_level) as compressed:
+        yield _streamed(compressed, gzipped=True)
+
+
+def _encode(report: str) -> Iterator[bytes]:
+    for start in range(0, len(report), CHUNK_SIZE):
+        yield report[start:start + CHUNK_SIZE].encode('utf-8')
+
+
+def _streamed(source: IO[bytes], gzipped: bool = False) -> dict[str, Any]:
+    if gzipped:
+        body = MultipartBody(
+            source, filename='json_file.gz', content_type='application/gzip',
+        )
+    else:
+        body = MultipartBody(source)
+    return {'data': body, 'headers': {'Content-Type': body.content_type}}
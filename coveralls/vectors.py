@@ -0,0 +1,217 @@
+import abc
+import array
+import sys
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Mapping
+from collections.abc import Sequence
+from collections.abc import Set as AbstractSet
+from typing import Any
+from typing import overload
+from typing import TypeVar
+
+
+T = TypeVar('T')
+V = TypeVar('V', bound='Vector[Any]')
+
+# Unsigned array typecodes, smallest first: a vector is stored in the first
+# one that holds all of its values. Per-line hits are mostly 0, 1 and None, so
+# most files take a byte a line.
+TYPECODES = 'BHIQ'
+
+
+def typecode(high: int) -> str:
+    """The smallest of :data:`TYPECODES` that holds 0 to ``high``."""
+    for code in TYPECODES[:-1]:
+        if high < 1 << (array.array(code).itemsize * 8):
+            return code
+    return TYPECODES[-1]
+
+
+def packed(values: 'Sequence[int] | array.array[int]') -> 'array.array[int]':
+    """``values`` in the smallest array that holds them all."""
+    return array.array(typecode(max(values, default=0)), values)
+
+
+class Vector(Sequence[T]):
+    """
+    An immutable sequence of numbers, stored in a compact array.
+
+    Compares equal to a list (or tuple) of the same values, so it can stand
+    in for the JSON lists of a report entry while the report is built;
+    :func:`json_default` turns it back into one when the entry is serialized,
+    and :func:`listed` before the entry is handed out.
+    """
+
+    __slots__ = ('_values',)
+
+    def __init__(self, values: Iterable[T] = ()) -> None:
+        self._values = packed([self._pack(value) for value in values])
+
+    @classmethod
+    def from_array(cls: type[V], values: 'array.array[int]') -> V:
+        """
+        The vector of ``values``, already stored as :meth:`_pack` would.
+
+        The array is taken over, not copied.
+        """
+        vector = cls.__new__(cls)
+        vector._values = values
+        return vector
+
+    @staticmethod
+    @abc.abstractmethod
+    def _pack(value: Any) -> int:
+        """A value as it is stored."""
+
+    @staticmethod
+    @abc.abstractmethod
+    def _unpack(value: int) -> Any:
+        """A stored value as it was given."""
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @overload
+    def __getitem__(self, index: int) -> T:
+        ...
+
+    @overload
+    def __getitem__(self: V, index: slice) -> V:
+        ...
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            return self.from_array(self._values[index])
+        value: T = self._unpack(self._values[index])
+        return value
+
+    def __iter__(self) -> Iterator[T]:
+        return map(self._unpack, self._values)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Vector):
+            return type(self) is type(other) and self._values == other._values
+        if isinstance(other, (list, tuple)):
+            return self.tolist() == list(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.tolist()!r})'
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + sys.getsizeof(self._values)
+
+    def tolist(self) -> list[T]:
+        return list(self)
+
+
+class LineHits(Vector[int | None]):
+    """
+    The ``coverage`` of a report entry.
+
+    That is each line's hits, or None for a line that is not relevant. Hits
+    are never negative: a line is stored as its hits plus one, and 0 stands
+    for None.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def of(
+            cls, line_count: int, statements: AbstractSet[int],
+            missing: Iterable[int], counts: Mapping[int, int],
+    ) -> 'LineHits':
+        """
+        The hits of a file of ``line_count`` lines.
+
+        ``statements`` are hit once, or as many times as ``counts`` has them,
+        but ``missing`` ones not at all, and other lines are not relevant.
+        Lines past the end are ignored.
+        """
+        code = typecode(max(counts.values(), default=1) + 1)
+        hits = array.array(code)
+        hits.frombytes(bytes(hits.itemsize * line_count))
+        for line in statements:
+            if 0 < line <= line_count:
+                hits[line - 1] = 2
+        for line, count in counts.items():
+            if line in statements and 0 < line <= line_count:
+                hits[line - 1] = max(count, 1) + 1
+        for line in missing:
+            if 0 < line <= line_count:
+                hits[line - 1] = 1
+        return cls.from_array(hits)
+
+    @staticmethod
+    def _pack(value: int | None) -> int:
+        if value is None:
+            return 0
+        if value < 0:
+            raise ValueError(f'Invalid hit count {value}')
+        return value + 1
+
+    @staticmethod
+    def _unpack(value: int) -> int | None:
+        return value - 1 if value else None
+
+    def tolist(self) -> list[int | None]:
+        return [value - 1 if value else None for value in self._values]
+
+
+class Branches(Vector[int]):
+    """
+    The ``branches`` of a report entry.
+
+    That is four numbers per branch (line, block, branch, hits), flattened.
+    """
+
+    __slots__ = ()
+
+    @staticmethod
+    def _pack(value: int) -> int:
+        if value < 0:
+            raise ValueError(f'Invalid branch value {value}')
+        return value
+
+    @staticmethod
+    def _unpack(value: int) -> int:
+        return value
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._values)
+
+    def tolist(self) -> list[int]:
+        return self._values.tolist()
+
+
+def compact(entry: dict[str, Any]) -> dict[str, Any]:
+    """A report entry with its hit lists made vectors, in place."""
+    if 'coverage' in entry and not isinstance(entry['coverage'], LineHits):
+        entry['coverage'] = LineHits(entry['coverage'])
+    if 'branches' in entry and not isinstance(entry['branches'], Branches):
+        entry['branches'] = Branches(entry['branches'])
+    return entry
+
+
+def listed(entry: dict[str, Any]) -> dict[str, Any]:
+    """A copy of a report entry with its vectors made lists again."""
+    return {
+        field: value.tolist() if isinstance(value, Vector) else value
+        for field, value in entry.items()
+    }
+
+
+def json_default(value: object) -> list[Any]:
+    """
+    Serialize vectors as the lists they stand for.
+
+    Pass it as the ``default`` of :func:`json.dumps`.
+    """
+    if isinstance(value, Vector):
+        return value.tolist()
+    raise TypeError(
+        f'Object of type {type(value).__name__} is not JSON serializable',
+    )
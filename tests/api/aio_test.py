@@ -0,0 +1,119 @@
+import asyncio
+import itertools
+import json
+import os
+import pathlib
+import socket
+import unittest.mock
+from typing import Any
+
+import pytest
+
+import coveralls
+from tests.api.conftest import EXPECTED
+from tests.api.conftest import json_file
+from tests.api.conftest import stand_in_server
+
+
+EXAMPLE_JSON = pathlib.Path(__file__).parents[2] / 'example' / 'example.json'
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_concurrent_submissions_on_one_loop() -> None:
+    reports = [json.dumps({'source_files': [], 'n': i}) for i in range(8)]
+
+    async def submit_all(host: str) -> list[dict[str, Any]]:
+        async with coveralls.Coveralls(repo_token='xxx', host=host) as api:
+            return await asyncio.gather(*map(api.asubmit_report, reports))
+
+    with stand_in_server(200) as (host, received):
+        assert asyncio.run(submit_all(host)) == [EXPECTED] * 8
+
+    sent = sorted(itertools.starmap(json_file, received))
+    assert sent == sorted(report.encode() for report in reports)
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_sequential_requests_reuse_one_connection() -> None:
+    async def submit_then_finish(host: str) -> None:
+        async with coveralls.Coveralls(repo_token='xxx', host=host) as api:
+            with EXAMPLE_JSON.open('rb') as report:
+                assert await api.asubmit_report(report) == EXPECTED
+            assert await api.aparallel_finish() == EXPECTED
+
+    ports: list[int] = []
+    with stand_in_server(200, ports=ports) as (host, received):
+        asyncio.run(submit_then_finish(host))
+
+    assert len(ports) == 1
+    assert json_file(*received[0]) == EXAMPLE_JSON.read_bytes()
+    headers, body = received[1]
+    assert headers['Content-Type'] == 'application/json'
+    assert json.loads(body) == {
+        'payload': {'status': 'done'}, 'repo_token': 'xxx',
+    }
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_retries_transient_failures() -> None:
+    async def finish(host: str, retries: int) -> dict[str, Any]:
+        async with coveralls.Coveralls(
+                repo_token='xxx', host=host, retries=retries,
+        ) as api:
+            return await api.aparallel_finish()
+
+    with stand_in_server(503, 200) as (host, received):
+        assert asyncio.run(finish(host, retries=1)) == EXPECTED
+    assert len(received) == 2
+
+    with stand_in_server(503, 200) as (host, received):
+        with pytest.raises(RuntimeError, match='503'):
+            asyncio.run(finish(host, retries=0))
+    assert len(received) == 1
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_read_timeout_raises_timeout_error() -> None:
+    async def finish(host: str) -> None:
+        async with coveralls.Coveralls(
+                repo_token='xxx', host=host, read_timeout=0.1,
+        ) as api:
+            await api.aparallel_finish()
+
+    # accepts connections (into its backlog) but never replies
+    with socket.create_server(('127.0.0.1', 0)) as server:
+        host = f'http://127.0.0.1:{server.getsockname()[1]}'
+        with pytest.raises(TimeoutError, match='Request timeout'):
+            asyncio.run(finish(host))
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_connection_failure_raises_as_submit_report_does() -> None:
+    with socket.create_server(('127.0.0.1', 0)) as server:
+        host = f'http://127.0.0.1:{server.getsockname()[1]}'
+    api = coveralls.Coveralls(repo_token='xxx', host=host, retries=0)
+    with pytest.raises(Exception) as sync_error:
+        api.submit_report('{}')
+    with pytest.raises(Exception) as async_error:
+        asyncio.run(api.asubmit_report('{}'))
+
+    assert isinstance(sync_error.value, (TimeoutError, RuntimeError))
+    assert type(async_error.value) is type(sync_error.value)
+    assert str(async_error.value) == str(sync_error.value)
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_requests_go_through_the_configured_proxy() -> None:
+    async def finish() -> dict[str, Any]:
+        async with coveralls.Coveralls(
+                repo_token='xxx', host='http://coveralls.invalid',
+        ) as api:
+            return await api.aparallel_finish()
+
+    with stand_in_server(200) as (proxy, received):
+        os.environ['HTTP_PROXY'] = proxy
+        assert asyncio.run(finish()) == EXPECTED
+    assert len(received) == 1
+    headers, body = received[0]
+    assert headers['Host'] == 'coveralls.invalid'
+    assert json.loads(body)['payload'] == {'status': 'done'}
@@ -0,0 +1,73 @@
+import gzip
+import itertools
+import json
+import os
+import pathlib
+import unittest.mock
+
+import pytest
+
+import coveralls
+from coveralls.batch import report_paths
+from coveralls.batch import upload_reports
+from tests.api.conftest import json_file
+from tests.api.conftest import stand_in_server
+
+
+def _save_reports(directory: pathlib.Path, count: int) -> list[bytes]:
+    directory.mkdir()
+    reports = []
+    for i in range(count):
+        report = json.dumps({'source_files': [], 'n': i}).encode()
+        if i % 2:
+            (directory / f'{i:02}.json.gz').write_bytes(gzip.compress(report))
+        else:
+            (directory / f'{i:02}.json').write_bytes(report)
+        reports.append(report)
+    (directory / 'notes.txt').write_text('not a report', encoding='utf-8')
+    return reports
+
+
+def test_report_paths_expands_directories_and_globs(
+        tmp_path: pathlib.Path,
+) -> None:
+    _save_reports(tmp_path / 'reports', 3)
+    reports = str(tmp_path / 'reports')
+    assert report_paths([reports, f'{reports}/0*.json', 'a.json']) == [
+        f'{reports}/00.json', f'{reports}/01.json.gz', f'{reports}/02.json',
+        f'{reports}/00.json', f'{reports}/02.json', 'a.json',
+    ]
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_upload_reports_concurrently_and_retries_each(
+        tmp_path: pathlib.Path,
+) -> None:
+    reports = _save_reports(tmp_path / 'reports', 12)
+    missing = str(tmp_path / 'missing.json')
+
+    with stand_in_server(503, 200) as (host, received):
+        api = coveralls.Coveralls(repo_token='xxx', host=host, retries=1)
+        summary = upload_reports(
+            api, [str(tmp_path / 'reports'), missing], jobs=4,
+        )
+
+    assert len(summary.uploaded) == 12
+    assert list(summary.failed) == [missing]
+    assert 'No such file' in summary.failed[missing]
+    assert summary.size == sum(
+        path.stat().st_size for path in (tmp_path / 'reports').glob('*.js*')
+    )
+    # the first request was retried
+    assert len(received) == 13
+    sent = set(itertools.starmap(json_file, received))
+    assert sent == set(reports)
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_upload_reports_needs_reports(tmp_path: pathlib.Path) -> None:
+    api = coveralls.Coveralls(repo_token='xxx')
+    with pytest.raises(ValueError, match='No reports'):
+        upload_reports(api, [str(tmp_path)])
+    with pytest.raises(ValueError, match='jobs'):
+        upload_reports(api, [str(tmp_path)], jobs=0)
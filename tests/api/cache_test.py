@@ -0,0 +1,124 @@
+import os
+import pathlib
+import subprocess
+import sys
+import time
+
+import pytest
+
+from coveralls import Coveralls
+from coveralls.cache import ReportCache
+
+
+ENTRY = {'name': 'project.py', 'coverage': [1, 0, None]}
+
+
+def test_get_missing_entry_is_a_miss(tmp_path: pathlib.Path) -> None:
+    cache = ReportCache(str(tmp_path), 1024)
+    assert cache.get('nope') is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_put_then_get_round_trips(tmp_path: pathlib.Path) -> None:
+    cache = ReportCache(str(tmp_path / 'nested'), 1024)
+    cache.put('key', ENTRY)
+    assert cache.get('key') == ENTRY
+    assert (cache.hits, cache.misses) == (1, 0)
+    # nothing but the entry itself is left behind
+    assert [p.name for p in (tmp_path / 'nested').iterdir()] == ['key.json']
+
+
+def test_corrupt_entry_is_a_miss(tmp_path: pathlib.Path) -> None:
+    (tmp_path / 'key.json').write_text('{"name": ', encoding='utf-8')
+    cache = ReportCache(str(tmp_path), 1024)
+    assert cache.get('key') is None
+    assert cache.misses == 1
+
+
+def test_prune_evicts_least_recently_used(tmp_path: pathlib.Path) -> None:
+    cache = ReportCache(str(tmp_path), 1024)
+    for age, key in enumerate(('new', 'used', 'old')):
+        cache.put(key, ENTRY)
+        stamp = 1_000_000 - age * 1000
+        os.utime(tmp_path / f'{key}.json', (stamp, stamp))
+    # reading an entry makes it the most recently used
+    assert cache.get('used') == ENTRY
+
+    entry_size = (tmp_path / 'new.json').stat().st_size
+    cache.max_size = 2 * entry_size
+    cache.prune()
+
+    remaining = sorted(p.stem for p in tmp_path.glob('*.json'))
+    assert remaining == ['new', 'used']
+
+
+def test_prune_within_budget_keeps_everything(
+        tmp_path: pathlib.Path,
+) -> None:
+    cache = ReportCache(str(tmp_path), 1024 * 1024)
+    cache.put('a', ENTRY)
+    cache.put('b', ENTRY)
+    cache.prune()
+    assert len(list(tmp_path.glob('*.json'))) == 2
+
+
+def test_prune_evicts_entries_past_max_age(tmp_path: pathlib.Path) -> None:
+    cache = ReportCache(str(tmp_path), 1024 * 1024, max_age=3600)
+    cache.put('fresh', ENTRY)
+    cache.put('stale', ENTRY)
+    stamp = time.time() - 7200
+    os.utime(tmp_path / 'stale.json', (stamp, stamp))
+    cache.prune()
+    assert [p.stem for p in tmp_path.glob('*.json')] == ['fresh']
+
+
+def test_substore_keeps_its_own_entries(tmp_path: pathlib.Path) -> None:
+    cache = ReportCache(str(tmp_path), 1024, max_age=3600)
+    tables = cache.substore('tables', '.bin')
+    tables.store('key', b'\x00\x01')
+    assert tables.load('key', bytes) == b'\x00\x01'
+    assert tables.load('missing', bytes) is None
+    assert cache.get('key') is None
+    assert (tables.max_size, tables.max_age) == (1024, 3600)
+
+
+
+def test_substores_share_the_size_budget(tmp_path: pathlib.Path) -> None:
+    cache = ReportCache(str(tmp_path), 1024)
+    tables = cache.substore('tables', '.bin')
+    stores = [cache, tables, cache, tables]
+    for age, (store, key) in enumerate(zip(stores, 'abcd', strict=True)):
+        store.store(key, b'x' * 100)
+        stamp = 1_000_000 - age * 1000
+        path = store.directory / f'{key}{store.suffix}'
+        os.utime(path, (stamp, stamp))
+
+    # the two most recently used entries fit, wherever they are
+    cache.max_size = 250
+    cache.prune()
+
+    remaining = {p.name for p in tmp_path.rglob('*.*')}
+    assert remaining == {'a.json', 'b.bin'}
+
+
+def test_cache_keeps_identical_files_apart(
+        tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # same content, same coverage: only the path tells the entries apart
+    for package in ('a', 'b'):
+        (tmp_path / package).mkdir()
+        (tmp_path / package / '__init__.py').write_text(
+            'VALUE = 1\n', encoding='utf-8',
+        )
+    (tmp_path / 'main.py').write_text('import a\nimport b\n', encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+    subprocess.check_call([sys.executable, '-m', 'coverage', 'run', 'main.py'])
+
+    cache_dir = str(tmp_path / 'cache')
+    for _ in range(2):
+        results = Coveralls(
+            repo_token='xxx', cache_dir=cache_dir,
+        ).get_coverage()
+        assert [entry['name'] for entry in results] == [
+            'a/__init__.py', 'b/__init__.py', 'main.py',
+        ]
@@ -0,0 +1,136 @@
+import gzip
+import json
+import pathlib
+import unittest.mock
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from coveralls.combine import combine_reports
+from coveralls.combine import log
+from coveralls.combine import reconcile
+
+
+GIT = {'head': {'id': 'abc'}, 'branch': 'main', 'remotes': []}
+
+
+def _write_shards(directory: pathlib.Path, count: int) -> None:
+    for i in range(count):
+        (directory / f'shard{i:03}.json').write_text(
+            json.dumps({
+                'source_files': [
+                    {
+                        'name': 'common.py', 'coverage': [i % 3, None, 0],
+                        'branches': [1, 0, i % 5, 1],
+                    },
+                    {'name': f'only{i % 7}.py', 'coverage': [1]},
+                ],
+                'service_job_id': f'job-{i}',
+                'service_number': '42',
+                'run_at': f'2024-01-01T00:{i % 60:02}:00+00:00',
+                'git': GIT,
+            }), encoding='utf-8',
+        )
+
+
+def test_reconcile() -> None:
+    with unittest.mock.patch.object(log, 'warning') as warning:
+        header = reconcile([
+            {
+                'service_number': '42', 'service_job_id': '1', 'git': GIT,
+                'run_at': '2024-01-01T12:00:00+01:00', 'flag_name': 'unit',
+            },
+            {
+                'service_number': '42', 'service_job_id': '2', 'git': GIT,
+                'run_at': '2024-01-01T11:30:00+00:00', 'flag_name': 'e2e',
+            },
+        ])
+
+    assert header == {
+        'service_number': '42', 'git': GIT,
+        'run_at': '2024-01-01T11:30:00+00:00', 'flag_name': 'unit',
+    }
+    warning.assert_called_once_with(
+        'Reports disagree on %s; keeping the first value, %r',
+        'flag_name', 'unit',
+    )
+
+
+def test_reconcile_rejects_different_commits() -> None:
+    other = GIT | {'head': {'id': 'def'}}
+    with pytest.raises(ValueError, match='abc, def'):
+        reconcile([{'git': GIT}, {'git': other}])
+
+
+@pytest.mark.parametrize('count', [1, 2, 37])
+def test_tree_matches_fold(tmp_path: pathlib.Path, count: int) -> None:
+    _write_shards(tmp_path, count)
+    pattern = str(tmp_path / 'shard*.json')
+
+    assert combine_reports(str(tmp_path / 'fold.json'), [pattern]) == count
+    assert combine_reports(
+        str(tmp_path / 'tree.json.gz'), [pattern], jobs=4, tree=True,
+    ) == count
+
+    fold = json.loads((tmp_path / 'fold.json').read_text('utf-8'))
+    tree = json.loads(
+        gzip.decompress((tmp_path / 'tree.json.gz').read_bytes()),
+    )
+    assert fold == tree
+    assert fold['source_files'][0] == {
+        'name': 'common.py',
+        'coverage': [sum(i % 3 for i in range(count)), None, 0],
+        'branches': [
+            value for branch in range(min(count, 5))
+            for value in (1, 0, branch, len(range(branch, count, 5)))
+        ],
+    }
+    assert 'service_job_id' not in fold or count == 1
+    assert fold['run_at'] == max(
+        f'2024-01-01T00:{i % 60:02}:00+00:00' for i in range(count)
+    )
+
+
+def test_tree_runs_folds_in_worker_processes(tmp_path: pathlib.Path) -> None:
+    _write_shards(tmp_path, 8)
+    pattern = str(tmp_path / 'shard*.json')
+    combine_reports(str(tmp_path / 'fold.json'), [pattern])
+    with unittest.mock.patch(
+        'coveralls.combine.ProcessPoolExecutor', wraps=ProcessPoolExecutor,
+    ) as pool:
+        combine_reports(str(tmp_path / 'tree.json'), [pattern], jobs=4)
+    pool.assert_not_called()
+
+    with unittest.mock.patch(
+        'coveralls.combine.ProcessPoolExecutor', wraps=ProcessPoolExecutor,
+    ) as pool:
+        combine_reports(
+            str(tmp_path / 'tree.json'), [pattern], jobs=4, tree=True,
+        )
+    pool.assert_called_once_with(max_workers=4)
+    assert (tmp_path / 'tree.json').read_bytes() == (
+        tmp_path / 'fold.json'
+    ).read_bytes()
+
+
+def test_tree_falls_back_to_folding(tmp_path: pathlib.Path) -> None:
+    _write_shards(tmp_path, 9)
+    pattern = str(tmp_path / 'shard*.json')
+    combine_reports(str(tmp_path / 'fold.json'), [pattern])
+    with unittest.mock.patch(
+        'coveralls.combine.ProcessPoolExecutor',
+        side_effect=OSError('spawning is not permitted'),
+    ), unittest.mock.patch.object(log, 'warning') as warning:
+        combine_reports(
+            str(tmp_path / 'tree.json'), [pattern], jobs=4, tree=True,
+        )
+    warning.assert_called_once()
+    assert (tmp_path / 'tree.json').read_bytes() == (
+        tmp_path / 'fold.json'
+    ).read_bytes()
+
+
+def test_nothing_to_combine(tmp_path: pathlib.Path) -> None:
+    with pytest.raises(ValueError, match='No reports'):
+        combine_reports(str(tmp_path / 'out.json'), [str(tmp_path / '*')])
+    assert not (tmp_path / 'out.json').exists()
@@ -27,6 +27,12 @@ def test_defaults() -> None:
     assert config.connect_timeout is None
     assert config.read_timeout is None
     assert config.retries == 0
+    assert config.jobs == 1
+    assert config.cache_dir is None
+    assert config.cache_size == 256
+    assert config.cache_max_age == 30
+    assert not config.compress
+    assert config.compress_level == 6
 
 
 def test_to_payload_includes_only_set_payload_fields() -> None:
@@ -69,6 +75,15 @@ CLIENT_ONLY_FIELDS = (
     'connect_timeout',
     'read_timeout',
     'retries',
+    'pool_size',
+    'jobs',
+    'cache_dir',
+    'cache_size',
+    'cache_max_age',
+    'spool_dir',
+    'source_digest',
+    'compress',
+    'compress_level',
 )
 
 
@@ -167,6 +182,37 @@ def test_retries_rejects_negative() -> None:
         Config(retries=-1)
 
 
+@pytest.mark.parametrize(('raw', 'expected'), [(1, 1), (8, 8), ('4', 4)])
+def test_jobs_accepts_positive_integers(raw: Any, expected: int) -> None:
+    assert Config(jobs=raw).jobs == expected
+
+
+@pytest.mark.parametrize('raw', [0, -1, '0'])
+def test_jobs_rejects_less_than_one(raw: Any) -> None:
+    with pytest.raises(ValueError, match='must be at least 1'):
+        Config(jobs=raw)
+
+
+def test_pool_size_must_be_positive() -> None:
+    assert Config().pool_size == 10
+    raw: Any = '2'
+    assert Config(pool_size=raw).pool_size == 2
+    with pytest.raises(ValueError, match='must be at least 1'):
+        Config(pool_size=0)
+
+
+@pytest.mark.parametrize(('raw', 'expected'), [(0, 0), (9, 9), ('1', 1)])
+def test_compress_level_accepts_gzip_levels(raw: Any, expected: int) -> None:
+    assert Config(compress_level=raw).compress_level == expected
+
+
+def test_compress_level_rejects_out_of_range() -> None:
+    with pytest.raises(ValueError, match='must be at most 9'):
+        Config(compress_level=10)
+    with pytest.raises(ValueError, match='must not be negative'):
+        Config(compress_level=-1)
+
+
 @pytest.mark.parametrize(
     ('value', 'expected'),
     [
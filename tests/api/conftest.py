@@ -1,4 +1,13 @@
+import contextlib
+import gzip
+import http.server
+import json
 import pathlib
+import threading
+from collections.abc import Iterator
+from email.parser import BytesParser
+from email.policy import HTTP
+from typing import Any
 
 import pytest
 
@@ -18,3 +27,91 @@ def isolate_cwd(
     opt in with ``pytestmark = pytest.mark.usefixtures('isolate_cwd')``.
     """
     monkeypatch.chdir(tmp_path)
+
+
+EXPECTED = {
+    'message': 'Job #7.1',
+    'url': 'https://coveralls.io/jobs/5869',
+    'done': True,
+}
+
+
+class _Recorder(http.server.BaseHTTPRequestHandler):
+    # Replies with each status in turn (the last one repeats) and records the
+    # headers and raw body of every request it receives, and the client port
+    # of every connection. Speaks HTTP/1.1, so connections are kept alive.
+    protocol_version = 'HTTP/1.1'
+    statuses: list[int] = []
+    received: list[tuple[Any, bytes]] = []
+    ports: list[int] = []
+
+    def setup(self) -> None:
+        super().setup()
+        self.ports.append(self.client_address[1])
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        length = int(self.headers['Content-Length'])
+        self.received.append((self.headers, self.rfile.read(length)))
+        status = self.statuses[min(len(self.received), len(self.statuses)) - 1]
+        payload = json.dumps(EXPECTED).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    # Kept-alive connections idle until the client closes them; do not wait
+    # for that on shutdown. Concurrent clients connect all at once.
+    block_on_close = False
+    request_queue_size = 64
+
+
+@contextlib.contextmanager
+def stand_in_server(
+        *statuses: int, ports: list[int] | None = None,
+) -> Iterator[tuple[str, list[tuple[Any, bytes]]]]:
+    """
+    Serve the coveralls API on localhost for the duration of the block.
+
+    ``responses`` short-circuits urllib3's transport and never reads a
+    streamed body, so a real (local) server is what proves the bytes on the
+    wire. Yields its base URL and the requests it receives; the client port
+    of each connection is appended to ``ports``.
+    """
+    received: list[tuple[Any, bytes]] = []
+    handler = type(
+        'Handler', (_Recorder,),
+        {
+            'statuses': list(statuses), 'received': received,
+            'ports': [] if ports is None else ports,
+        },
+    )
+    server = _Server(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}', received
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=1)
+
+
+def json_file(headers: Any, body: bytes) -> bytes:
+    """Extract the (decompressed) json_file from a multipart request."""
+    message = BytesParser(policy=HTTP).parsebytes(
+        f'Content-Type: {headers["Content-Type"]}\r\n\r\n'.encode() + body,
+    )
+    [part] = message.iter_parts()
+    assert part.get_param('name', header='content-disposition') == 'json_file'
+    payload = part.get_payload(decode=True)
+    assert isinstance(payload, bytes)
+    if part.get_content_type() == 'application/gzip':
+        assert part.get_filename() == 'json_file.gz'
+        return gzip.decompress(payload)
+    return payload
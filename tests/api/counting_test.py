@@ -0,0 +1,205 @@
+import importlib
+import pathlib
+import shutil
+import subprocess
+import sys
+import textwrap
+import unittest.mock
+from collections.abc import Iterator
+from types import ModuleType
+
+import pytest
+
+from coveralls import Coveralls
+from coveralls.counting import HitCounter
+from coveralls.counting import load_counts
+
+
+EXAMPLE_DIR = pathlib.Path(__file__).parents[2] / 'example'
+
+WORKLOAD = textwrap.dedent("""\
+    def work(n):
+        total = 0
+        for i in range(n):
+            if i % 3:
+                total += i
+            else:
+                total -= 1
+        return total
+""")
+
+
+@pytest.fixture(name='workload')
+def fixture_workload(
+        tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch,
+) -> Iterator[ModuleType]:
+    (tmp_path / 'workload.py').write_text(WORKLOAD, encoding='utf-8')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield importlib.import_module('workload')
+    sys.modules.pop('workload', None)
+
+
+MONITORING = pytest.mark.skipif(
+    sys.version_info < (3, 12), reason='counting needs sys.monitoring (3.12+)',
+)
+
+
+@MONITORING
+def test_counts_lines_and_branches(
+        tmp_path: pathlib.Path, workload: ModuleType,
+) -> None:
+    counter = HitCounter(roots=[str(tmp_path)])
+    assert counter.start()
+    try:
+        workload.work(30)
+        workload.work(30)
+    finally:
+        counter.stop()
+
+    lines, arcs = counter.counts[str(tmp_path / 'workload.py')]
+    assert {line: lines[line] for line in (2, 4, 5, 7, 8)} == {
+        2: 2, 4: 60, 5: 40, 7: 20, 8: 2,
+    }
+    assert {arc: arcs[arc] for arc in ((3, 4), (4, 5), (4, 7), (3, 8))} == {
+        (3, 4): 60, (4, 5): 40, (4, 7): 20, (3, 8): 2,
+    }
+
+
+def test_cannot_count_without_monitoring(
+        monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr('coveralls.counting._MONITORING', None)
+    counter = HitCounter()
+    assert not counter.start()
+    counter.stop()
+
+
+def test_save_and_load_sum_counts(tmp_path: pathlib.Path) -> None:
+    data_file = str(tmp_path / '.coverage')
+    for count in (1, 2):
+        counter = HitCounter()
+        counter.counts['/src/a.py'] = ({1: count, 2: 3}, {(1, 2): count})
+        counter.save(data_file)
+    # neither half-written nor unrelated files are read
+    counts_dir = tmp_path / '.coveralls-counts'
+    (counts_dir / '.coverage.host.1.000001.partial').write_text('{')
+    (counts_dir / '.coverage.broken').write_text('{')
+    # nor are they where coverage.py would combine them
+    assert not list(tmp_path.glob('.coverage.*'))
+
+    assert load_counts(data_file) == {
+        '/src/a.py': ({1: 3, 2: 6}, {(1, 2): 3}),
+    }
+    assert not load_counts(str(tmp_path / 'other'))
+
+
+def test_reporter_reports_counts(
+        tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.chdir(EXAMPLE_DIR)
+    pathlib.Path('.coverage').unlink(missing_ok=True)
+    subprocess.call(
+        ['coverage', 'run', '--branch', '--omit=**/.tox/*', 'runtests.py'],
+        cwd=EXAMPLE_DIR,
+    )
+    cache_dir = str(tmp_path / 'cache')
+    binary = Coveralls(repo_token='xxx', cache_dir=cache_dir).get_coverage()
+
+    counter = HitCounter()
+    counter.counts[str(EXAMPLE_DIR / 'project.py')] = (
+        {2: 5, 13: 7, 16: 0}, {(15, 16): 4, (15, -12): 9},
+    )
+    counter.save('.coverage')
+    try:
+        counted = Coveralls(
+            repo_token='xxx', cache_dir=cache_dir,
+        ).get_coverage()
+    finally:
+        shutil.rmtree('.coveralls-counts')
+
+    project = binary[0]
+    assert project['name'] == 'project.py'
+    # the cached entry without counts is not reused
+    assert counted[0] == project | {
+        'coverage': [
+            1, 5, None, None, 1, None, None,
+            None, 1, 0, None, 1, 7, 1, 1, 1,
+        ],
+        'branches': [
+            13, 0, 14, 1, 13, 0, 15, 1, 15, 0, 16, 4, 15, 0, 12, 0,
+        ],
+    }
+    assert counted[1:] == binary[1:]
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 12), reason='counts beside coverage need 3.12+',
+)
+def test_plugin_counts_beside_coverage(tmp_path: pathlib.Path) -> None:
+    (tmp_path / 'workload.py').write_text(
+        WORKLOAD + 'work(30)\nwork(30)\n', encoding='utf-8',
+    )
+    (tmp_path / '.coveragerc').write_text(
+        '[run]\nbranch = True\nplugins = coveralls.counting\n',
+        encoding='utf-8',
+    )
+    subprocess.check_call(
+        [sys.executable, '-m', 'coverage', 'run', 'workload.py'],
+        cwd=tmp_path,
+    )
+
+    lines, arcs = load_counts(str(tmp_path / '.coverage'))[
+        str(tmp_path / 'workload.py')
+    ]
+    assert lines[4] == 60
+    assert arcs[4, 5] == 40
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 12), reason='counts beside coverage need 3.12+',
+)
+def test_plugin_counts_each_run_afresh(tmp_path: pathlib.Path) -> None:
+    (tmp_path / 'workload.py').write_text(
+        WORKLOAD + 'work(30)\n', encoding='utf-8',
+    )
+    (tmp_path / '.coveragerc').write_text(
+        '[run]\nplugins = coveralls.counting\n', encoding='utf-8',
+    )
+    data_file = str(tmp_path / '.coverage')
+    workload = str(tmp_path / 'workload.py')
+
+    def run(*args: str) -> int:
+        subprocess.check_call(
+            [sys.executable, '-m', 'coverage', *args], cwd=tmp_path,
+        )
+        return load_counts(data_file)[workload][0][4]
+
+    assert run('run', 'workload.py') == 30
+    assert run('run', 'workload.py') == 30
+    assert run('run', '--append', 'workload.py') == 60
+    # parallel runs add up until they are combined
+    assert run('run', '--parallel-mode', 'workload.py') == 30
+    assert run('run', '--parallel-mode', 'workload.py') == 60
+    assert run('combine') == 60
+    assert run('run', '--parallel-mode', 'workload.py') == 30
+
+
+@MONITORING
+def test_counting_looks_code_up_once(
+        tmp_path: pathlib.Path, workload: ModuleType,
+) -> None:
+    # The callbacks run for every line and branch; only the first event of
+    # each may look its code up, and code that is not counted must turn its
+    # events off rather than keep paying for them.
+    for roots, counted in (([tmp_path], True), ([tmp_path / 'other'], False)):
+        counter = HitCounter(roots=[str(root) for root in roots])
+        lookups = unittest.mock.Mock(wraps=counter.counted)
+        counter.counted = lookups  # type: ignore[method-assign]
+        assert counter.start()
+        try:
+            workload.work(10_000)
+        finally:
+            counter.stop()
+
+        assert bool(counter.counts) is counted
+        assert lookups.call_count < 100
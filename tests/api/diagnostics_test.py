@@ -0,0 +1,76 @@
+import json
+import logging
+import os
+import unittest.mock
+from typing import Any
+
+import pytest
+
+import coveralls
+from coveralls.api import _redacted
+from coveralls.vectors import json_default
+
+
+def synthetic_report(file_count: int, line_count: int) -> dict[str, Any]:
+    coverage_ = [None if i % 3 else i % 2 for i in range(line_count)]
+    return {
+        'source_files': [
+            {
+                'name': f'pkg/mod{i}.py', 'source': 'x = 1\n' * line_count,
+                'coverage': coverage_,
+            }
+            for i in range(file_count)
+        ],
+        'repo_token': 'xxx',
+        'service_name': 'coveralls-python',
+    }
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_create_report_makes_no_extra_passes_when_not_debugging(
+        caplog: pytest.LogCaptureFixture,
+) -> None:
+    caplog.set_level(logging.INFO, logger='coveralls')
+    api = coveralls.Coveralls(repo_token='xxx')
+    data = synthetic_report(10, 10)
+    with unittest.mock.patch.object(
+        api, 'create_data', return_value=data,
+    ), unittest.mock.patch(
+        'coveralls.api.json.dumps', wraps=json.dumps,
+    ) as dumps, unittest.mock.patch(
+        'coveralls.api._redacted', side_effect=AssertionError('redacted'),
+    ), unittest.mock.patch(
+        'coveralls.api._log_source_file',
+        side_effect=AssertionError('per-file stats'),
+    ):
+        report = api.create_report()
+
+    # the payload is serialized once, for sending, and never scanned again
+    dumps.assert_called_once_with(data, default=json_default)
+    assert json.loads(report) == data
+    assert not caplog.records
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_create_report_builds_diagnostics_when_debugging(
+        caplog: pytest.LogCaptureFixture,
+) -> None:
+    caplog.set_level(logging.DEBUG, logger='coveralls')
+    api = coveralls.Coveralls(repo_token='xxx')
+    data = synthetic_report(10, 10)
+    with unittest.mock.patch.object(
+        api, 'create_data', return_value=data,
+    ), unittest.mock.patch(
+        'coveralls.api.json.dumps', wraps=json.dumps,
+    ) as dumps, unittest.mock.patch(
+        'coveralls.api._redacted', wraps=_redacted,
+    ) as redacted, unittest.mock.patch(
+        'coveralls.api._log_source_file',
+    ) as log_source_file:
+        report = api.create_report()
+
+    # the same gate that skips the diagnostics lets them through
+    assert dumps.call_count == 2
+    redacted.assert_called_once_with(data)
+    assert log_source_file.call_count == len(data['source_files'])
+    assert json.loads(report) == data
@@ -0,0 +1,32 @@
+import pathlib
+import unittest.mock
+
+import pytest
+from coverage.python import get_python_source
+
+from coveralls.digest import stream_digest
+from coveralls.digest import text_digest
+from coveralls.reporter import CoverallReporter
+
+
+@pytest.mark.parametrize(
+    'source',
+    [
+        b'', b'\n', b'a = 1', b'a = 1\n', b'a = 1\n  ', b'a = 1\r\nb = 2\r\n',
+        b'a = 1\rb = 2\r', b'\r\n\r\n\n\r', b'a = "\xc3\xa9"\n\x0c\n# end',
+        b'\xef\xbb\xbfa = "\xc3\xa9"\r\n',
+        b'#!python\r# -*- coding: latin-1 -*-\ra = "\xe9"\r',
+    ],
+)
+@pytest.mark.parametrize('chunk_size', [1, 2, 1024])
+def test_stream_digest_matches_source(
+        tmp_path: pathlib.Path, source: bytes, chunk_size: int,
+) -> None:
+    path = tmp_path / 'module.py'
+    path.write_bytes(source)
+    with unittest.mock.patch(
+        'coveralls.digest.DIGEST_CHUNK_SIZE', chunk_size,
+    ):
+        digest, lines = stream_digest(str(path))
+    assert digest == text_digest(get_python_source(str(path)))
+    assert lines == CoverallReporter.count_lines(get_python_source(str(path)))
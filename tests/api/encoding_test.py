@@ -66,11 +66,11 @@ class TestEncoding:
 
         original_json_dumps = json.dumps
 
-        def mock_json_dumps(value: Any) -> str:
+        def mock_json_dumps(value: Any, **kwargs: Any) -> str:
             if value == 'def foo():\n    return "foo"\n':
                 raise UnicodeDecodeError('utf8', b'', 0, 1, 'bad data')
 
-            return original_json_dumps(value)
+            return original_json_dumps(value, **kwargs)
 
         with unittest.mock.patch(
                 'coveralls.api.json.dumps',
@@ -0,0 +1,95 @@
+import io
+import json
+import pathlib
+import tracemalloc
+import unittest.mock
+
+import pytest
+
+from coveralls.jsonstream import ReportReader
+
+
+REPORT = {
+    'repo_token': 'xxx',
+    'git': {'head': {'id': 'abc', 'message': 'ends with ]} and "quotes"'}},
+    'source_files': [
+        {'name': 'ünïcode/ℕ.py', 'source': 'x = "[{,}]"\n', 'coverage': [1]},
+        {'name': 'b.py', 'coverage': [None, 12345678901234, 0, None]},
+        {'name': 'c.py', 'coverage': [], 'branches': [1, 0, 2, 3]},
+    ],
+    'service_number': 1234567890123,
+    'parallel': False,
+}
+
+
+def read(data: bytes) -> tuple[list[object], bool]:
+    reader = ReportReader(io.BytesIO(data))
+    return list(reader), reader.has_source_files
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 1024 * 1024])
+@pytest.mark.parametrize('indent', [None, 4])
+def test_reads_source_files_at_any_chunk_size(
+        chunk_size: int, indent: int | None,
+) -> None:
+    # Small chunks split multi-byte characters, strings and numbers.
+    data = json.dumps(REPORT, indent=indent, ensure_ascii=False).encode()
+    with unittest.mock.patch('coveralls.jsonstream.CHUNK_SIZE', chunk_size):
+        assert read(data) == (REPORT['source_files'], True)
+
+
+@pytest.mark.parametrize(
+    ('data', 'expected'),
+    [
+        (b'{}', ([], False)),
+        (b' {"random": "stuff"} ', ([], False)),
+        (b'{"source_files": []}', ([], True)),
+        (
+            b'{"source_files": [{"name": "a"}], "after": 1}',
+            ([{'name': 'a'}], True),
+        ),
+    ],
+)
+def test_reads_small_reports(
+        data: bytes, expected: tuple[list[object], bool],
+) -> None:
+    assert read(data) == expected
+
+
+@pytest.mark.parametrize(
+    'data',
+    [
+        b'', b'[]', b'{"source_files": {}}', b'{"source_files": [{]}',
+        b'{"source_files": [1 2]}', b'{"source_files": [', b'{1: 2}',
+        b'{"a": 1',
+    ],
+)
+def test_malformed_report_raises(data: bytes) -> None:
+    with pytest.raises(ValueError):
+        read(data)
+
+
+def test_memory_is_bounded_by_entry_not_report(
+        tmp_path: pathlib.Path,
+) -> None:
+    entry = {'name': 'x.py', 'source': 'x = 1\n' * 200, 'coverage': [1] * 200}
+    path = tmp_path / 'report.json'
+    with path.open('w', encoding='utf-8') as handle:
+        handle.write('{"source_files": [')
+        handle.write(', '.join(json.dumps(entry) for _ in range(2000)))
+        handle.write(']}')
+    size = path.stat().st_size
+
+    tracemalloc.start()
+    try:
+        with path.open('rb') as handle, unittest.mock.patch(
+            'coveralls.jsonstream.CHUNK_SIZE', 64 * 1024,
+        ):
+            count = sum(1 for _ in ReportReader(handle))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert count == 2000
+    # json.load would need the whole file plus its object tree
+    assert peak < size / 2
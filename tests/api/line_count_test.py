@@ -0,0 +1,57 @@
+import pathlib
+
+import pytest
+from coverage.phystokens import source_token_lines
+from coverage.python import PythonFileReporter
+
+from coveralls.reporter import CoverallReporter
+
+
+BASE_DIR = pathlib.Path(__file__).parents[2]
+
+SOURCES = [
+    '',
+    '\n',
+    '\n\n\n',
+    'a = 1',
+    'a = 1\n',
+    'a = 1\n\n',
+    'a = 1\r\nb = 2\r\n',
+    'a = 1\r\nb = 2',
+    'a = 1\r\n\r\n',
+    'a = 1\n   ',
+    'a = 1\n\t\n',
+    'a = 1\n# trailing comment',
+    'if a:\n\tpass\n',
+    'x = 1 + \\\n    2\n',
+    'x = """a\nb\n"""\n',
+    'x = """a\r\nb\r\n"""\r\n',
+    's = f"""{\n1}\n"""\n',
+    'x = (\n    1,\n)\n',
+    'x = "\u2028"\n',
+    'x = 1\x0cy = 2\n',
+    'def f():\n    pass\n\n\n',
+]
+
+
+@pytest.mark.parametrize('source', SOURCES)
+def test_count_lines_matches_tokenizer(source: str) -> None:
+    expected = len(list(source_token_lines(source)))
+    assert CoverallReporter.count_lines(source) == expected
+
+
+@pytest.mark.parametrize(
+    'path',
+    sorted(
+        path
+        for folder in ('coveralls', 'example', 'nonunicode', 'tests')
+        for path in (BASE_DIR / folder).rglob('*.py')
+    ),
+    ids=lambda path: str(path.relative_to(BASE_DIR)),
+)
+def test_count_lines_matches_file_reporter(path: pathlib.Path) -> None:
+    # The reporter counts the normalized text returned by cu.source(), so the
+    # parity that matters is against the same file reporter's token lines.
+    cu = PythonFileReporter(str(path))
+    expected = len(list(cu.source_token_lines()))
+    assert CoverallReporter.count_lines(cu.source()) == expected
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import pathlib
+import unittest.mock
+from typing import Any
+
+import pytest
+from coverage.python import PythonFileReporter
+
+import coveralls.merge
+from coveralls.digest import stream_digest
+from coveralls.jsonstream import open_report
+from coveralls.merge import combine
+from coveralls.merge import combine_branches
+from coveralls.merge import combine_coverage
+from coveralls.merge import read_reports
+from coveralls.merge import SourceFiles
+
+
+OWN: dict[str, Any] = {
+    'name': 'pkg/mod.py',
+    'source': 'a = 1\nif a:\n    b = 2\n',
+    'coverage': [1, 1, 0],
+    'branches': [2, 0, 3, 0],
+}
+
+
+def test_combine_coverage_sums_hits_and_keeps_irrelevant_lines() -> None:
+    assert combine_coverage(
+        [None, 1, 0, None, 2], [None, 0, 3, 1],
+    ) == [None, 1, 3, 1, 2]
+
+
+def test_combine_branches_unions_quadruples() -> None:
+    assert combine_branches(
+        [2, 0, 3, 0, 2, 0, 5, 1], [2, 0, 5, 2, 7, 0, 8, 1],
+    ) == [2, 0, 3, 0, 2, 0, 5, 3, 7, 0, 8, 1]
+
+
+def test_combine_accepts_matching_digest_and_source() -> None:
+    digest = hashlib.md5(OWN['source'].encode('utf-8')).hexdigest()
+    other = {
+        'name': 'pkg/mod.py', 'source_digest': digest,
+        'coverage': [None, 2, 1], 'branches': [2, 0, 3, 1],
+    }
+
+    assert combine(OWN, other) == {
+        'name': 'pkg/mod.py',
+        'source': OWN['source'],
+        'source_digest': digest,
+        'coverage': [1, 3, 1],
+        'branches': [2, 0, 3, 1],
+    }
+    # neither input is modified
+    assert OWN['coverage'] == [1, 1, 0]
+
+
+def test_combine_accepts_streamed_digest_of_crlf_source(
+        tmp_path: pathlib.Path,
+) -> None:
+    path = tmp_path / 'mod.py'
+    path.write_bytes(b'x = 1\r\ny = 2\r\n')
+    source = {
+        'name': 'mod.py', 'source': PythonFileReporter(str(path)).source(),
+        'coverage': [1, 0],
+    }
+    digest = {
+        'name': 'mod.py', 'source_digest': stream_digest(str(path))[0],
+        'coverage': [0, 1],
+    }
+
+    assert combine(source, digest)['coverage'] == [1, 1]
+    assert combine(digest, source)['source'] == 'x = 1\ny = 2\n'
+
+
+def test_combine_rejects_different_sources() -> None:
+    other = OWN | {'source': 'a = 2\n'}
+    with pytest.raises(ValueError, match='pkg/mod.py'):
+        combine(OWN, other)
+
+
+def test_source_files_dedupes_by_name() -> None:
+    files = SourceFiles()
+    files.extend([
+        {'name': 'a.py', 'coverage': [1, None]},
+        {'name': 'b.py', 'coverage': [0]},
+        {'name': 'a.py', 'coverage': [1, 1]},
+    ])
+    assert list(files) == [
+        {'name': 'a.py', 'coverage': [2, 1]},
+        {'name': 'b.py', 'coverage': [0]},
+    ]
+
+    own: list[dict[str, Any]] = [
+        {'name': 'b.py', 'coverage': [1]}, {'name': 'c.py', 'coverage': []},
+    ]
+    assert list(files.merged_into(own)) == [
+        {'name': 'b.py', 'coverage': [1]},
+        {'name': 'c.py', 'coverage': []},
+        {'name': 'a.py', 'coverage': [2, 1]},
+    ]
+    # merging does not consume the index
+    assert len(files) == 2
+
+
+def test_source_files_leave_added_entries_alone() -> None:
+    entry = {'name': 'a.py', 'coverage': [1, None], 'branches': [1, 0, 0, 1]}
+    files = SourceFiles()
+    files.add(entry)
+    assert isinstance(entry['coverage'], list)
+    assert isinstance(entry['branches'], list)
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_merge_combines_with_own_report(tmp_path: pathlib.Path) -> None:
+    shards = []
+    for i, hits in enumerate(([0, 1, None], [None, 4, 1])):
+        shard = tmp_path / f'shard{i}.json'
+        shard.write_text(
+            json.dumps({
+                'source_files': [
+                    {'name': 'pkg/mod.py', 'coverage': hits},
+                    {'name': f'js/shard{i}.js', 'coverage': [1]},
+                ],
+            }), encoding='utf-8',
+        )
+        shards.append(shard)
+
+    api = coveralls.Coveralls(repo_token='xxx')
+    for shard in shards:
+        api.merge(str(shard))
+    with unittest.mock.patch.object(api, '_coverage', return_value=[OWN]):
+        data = api.create_data()
+
+    assert data['source_files'] == [
+        OWN | {'coverage': [1, 6, 1]},
+        {'name': 'js/shard0.js', 'coverage': [1]},
+        {'name': 'js/shard1.js', 'coverage': [1]},
+    ]
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_saved_report_matches_merged_data(tmp_path: pathlib.Path) -> None:
+    shard = tmp_path / 'shard.json'
+    shard.write_text(
+        json.dumps({
+            'source_files': [
+                {'name': 'pkg/mod.py', 'coverage': [1, 1, 1]},
+            ],
+        }), encoding='utf-8',
+    )
+
+    api = coveralls.Coveralls(repo_token='xxx')
+    api.merge(str(shard))
+    with unittest.mock.patch.object(
+        api, 'iter_coverage', return_value=iter([OWN]),
+    ):
+        api.save_report(str(tmp_path / 'report.json'))
+
+    report = json.loads((tmp_path / 'report.json').read_text('utf-8'))
+    assert report['source_files'] == [OWN | {'coverage': [2, 2, 1]}]
+
+
+def _write_shards(directory: pathlib.Path, count: int) -> None:
+    directory.mkdir()
+    for i in range(count):
+        (directory / f'shard{i:02}.json').write_text(
+            json.dumps({
+                'source_files': [
+                    {'name': 'pkg/mod.py', 'coverage': [i, None]},
+                    {'name': f'js/shard{i:02}.js', 'coverage': [1]},
+                ],
+            }), encoding='utf-8',
+        )
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_merge_many_files_and_globs(tmp_path: pathlib.Path) -> None:
+    _write_shards(tmp_path / 'shards', 40)
+    extra = tmp_path / 'extra.json'
+    extra.write_text(
+        json.dumps({
+            'source_files': [
+                {'name': 'pkg/mod.py', 'coverage': [1000, None]},
+            ],
+        }), encoding='utf-8',
+    )
+
+    api = coveralls.Coveralls(repo_token='xxx', jobs=4)
+    api.merge(str(extra), str(tmp_path / 'shards' / '*.json'))
+    with unittest.mock.patch.object(api, '_coverage', return_value=[]):
+        source_files = api.create_data()['source_files']
+
+    assert source_files[0] == {
+        'name': 'pkg/mod.py', 'coverage': [1000 + sum(range(40)), None],
+    }
+    # shards are merged in sorted order
+    assert [f['name'] for f in source_files[1:]] == [
+        f'js/shard{i:02}.js' for i in range(40)
+    ]
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_merge_unmatched_glob_warns(tmp_path: pathlib.Path) -> None:
+    api = coveralls.Coveralls(repo_token='xxx')
+    with unittest.mock.patch.object(
+        coveralls.merge.log, 'warning',
+    ) as warning:
+        api.merge(str(tmp_path / '*.json'))
+    warning.assert_called_once_with(
+        'No reports to merge match %s', str(tmp_path / '*.json'),
+    )
+
+
+def test_read_reports_reads_ahead_boundedly(tmp_path: pathlib.Path) -> None:
+    _write_shards(tmp_path / 'shards', 6)
+    paths = sorted(str(p) for p in (tmp_path / 'shards').iterdir())
+    opened: list[str] = []
+
+    def tracking_open(path: str) -> Any:
+        opened.append(path)
+        return open_report(path)
+
+    with unittest.mock.patch('coveralls.merge.open_report', tracking_open):
+        for consumed, report in enumerate(read_reports(paths, jobs=2)):
+            assert report.path == paths[consumed]
+            # the one being consumed plus at most `jobs` ahead of it
+            assert len(opened) <= consumed + 3
+            names = [source_file['name'] for source_file in report]
+            assert names == ['pkg/mod.py', f'js/shard{consumed:02}.js']
+            assert report.has_source_files
+
+    assert sorted(opened) == paths
+
+
+def test_read_reports_raises_worker_errors(tmp_path: pathlib.Path) -> None:
+    (tmp_path / 'bad.json').write_text('{"source_files": [{]}', 'utf-8')
+    for report in read_reports([str(tmp_path / 'bad.json')]):
+        with pytest.raises(ValueError):
+            list(report)
+
+
+def test_abandoned_read_reports_stops_workers(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / 'big.json'
+    path.write_text(
+        json.dumps({
+            'source_files': [
+                {'name': f'{i}.py', 'coverage': [1]} for i in range(1000)
+            ],
+        }), encoding='utf-8',
+    )
+
+    reports = read_reports([str(path)] * 3, jobs=3)
+    next(iter(next(reports)))
+    # closing the generator must not wait forever on workers whose queues
+    # are full
+    reports.close()
@@ -0,0 +1,128 @@
+import importlib
+import pathlib
+import subprocess
+import sys
+import textwrap
+import unittest.mock
+
+import coverage
+import pytest
+
+from coveralls import Coveralls
+from coveralls.monitor import _SPLIT_BRANCHES
+from coveralls.monitor import Collector
+from coveralls.monitor import measure
+
+
+pytestmark = pytest.mark.skipif(
+    sys.version_info < (3, 12), reason='sys.monitoring needs 3.12+',
+)
+
+# Shaped like tests/data/inttest.py, without the printing.
+WORKLOAD = textwrap.dedent("""\
+    def test_func(max_val):
+        total = 0
+        for idx in range(0, max_val):
+            if idx == -1:
+                total -= 1
+            elif idx == 4 and \\
+                    max_val > 4:
+                total += 4
+            elif idx == 6:
+                total += 6
+            elif idx == 12:
+                total -= 12
+            else:
+                total += 1
+        return total
+""")
+
+
+@pytest.mark.parametrize('branch', [False, True])
+def test_matches_coverage_py(
+        tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch,
+        branch: bool,
+) -> None:
+    (tmp_path / 'inttest.py').write_text(WORKLOAD, encoding='utf-8')
+    (tmp_path / 'runtests.py').write_text(
+        'import sys\nimport inttest\n'
+        'inttest.test_func(int(sys.argv[1]))\n',
+        encoding='utf-8',
+    )
+    monkeypatch.chdir(tmp_path)
+    flags = ['--branch'] if branch else []
+    subprocess.check_call([
+        sys.executable, '-m', 'coverage', 'run', *flags, 'runtests.py', '10',
+    ])
+    classic = Coveralls(repo_token='xxx').get_coverage()
+    try:
+        assert measure(['runtests.py', '10'], branch=branch) == 0
+    finally:
+        sys.modules.pop('inttest', None)
+
+    assert Coveralls(repo_token='xxx').get_coverage() == classic
+
+
+def test_exit_status_and_argv(
+        tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'script.py').write_text(
+        'import sys\nsys.exit(len(sys.argv))\n', encoding='utf-8',
+    )
+    (tmp_path / 'failing.py').write_text('1 / 0\n', encoding='utf-8')
+    argv = sys.argv
+
+    assert measure(['script.py', 'a', 'b']) == 3
+    assert measure(['failing.py']) == 1
+    assert measure(['-m', 'script']) == 1
+    assert sys.argv is argv
+
+    data = coverage.CoverageData('.coverage')
+    data.read()
+    assert data.lines(str(tmp_path / 'script.py')) == [1, 2]
+
+    with pytest.raises(ValueError, match='No such program'):
+        measure(['no-such-program'])
+
+
+@pytest.mark.parametrize(
+    'branch', [
+        False,
+        pytest.param(
+            True, marks=pytest.mark.skipif(
+                not _SPLIT_BRANCHES,
+                reason='branch events can only be disabled both ways at once',
+            ),
+        ),
+    ],
+)
+def test_events_stop_once_recorded(
+        tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch,
+        branch: bool,
+) -> None:
+    # Each line (and each way of a branch) needs recording only once: its
+    # event is then turned off, so measured code soon runs at full speed,
+    # where coverage.py's classic tracer is called for every line it runs.
+    (tmp_path / 'inttest.py').write_text(WORKLOAD, encoding='utf-8')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    try:
+        workload = importlib.import_module('inttest')
+    finally:
+        sys.modules.pop('inttest', None)
+
+    collector = Collector([str(tmp_path)], branch=branch)
+    callbacks = {
+        name: unittest.mock.Mock(wraps=getattr(collector, name))
+        for name in ('_on_line', '_on_branch')
+    }
+    for name, callback in callbacks.items():
+        setattr(collector, name, callback)
+    assert collector.start()
+    try:
+        workload.test_func(200_000)
+    finally:
+        collector.stop()
+
+    assert collector.lines[str(tmp_path / 'inttest.py')]
+    assert sum(callback.call_count for callback in callbacks.values()) < 100
@@ -2,13 +2,17 @@ import contextlib
 import pathlib
 import subprocess
 import textwrap
+import types
 import unittest.mock
+from collections.abc import Iterator
 from typing import Any
 
 import pytest
 import responses
 
 from coveralls import Coveralls
+from coveralls.digest import text_digest
+from coveralls.reporter import CoverallReporter
 
 
 BASE_DIR = pathlib.Path(__file__).parents[2]
@@ -233,6 +237,143 @@ class TestReporter:
         assert_coverage(results[0], expected_results[0])
         assert_coverage(results[1], expected_results[1])
 
+    def test_reporter_does_not_tokenize_python_sources(self) -> None:
+        subprocess.call(
+            [
+                'coverage', 'run', '--omit=**/.tox/*',
+                'runtests.py',
+            ], cwd=EXAMPLE_DIR,
+        )
+        with unittest.mock.patch(
+            'coverage.python.PythonFileReporter.source_token_lines',
+            side_effect=AssertionError('tokenizer should not run'),
+        ):
+            results = Coveralls(repo_token='xxx').get_coverage()
+
+        expected_results = self.make_test_results()
+        assert_coverage(results[0], expected_results[0])
+        assert_coverage(results[1], expected_results[1])
+
+    def test_reporter_parallel_matches_serial(self) -> None:
+        subprocess.call(
+            [
+                'coverage', 'run', '--branch', '--omit=**/.tox/*',
+                'runtests.py',
+            ], cwd=EXAMPLE_DIR,
+        )
+        serial = Coveralls(repo_token='xxx').get_coverage()
+        parallel = Coveralls(repo_token='xxx', jobs=2).get_coverage()
+        assert parallel == serial
+
+        expected_results = self.make_test_results(with_branches=True)
+        assert_coverage(parallel[0], expected_results[0])
+        assert_coverage(parallel[1], expected_results[1])
+
+    def test_reporter_parallel_falls_back_to_serial(self) -> None:
+        subprocess.call(
+            [
+                'coverage', 'run', '--omit=**/.tox/*',
+                'runtests.py',
+            ], cwd=EXAMPLE_DIR,
+        )
+        with unittest.mock.patch(
+            'coveralls.reporter.ProcessPoolExecutor',
+            side_effect=OSError('spawning is not permitted'),
+        ), unittest.mock.patch('coveralls.reporter.log.warning') as warn:
+            results = Coveralls(repo_token='xxx', jobs=2).get_coverage()
+
+        warn.assert_called_once()
+        expected_results = self.make_test_results()
+        assert_coverage(results[0], expected_results[0])
+        assert_coverage(results[1], expected_results[1])
+
+    def test_reporter_cache_reuses_unchanged_files(
+        self, tmp_path: pathlib.Path,
+    ) -> None:
+        subprocess.call(
+            [
+                'coverage', 'run', '--branch', '--omit=**/.tox/*',
+                'runtests.py',
+            ], cwd=EXAMPLE_DIR,
+        )
+        cache_dir = str(tmp_path / 'cache')
+        first = Coveralls(repo_token='xxx', cache_dir=cache_dir).get_coverage()
+        assert len(list((tmp_path / 'cache').glob('*.json'))) == 2
+
+        with unittest.mock.patch(
+            'coveralls.reporter.get_analysis_to_report',
+            side_effect=AssertionError('cached files should not be analyzed'),
+        ), unittest.mock.patch('coveralls.reporter.log.debug') as debug:
+            second = Coveralls(
+                repo_token='xxx', cache_dir=cache_dir,
+            ).get_coverage()
+
+        assert second == first
+        debug.assert_any_call('Report cache: %d hits, %d misses', 2, 0)
+
+        expected_results = self.make_test_results(with_branches=True)
+        assert_coverage(second[0], expected_results[0])
+        assert_coverage(second[1], expected_results[1])
+
+    def test_reporter_cache_misses_on_changed_coverage(
+        self, tmp_path: pathlib.Path,
+    ) -> None:
+        cache_dir = str(tmp_path / 'cache')
+        subprocess.call(
+            ['coverage', 'run', '--omit=**/.tox/*', 'runtests.py'],
+            cwd=EXAMPLE_DIR,
+        )
+        Coveralls(repo_token='xxx', cache_dir=cache_dir).get_coverage()
+
+        # the same files, now measured with branches: new data, new entries
+        subprocess.call(
+            [
+                'coverage', 'run', '--branch', '--omit=**/.tox/*',
+                'runtests.py',
+            ], cwd=EXAMPLE_DIR,
+        )
+        with unittest.mock.patch('coveralls.reporter.log.debug') as debug:
+            results = Coveralls(
+                repo_token='xxx', cache_dir=cache_dir,
+            ).get_coverage()
+
+        debug.assert_any_call('Report cache: %d hits, %d misses', 0, 2)
+        expected_results = self.make_test_results(with_branches=True)
+        assert_coverage(results[0], expected_results[0])
+        assert_coverage(results[1], expected_results[1])
+
+    def test_reporter_source_digest(self, tmp_path: pathlib.Path) -> None:
+        subprocess.call(
+            [
+                'coverage', 'run', '--branch', '--omit=**/.tox/*',
+                'runtests.py',
+            ], cwd=EXAMPLE_DIR,
+        )
+        full = Coveralls(repo_token='xxx').get_coverage()
+        with unittest.mock.patch(
+            'coverage.python.PythonFileReporter.source',
+            side_effect=AssertionError('source should not be read whole'),
+        ):
+            digested = Coveralls(
+                repo_token='xxx', source_digest=True, jobs=2,
+            ).get_coverage()
+
+        for entry, expected in zip(digested, full, strict=True):
+            assert entry == {
+                field: value for field, value in expected.items()
+                if field != 'source'
+            } | {'source_digest': text_digest(expected['source'])}
+
+        # cached entries keep their digest, and never mix with full ones
+        cache_dir = str(tmp_path / 'cache')
+        for _ in range(2):
+            assert Coveralls(
+                repo_token='xxx', cache_dir=cache_dir, source_digest=True,
+            ).get_coverage() == digested
+            assert Coveralls(
+                repo_token='xxx', cache_dir=cache_dir,
+            ).get_coverage() == full
+
     def test_missing_file(self) -> None:
         pathlib.Path('extra.py').write_text(
             'print("Python rocks!")\n', encoding='utf-8',
@@ -282,3 +423,54 @@ class TestReporter:
                 cov.submit_report('{}')
             mock_warn.assert_called()
             assert '422' in mock_warn.call_args_list[0][0][0]
+
+
+def synthetic_analysis(line_count: int) -> Any:
+    # Two statements in every three lines, one statement in five missed; the
+    # reporter only reads these two sets, so a namespace stands in for an
+    # Analysis.
+    statements = {i for i in range(1, line_count + 1) if i % 3}
+    missing = {i for i in statements if not i % 5}
+    return types.SimpleNamespace(statements=statements, missing=missing)
+
+
+def test_get_line_hits_matches_get_hits() -> None:
+    analysis = synthetic_analysis(1000)
+    # a statement past the end of the source is ignored, like get_hits does
+    analysis.statements.add(1001)
+    expected = [
+        CoverallReporter.get_hits(i, analysis) for i in range(1, 1001)
+    ]
+    assert CoverallReporter.get_line_hits(analysis, 1000) == expected
+
+
+class CountingSet(set[int]):
+    # counts how often the set is walked and tested for membership
+
+    def __init__(self, values: set[int]) -> None:
+        super().__init__(values)
+        self.iterations = 0
+        self.lookups = 0
+
+    def __iter__(self) -> Iterator[int]:
+        self.iterations += 1
+        return super().__iter__()
+
+    def __contains__(self, value: object) -> bool:
+        self.lookups += 1
+        return super().__contains__(value)
+
+
+def test_get_line_hits_walks_each_set_once() -> None:
+    # one pass over each analysis set, never a membership test per line
+    analysis = synthetic_analysis(1000)
+    analysis.statements = CountingSet(analysis.statements)
+    analysis.missing = CountingSet(analysis.missing)
+    with unittest.mock.patch.object(
+        CoverallReporter, 'get_hits', side_effect=AssertionError,
+    ):
+        CoverallReporter.get_line_hits(analysis, 1000)
+    assert analysis.statements.iterations == 1
+    assert analysis.missing.iterations == 1
+    assert analysis.statements.lookups == 0
+    assert analysis.missing.lookups == 0
@@ -36,6 +36,15 @@ def resolve_config(
         'COVERALLS_SKIP_SSL_VERIFY': '1',
         'COVERALLS_TIMEOUT': '30',
         'COVERALLS_RETRIES': '4',
+        'COVERALLS_POOL_SIZE': '2',
+        'COVERALLS_JOBS': '3',
+        'COVERALLS_CACHE_DIR': '.cache',
+        'COVERALLS_CACHE_SIZE': '64',
+        'COVERALLS_CACHE_MAX_AGE': '7',
+        'COVERALLS_SPOOL_DIR': 'spool',
+        'COVERALLS_SOURCE_DIGEST': 'true',
+        'COVERALLS_COMPRESS': 'true',
+        'COVERALLS_COMPRESS_LEVEL': '9',
         'COVERALLS_RCFILE': 'custom.rc',
         'COVERALLS_BASE_DIR': 'base',
         'COVERALLS_SRC_DIR': 'src',
@@ -54,6 +63,15 @@ def test_environment_variables() -> None:
     assert config.skip_ssl_verify
     assert config.timeout == 30.0
     assert config.retries == 4
+    assert config.pool_size == 2
+    assert config.jobs == 3
+    assert config.cache_dir == '.cache'
+    assert config.cache_size == 64
+    assert config.cache_max_age == 7
+    assert config.spool_dir == 'spool'
+    assert config.source_digest
+    assert config.compress
+    assert config.compress_level == 9
     # base_dir/src_dir/rcfile complete the convention on the env interface
     assert config.rcfile == 'custom.rc'
     assert config.base_dir == 'base'
@@ -119,6 +137,24 @@ def test_bool_override_precedence_is_owned_by_resolve() -> None:
         assert not resolve_config(skip_ssl_verify=False).skip_ssl_verify
 
 
+@pytest.mark.parametrize(
+    ('value', 'expected'),
+    [
+        ('true', True), ('TRUE', True), ('1', True), ('yes', True),
+        ('on', True), ('false', False), ('0', False), ('', False),
+    ],
+)
+def test_bool_env_settings_accept_truthy_values(
+        value: str, expected: bool,
+) -> None:
+    env = {'COVERALLS_COMPRESS': value}
+    with unittest.mock.patch.dict(os.environ, env, clear=True):
+        assert resolve({}).compress is expected
+    env = {'COVERALLS_SOURCE_DIGEST': value}
+    with unittest.mock.patch.dict(os.environ, env, clear=True):
+        assert resolve({}).source_digest is expected
+
+
 @pytest.mark.skipif(yaml is None, reason='requires PyYAML')
 @unittest.mock.patch.dict(os.environ, {}, clear=True)
 def test_file_source_and_unknown_key_warning(
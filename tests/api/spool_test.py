@@ -0,0 +1,131 @@
+import asyncio
+import gzip
+import itertools
+import json
+import os
+import pathlib
+import unittest.mock
+from typing import Any
+
+import coverage
+import pytest
+
+import coveralls
+from coveralls.spool import drain
+from coveralls.spool import DRAIN_RETRIES
+from tests.api.conftest import json_file
+from tests.api.conftest import stand_in_server
+
+
+SOURCE_FILE: dict[str, Any] = {'name': 'a.py', 'coverage': [1, None]}
+
+
+def _wear(spool_dir: pathlib.Path, **kwargs: Any) -> dict[str, Any]:
+    # nothing listens on the host: wear() must not touch the network
+    api = coveralls.Coveralls(
+        repo_token='xxx', host='http://127.0.0.1:9', spool_dir=str(spool_dir),
+        **kwargs,
+    )
+    with unittest.mock.patch.object(
+        api, 'iter_coverage', return_value=iter([SOURCE_FILE]),
+    ):
+        return api.wear()
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_wear_spools_one_report_per_job(tmp_path: pathlib.Path) -> None:
+    spool = tmp_path / 'spool'
+    result = _wear(spool, service_name='ci', service_job_id='1/2')
+    path = spool / 'ci-1%2F2.json'
+    assert result == {'message': f'Spooled report to {path}'}
+    report = json.loads(path.read_text('utf-8'))
+    assert report['source_files'] == [SOURCE_FILE]
+    assert report['service_job_id'] == '1/2'
+
+    # spooling the job again replaces its report, compressed or not
+    _wear(spool, service_name='ci', service_job_id='1/2', compress=True)
+    assert [p.name for p in spool.iterdir()] == ['ci-1%2F2.json.gz']
+    assert json.loads(
+        gzip.decompress((spool / 'ci-1%2F2.json.gz').read_bytes()),
+    ) == report
+
+    # jobs without an id never replace one another
+    _wear(spool)
+    _wear(spool)
+    assert len(list(spool.iterdir())) == 3
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_wear_fails_when_nothing_is_spooled(tmp_path: pathlib.Path) -> None:
+    spool = tmp_path / 'spool'
+    api = coveralls.Coveralls(repo_token='xxx', spool_dir=str(spool))
+    with unittest.mock.patch.object(
+        api, 'iter_coverage',
+        side_effect=coverage.exceptions.NoDataError('No data to report.'),
+    ), pytest.raises(coverage.exceptions.NoDataError):
+        api.wear()
+    assert not list(spool.iterdir())
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_drain_keeps_reports_until_uploaded(tmp_path: pathlib.Path) -> None:
+    spool = tmp_path / 'spool'
+    for job in range(3):
+        _wear(spool, service_job_id=str(job))
+    reports = {path.read_bytes() for path in spool.iterdir()}
+
+    with stand_in_server(503) as (host, received), unittest.mock.patch(
+        'coveralls.spool.time.sleep',
+    ):
+        api = coveralls.Coveralls(host=host, token_required=False)
+        summary = drain(api, str(spool))
+    assert len(summary.failed) == 3
+    assert len(received) == 3 * (DRAIN_RETRIES + 1)
+    assert len(list(spool.iterdir())) == 3
+
+    with stand_in_server(503, 200) as (host, received):
+        api = coveralls.Coveralls(
+            host=host, token_required=False, retries=1,
+        )
+        summary = drain(api, str(spool))
+    assert len(summary.uploaded) == 3
+    assert not list(spool.iterdir())
+    assert set(itertools.starmap(json_file, received)) == reports
+
+    assert not drain(api, str(spool)).uploaded
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_drain_retries_with_backoff(tmp_path: pathlib.Path) -> None:
+    spool = tmp_path / 'spool'
+    _wear(spool)
+
+    with stand_in_server(503, 503, 200) as (
+        host, received,
+    ), unittest.mock.patch('coveralls.spool.time.sleep') as sleep:
+        api = coveralls.Coveralls(host=host, token_required=False)
+        summary = drain(api, str(spool))
+    assert len(summary.uploaded) == 1
+    assert not summary.failed
+    assert len(received) == 3
+    assert not list(spool.iterdir())
+    # each wait is longer than the one before
+    [first], [second] = (call.args for call in sleep.call_args_list)
+    assert 0 < first < second
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_awear_spools_like_wear(tmp_path: pathlib.Path) -> None:
+    spool = tmp_path / 'spool'
+    # nothing listens on the host: awear() must not touch the network
+    api = coveralls.Coveralls(
+        repo_token='xxx', host='http://127.0.0.1:9', spool_dir=str(spool),
+        service_name='ci', service_job_id='1',
+    )
+    with unittest.mock.patch.object(
+        api, 'iter_coverage', return_value=iter([SOURCE_FILE]),
+    ):
+        result = asyncio.run(api.awear())
+    path = spool / 'ci-1.json'
+    assert result == {'message': f'Spooled report to {path}'}
+    assert json.loads(path.read_text('utf-8'))['source_files'] == [SOURCE_FILE]
@@ -0,0 +1,86 @@
+import pathlib
+import sqlite3
+import timeit
+
+import coverage
+
+from coveralls.sqldata import read_data
+
+
+def write_data(
+        path: pathlib.Path, files: int = 3, arcs: bool = False,
+) -> coverage.CoverageData:
+    data = coverage.CoverageData(basename=str(path))
+    if arcs:
+        data.add_arcs({
+            f'/src/mod{i}.py': {(-1, 1), (1, 2), (2, i + 3), (i + 3, -1)}
+            for i in range(files)
+        })
+    else:
+        data.add_lines({
+            f'/src/mod{i}.py': set(range(1, i + 3)) for i in range(files)
+        })
+    data.add_file_tracers({'/src/mod0.py': 'plugin.Tracer'})
+    data.write()
+    return data
+
+
+def test_matches_coverage_data(tmp_path: pathlib.Path) -> None:
+    for arcs in (False, True):
+        path = tmp_path / f'.coverage.{arcs}'
+        data = write_data(path, arcs=arcs)
+        measured = read_data(str(path))
+
+        assert measured is not None
+        assert measured.has_arcs() == data.has_arcs()
+        assert measured.measured_files() == data.measured_files()
+        for filename in (*data.measured_files(), '/src/unmeasured.py'):
+            assert measured.lines(filename) == (
+                set(data.lines(filename) or ()) or None
+            )
+            assert measured.arcs(filename) == (
+                set(data.arcs(filename) or ()) or None
+            )
+            assert measured.file_tracer(filename) == (
+                data.file_tracer(filename) or None
+            )
+
+
+def test_unreadable_data(tmp_path: pathlib.Path) -> None:
+    assert read_data(str(tmp_path / 'missing')) is None
+
+    (tmp_path / 'garbage').write_text('not a database', encoding='utf-8')
+    assert read_data(str(tmp_path / 'garbage')) is None
+
+    path = tmp_path / '.coverage'
+    write_data(path)
+    with sqlite3.connect(path) as connection:
+        connection.execute('UPDATE coverage_schema SET version = 99')
+    connection.close()
+    assert read_data(str(path)) is None
+
+
+def test_bulk_read_beats_per_file_queries(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / '.coverage'
+    write_data(path, files=1000, arcs=True)
+
+    def per_file() -> None:
+        data = coverage.CoverageData(basename=str(path))
+        data.read()
+        for filename in data.measured_files():
+            data.lines(filename)
+            data.arcs(filename)
+            data.file_tracer(filename)
+
+    def bulk() -> None:
+        measured = read_data(str(path))
+        assert measured is not None
+        for filename in measured.measured_files():
+            measured.lines(filename)
+            measured.arcs(filename)
+            measured.file_tracer(filename)
+
+    assert (
+        min(timeit.repeat(bulk, number=1, repeat=3))
+        < min(timeit.repeat(per_file, number=1, repeat=3))
+    )
@@ -0,0 +1,150 @@
+import pathlib
+import subprocess
+import sys
+import textwrap
+import unittest.mock
+
+import coverage
+import pytest
+
+from coveralls import Coveralls
+from coveralls.sqldata import read_data
+from coveralls.statements import ANALYZES_DATA
+from coveralls.statements import StatementCache
+from coveralls.statements import StatementTable
+from coveralls.statements import TableFileReporter
+
+
+pytestmark = pytest.mark.skipif(
+    not ANALYZES_DATA, reason='needs coverage.py 7.5+',
+)
+
+WORKLOAD = textwrap.dedent("""\
+    import os
+
+
+    def work(path, n):
+        total = 0
+        with open(path, 'w') as f:
+            for i in range(n):
+                if i % 3 and (
+                        i % 5):
+                    total += i
+                    continue
+                f.write(str(i))
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return total
+
+
+    work('scratch.txt', 10)
+""")
+
+
+@pytest.fixture(name='measured')
+def fixture_measured(
+        tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch,
+) -> pathlib.Path:
+    (tmp_path / 'workload.py').write_text(WORKLOAD, encoding='utf-8')
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def measure(branch: bool) -> None:
+    subprocess.check_call([
+        sys.executable, '-m', 'coverage', 'run',
+        *(['--branch'] if branch else []), 'workload.py',
+    ])
+
+
+@pytest.mark.usefixtures('measured')
+@pytest.mark.parametrize('branch', [False, True])
+def test_matches_coverage_py(branch: bool) -> None:
+    measure(branch)
+    fast = Coveralls(repo_token='xxx').get_coverage()
+    with unittest.mock.patch(
+        'coveralls.reporter.read_data', return_value=None,
+    ):
+        slow = Coveralls(repo_token='xxx').get_coverage()
+
+    assert fast == slow
+    assert fast[0]['name'] == 'workload.py'
+
+
+@pytest.mark.usefixtures('measured')
+def test_analysis_matches_get_analysis_to_report() -> None:
+    # pylint: disable-next=import-outside-toplevel
+    from coverage.report_core import get_analysis_to_report
+
+    measure(branch=True)
+    cov = coverage.Coverage()
+    cov.load()
+    data = read_data('.coverage')
+    assert data is not None
+
+    statements = StatementCache(cov)
+    ((reporter, fast_analysis),) = statements.analyze(
+        cov, data, sorted(data.measured_files()),
+    )
+    ((_, slow_analysis),) = get_analysis_to_report(cov, None)
+
+    # the workload has both, for the table to keep
+    assert isinstance(reporter, TableFileReporter)
+    assert reporter.table.multiline
+    assert reporter.table.with_jumps
+    assert fast_analysis.statements == slow_analysis.statements
+    assert fast_analysis.missing == slow_analysis.missing
+    assert fast_analysis.arcs_executed == slow_analysis.arcs_executed
+    assert fast_analysis.arcs_missing() == slow_analysis.arcs_missing()
+    assert fast_analysis.numbers == slow_analysis.numbers
+
+
+def test_statement_tables_are_cached(measured: pathlib.Path) -> None:
+    measure(branch=True)
+    cache_dir = measured / 'cache'
+    first = Coveralls(
+        repo_token='xxx', cache_dir=str(cache_dir),
+    ).get_coverage()
+    assert len(list((cache_dir / 'statements').glob('*.stmt'))) == 1
+
+    # only the report entries are lost, not the tables
+    for entry in cache_dir.glob('*.json'):
+        entry.unlink()
+    with unittest.mock.patch(
+        'coverage.parser.PythonParser.parse_source',
+        side_effect=AssertionError('cached files should not be parsed'),
+    ):
+        second = Coveralls(
+            repo_token='xxx', cache_dir=str(cache_dir),
+        ).get_coverage()
+    assert second == first
+
+
+def test_report_omit_and_errors(measured: pathlib.Path) -> None:
+    measure(branch=False)
+    (measured / '.coveragerc').write_text(
+        '[report]\nomit = workload.py\n', encoding='utf-8',
+    )
+    assert not Coveralls(repo_token='xxx').get_coverage()
+
+    (measured / 'workload.py').write_text('def (:\n', encoding='utf-8')
+    (measured / '.coveragerc').unlink()
+    with pytest.raises(RuntimeError, match="Couldn't parse"):
+        Coveralls(repo_token='xxx').get_coverage()
+
+
+def test_table_encoding_round_trips() -> None:
+    table = StatementTable(
+        statements={1, 2, 5, 1000}, excluded={3}, no_branch=set(),
+        multiline={5: 4, 6: 4}, arcs={(-1, 1), (1, 2), (2, -1)},
+        exit_counts={1: 1, 2: 2}, with_jumps={(3, 1): ((1, 4), (3, 4))},
+    )
+    assert StatementTable.decode(table.encode()) == table
+    lines_only = StatementTable({1}, set(), set(), {})
+    assert StatementTable.decode(lines_only.encode()) == lines_only
+
+    for blob in (b'', b'junk', table.encode()[:-4], lines_only.encode()[1:]):
+        with pytest.raises(ValueError):
+            StatementTable.decode(blob)
@@ -0,0 +1,45 @@
+import os
+import unittest.mock
+
+from requests.adapters import HTTPAdapter
+
+import coveralls
+from coveralls.transport import build_session
+from tests.api.conftest import EXPECTED
+from tests.api.conftest import stand_in_server
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_requests_reuse_one_connection() -> None:
+    ports: list[int] = []
+    with stand_in_server(200, ports=ports) as (host, received):
+        with coveralls.Coveralls(repo_token='xxx', host=host) as api:
+            assert api.submit_report('{"source_files": []}') == EXPECTED
+            assert api.parallel_finish() == EXPECTED
+            assert api.submit_report('{"source_files": []}') == EXPECTED
+
+    assert len(received) == 3
+    assert len(ports) == 1
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_close_releases_connections() -> None:
+    ports: list[int] = []
+    with stand_in_server(200, ports=ports) as (host, received):
+        api = coveralls.Coveralls(repo_token='xxx', host=host)
+        api.parallel_finish()
+        api.close()
+        api.close()
+        # a closed Coveralls reconnects on its next request
+        api.parallel_finish()
+        api.close()
+
+    assert len(received) == 2
+    assert len(set(ports)) == 2
+
+
+def test_pool_size() -> None:
+    with build_session(0, pool_size=3) as session:
+        adapter = session.get_adapter('https://coveralls.io')
+        assert isinstance(adapter, HTTPAdapter)
+        assert adapter.poolmanager.connection_pool_kw['maxsize'] == 3
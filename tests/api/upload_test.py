@@ -0,0 +1,181 @@
+import gzip
+import io
+import itertools
+import logging
+import os
+import pathlib
+import unittest.mock
+from typing import Any
+
+import pytest
+import requests
+
+import coveralls
+from coveralls.upload import MultipartBody
+from tests.api.conftest import EXPECTED
+from tests.api.conftest import json_file
+from tests.api.conftest import stand_in_server
+
+
+EXAMPLE_JSON = pathlib.Path(__file__).parents[2] / 'example' / 'example.json'
+
+
+def _is_gzipped(body: bytes) -> bool:
+    return b'Content-Type: application/gzip' in body.split(b'\r\n\r\n')[0]
+
+
+def test_body_matches_requests_multipart() -> None:
+    data = EXAMPLE_JSON.read_bytes()
+    body = MultipartBody(io.BytesIO(data))
+    boundary = body.content_type.split('boundary=')[1]
+
+    prepared = requests.Request(
+        'POST', 'http://localhost', files={'json_file': data.decode()},
+    ).prepare()
+    assert isinstance(prepared.body, bytes)
+    expected = prepared.body.replace(
+        prepared.headers['Content-Type'].split('boundary=')[1].encode(),
+        boundary.encode(),
+    )
+
+    assert body.read() == expected
+    assert len(body) == len(expected)
+
+
+def test_body_reads_in_small_chunks_and_rewinds() -> None:
+    body = MultipartBody(io.BytesIO(b'{"source_files": []}'))
+    whole = body.read()
+
+    body.seek(0)
+    chunks = iter(lambda: body.read(7), b'')
+    assert b''.join(chunks) == whole
+
+    body.seek(-10, io.SEEK_END)
+    assert body.read() == whole[-10:]
+
+
+def test_body_starts_at_current_file_position() -> None:
+    source = io.BytesIO(b'ignored{"source_files": []}')
+    source.seek(len('ignored'))
+    body = MultipartBody(source)
+    assert b'ignored' not in body.read()
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_submit_report_streams_file() -> None:
+    with stand_in_server(200) as (host, received):
+        api = coveralls.Coveralls(repo_token='xxx', host=host)
+        with EXAMPLE_JSON.open('rb') as report, unittest.mock.patch.object(
+            report, 'read', wraps=report.read,
+        ) as read:
+            assert api.submit_report(report) == EXPECTED
+
+    assert len(received) == 1
+    headers, body = received[0]
+    assert 'Transfer-Encoding' not in headers
+    assert int(headers['Content-Length']) == len(body)
+    assert json_file(headers, body) == EXAMPLE_JSON.read_bytes()
+    # the file is read piecemeal as it is sent, never all at once
+    assert all(call.args and call.args[0] > 0 for call in read.call_args_list)
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_submit_report_string_and_file_send_same_payload() -> None:
+    report = EXAMPLE_JSON.read_text(encoding='utf-8')
+    with stand_in_server(200) as (host, received):
+        api = coveralls.Coveralls(repo_token='xxx', host=host)
+        api.submit_report(report)
+        with EXAMPLE_JSON.open('rb') as handle:
+            api.submit_report(handle)
+
+    sent = list(itertools.starmap(json_file, received))
+    assert sent == [report.encode(), report.encode()]
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+@unittest.mock.patch('urllib3.util.retry.time.sleep')
+def test_submit_report_retry_resends_whole_file(_: Any) -> None:
+    with stand_in_server(503, 200) as (host, received):
+        api = coveralls.Coveralls(repo_token='xxx', host=host, retries=1)
+        with EXAMPLE_JSON.open('rb') as report:
+            assert api.submit_report(report) == EXPECTED
+
+    assert len(received) == 2
+    for headers, body in received:
+        assert json_file(headers, body) == EXAMPLE_JSON.read_bytes()
+
+
+def test_truncated_file_fails_loudly(tmp_path: pathlib.Path) -> None:
+    path = tmp_path / 'report.json'
+    path.write_bytes(b'{"source_files": []}')
+    with path.open('rb') as report:
+        body = MultipartBody(report)
+        path.write_bytes(b'{')
+        with pytest.raises(OSError, match='truncated'):
+            body.read()
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_submit_report_compresses_string(
+        caplog: pytest.LogCaptureFixture,
+) -> None:
+    report = EXAMPLE_JSON.read_text(encoding='utf-8')
+    with stand_in_server(200) as (host, received):
+        api = coveralls.Coveralls(repo_token='xxx', host=host, compress=True)
+        with caplog.at_level(logging.INFO, logger='coveralls.upload'):
+            assert api.submit_report(report) == EXPECTED
+
+    assert len(received) == 1
+    headers, body = received[0]
+    assert _is_gzipped(body)
+    assert json_file(headers, body) == report.encode()
+    [record] = caplog.records
+    assert record.args == (len(report.encode()), unittest.mock.ANY, 6)
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_submit_report_compresses_file_at_configured_level() -> None:
+    with stand_in_server(200) as (host, received):
+        api = coveralls.Coveralls(
+            repo_token='xxx', host=host, compress_level=1,
+        )
+        with EXAMPLE_JSON.open('rb') as report:
+            api.submit_report(report, compress=True)
+
+    assert len(received) == 1
+    headers, body = received[0]
+    assert _is_gzipped(body)
+    assert json_file(headers, body) == EXAMPLE_JSON.read_bytes()
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_submit_report_sends_gzipped_file_as_is(
+        tmp_path: pathlib.Path,
+) -> None:
+    path = tmp_path / 'report.json.gz'
+    path.write_bytes(gzip.compress(EXAMPLE_JSON.read_bytes()))
+    with stand_in_server(200) as (host, received):
+        api = coveralls.Coveralls(repo_token='xxx', host=host)
+        with path.open('rb') as report, unittest.mock.patch(
+            'coveralls.upload.compress',
+            side_effect=AssertionError('compressed twice'),
+        ):
+            api.submit_report(report, compress=True)
+            report.seek(0)
+            api.submit_report(report)
+
+    for headers, body in received:
+        assert _is_gzipped(body)
+        assert json_file(headers, body) == EXAMPLE_JSON.read_bytes()
+
+
+@unittest.mock.patch.dict(os.environ, {}, clear=True)
+def test_submit_report_compress_false_overrides_config() -> None:
+    with stand_in_server(200) as (host, received):
+        api = coveralls.Coveralls(repo_token='xxx', host=host, compress=True)
+        api.submit_report('{"source_files": []}', compress=False)
+
+    assert len(received) == 1
+    headers, body = received[0]
+    assert not _is_gzipped(body)
+    assert json_file(headers, body) == b'{"source_files": []}'
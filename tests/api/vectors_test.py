@@ -0,0 +1,171 @@
+import json
+import pathlib
+import pickle
+import subprocess
+import sys
+import tracemalloc
+import unittest.mock
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+
+from coveralls import Coveralls
+from coveralls.merge import SourceFiles
+from coveralls.vectors import Branches
+from coveralls.vectors import compact
+from coveralls.vectors import json_default
+from coveralls.vectors import LineHits
+from coveralls.vectors import listed
+
+
+def test_line_hits_stand_in_for_lists() -> None:
+    hits = LineHits([None, 1, 0, None, 7])
+    assert hits == [None, 1, 0, None, 7]
+    assert [None, 1, 0, None, 7] == hits
+    assert hits != [None, 1, 0, None]
+    assert len(hits) == 5
+    assert (hits[0], hits[1], hits[-1]) == (None, 1, 7)
+    assert hits[1:3] == [1, 0]
+    assert sum(filter(None, hits)) == 8
+    assert hits.tolist() == list(hits) == [None, 1, 0, None, 7]
+    assert not LineHits()
+
+    with pytest.raises(ValueError, match='Invalid hit count'):
+        LineHits([1, -1])
+
+
+def test_vectors_widen_to_fit() -> None:
+    for value in (254, 255, 65_536, 2 ** 40):
+        assert LineHits([None, value]) == [None, value]
+        assert Branches([value, 0, 1, value]) == [value, 0, 1, value]
+    assert LineHits.of(3, {1, 2}, {2}, {1: 300}) == [300, 0, None]
+
+
+def test_vectors_serialize_as_lists() -> None:
+    entry = compact({
+        'name': 'a.py', 'coverage': [None, 1, 0], 'branches': [2, 0, 3, 1],
+    })
+    assert isinstance(entry['coverage'], LineHits)
+    assert isinstance(entry['branches'], Branches)
+    assert json.loads(json.dumps(entry, default=json_default)) == {
+        'name': 'a.py', 'coverage': [None, 1, 0], 'branches': [2, 0, 3, 1],
+    }
+    # as report workers send them back
+    assert pickle.loads(pickle.dumps(entry)) == entry
+    assert listed(entry) == {
+        'name': 'a.py', 'coverage': [None, 1, 0], 'branches': [2, 0, 3, 1],
+    }
+    assert isinstance(listed(entry)['coverage'], list)
+    assert isinstance(entry['coverage'], LineHits)
+
+    with pytest.raises(TypeError):
+        json.dumps({1, 2}, default=json_default)
+
+
+def test_merged_entries_stay_compact() -> None:
+    files = SourceFiles()
+    files.add({'name': 'a.py', 'coverage': [None, 1, 0]})
+    files.add({
+        'name': 'a.py', 'coverage': [None, 0, 2, 1], 'branches': [2, 0, 3, 1],
+    })
+    merged, = files
+    assert isinstance(merged['coverage'], LineHits)
+    assert merged['coverage'] == [None, 1, 2, 1]
+    assert merged['branches'] == [2, 0, 3, 1]
+
+
+def test_get_coverage_hands_out_lists(
+        tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    (tmp_path / 'mod.py').write_text(
+        'def f(x):\n    if x:\n        return 1\n    return 0\n\n\nf(1)\n',
+        encoding='utf-8',
+    )
+    monkeypatch.chdir(tmp_path)
+    subprocess.check_call(
+        [sys.executable, '-m', 'coverage', 'run', '--branch', 'mod.py'],
+    )
+    extra = {
+        'source_files': [
+            {'name': 'mod.py', 'coverage': [1, 1, 0, 1, None, None, 1]},
+            {'name': 'other.py', 'coverage': [1, None], 'branches': []},
+        ],
+    }
+
+    api = Coveralls(repo_token='xxx')
+    (own,) = api.get_coverage()
+    assert isinstance(own['coverage'], list)
+    assert isinstance(own['branches'], list)
+    assert own['coverage'] == [1, 1, 1, 0, None, None, 1]
+
+    # the payload keeps them compact, up to serializing it
+    data = api.create_data(extra)
+    for entry in data['source_files']:
+        assert isinstance(entry['coverage'], LineHits)
+        assert isinstance(entry['branches'], Branches)
+    assert data['source_files'][0]['coverage'] == [2, 2, 1, 1, None, None, 2]
+    assert json.loads(api.create_report())['source_files'] == [
+        listed(entry) for entry in data['source_files']
+    ]
+
+
+def allocated(build: Callable[[], Any]) -> int:
+    """The memory still held by what ``build`` returns."""
+    tracemalloc.start()
+    try:
+        built = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert built
+    return size
+
+
+def test_vectors_use_far_less_memory_than_lists() -> None:
+    # 100 files of 2000 lines, as parsed from a JSON report
+    report = json.dumps([
+        {
+            'coverage': [None if i % 3 else i % 2 for i in range(2000)],
+            'branches': [
+                value for line in range(1, 2000, 10)
+                for value in (line, 0, line + 1, line % 2)
+            ],
+        }
+        for _ in range(100)
+    ])
+
+    as_lists = allocated(lambda: json.loads(report))
+    as_vectors = allocated(
+        lambda: [compact(entry) for entry in json.loads(report)],
+    )
+    assert as_vectors * 4 < as_lists
+
+
+def test_payload_uses_far_less_memory_than_lists() -> None:
+    # 100 files of 2000 lines, as the reporter builds them
+    def source_files() -> list[dict[str, Any]]:
+        return [
+            compact({
+                'name': f'mod{i}.py',
+                'coverage': [None if j % 3 else j % 2 for j in range(2000)],
+                'branches': [
+                    value for line in range(1, 2000, 10)
+                    for value in (line, 0, line + 1, line % 2)
+                ],
+            })
+            for i in range(100)
+        ]
+
+    def payload() -> dict[str, Any]:
+        api = Coveralls(repo_token='xxx')
+        with unittest.mock.patch.object(
+            api, '_coverage', side_effect=source_files,
+        ):
+            return api.create_data()
+
+    as_vectors = allocated(payload)
+    as_lists = allocated(
+        lambda: [listed(entry) for entry in source_files()],
+    )
+    assert as_vectors * 4 < as_lists
@@ -1,5 +1,6 @@
 import contextlib
 import json
+import logging
 import os
 import pathlib
 import socket
@@ -16,9 +17,9 @@ import responses
 from requests.adapters import HTTPAdapter
 
 import coveralls
-from coveralls.api import _build_session
 from coveralls.api import log
-from coveralls.api import RETRY_BACKOFF_MAX
+from coveralls.transport import build_session
+from coveralls.transport import RETRY_BACKOFF_MAX
 
 
 EXPECTED = {
@@ -76,7 +77,7 @@ def test_client_settings_do_not_leak_into_payload() -> None:
         read_timeout=25,
         retries=3,
     )
-    with unittest.mock.patch.object(api, 'get_coverage', return_value=[]):
+    with unittest.mock.patch.object(api, '_coverage', return_value=[]):
         data = api.create_data()
 
     for leaked in (
@@ -100,7 +101,7 @@ def test_set_payload_fields_are_forwarded_including_falsey() -> None:
         parallel=False,
         service_job_id=0,
     )
-    with unittest.mock.patch.object(api, 'get_coverage', return_value=[]):
+    with unittest.mock.patch.object(api, '_coverage', return_value=[]):
         data = api.create_data()
 
     assert data['run_at'] == '2013-02-18 00:52:48 -0800'
@@ -163,11 +164,14 @@ def test_dry_run() -> None:
 
 
 @responses.activate
-def test_repo_token_in_not_compromised_verbose() -> None:
-    with unittest.mock.patch.object(log, 'debug') as logger:
-        coveralls.Coveralls(repo_token='xxx').wear(dry_run=True)
+def test_repo_token_in_not_compromised_verbose(
+        caplog: pytest.LogCaptureFixture,
+) -> None:
+    caplog.set_level(logging.DEBUG, logger='coveralls')
+    coveralls.Coveralls(repo_token='xxx').wear(dry_run=True)
 
-    assert 'xxx' not in logger.call_args[0][0]
+    assert '"repo_token": "[secure]"' in caplog.text
+    assert 'xxx' not in caplog.text
 
 
 @responses.activate
@@ -294,7 +298,7 @@ def _hanging_server() -> Iterator[str]:
 def test_submit_report_read_timeout_raises_timeout_error() -> None:
     # Regression guard: with retries off (the default) a read timeout must
     # still surface as TimeoutError, not the generic "Could not submit
-    # coverage" RuntimeError. See _build_session's read=0/False handling.
+    # coverage" RuntimeError. See build_session's read=0/False handling.
     with _hanging_server() as host:
         api = coveralls.Coveralls(
             repo_token='xxx', host=host,
@@ -429,7 +433,7 @@ def test_retries_do_not_honour_retry_after_header() -> None:
     # hang CI for hours on our supported range. Guard that we ignore the header
     # and rely on our own bounded backoff instead. This cannot be exercised via
     # responses, which does not drive urllib3's retry sleep machinery.
-    adapter = _build_session(3).get_adapter('https://coveralls.io')
+    adapter = build_session(3).get_adapter('https://coveralls.io')
     assert isinstance(adapter, HTTPAdapter)
     retry = adapter.max_retries
     assert retry.respect_retry_after_header is False
@@ -1,11 +1,21 @@
+import gzip
+import io
 import json
 import os
 import pathlib
+import subprocess
+from collections.abc import Iterator
 from unittest import mock
 
+import coverage
+import pytest
+
 from coveralls import Coveralls
 
 
+EXAMPLE_DIR = pathlib.Path(__file__).parent.parent / 'example'
+
+
 @mock.patch.dict(os.environ, {}, clear=True)
 def test_output_to_file(tmp_path: pathlib.Path) -> None:
     """Check we can write coveralls report into the file."""
@@ -14,3 +24,80 @@ def test_output_to_file(tmp_path: pathlib.Path) -> None:
     report = test_log.read_text(encoding='utf-8')
 
     assert json.loads(report)['repo_token'] == 'xxx'
+
+
+@pytest.fixture(scope='function')
+def example_coverage(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.chdir(EXAMPLE_DIR)
+    subprocess.check_call(
+        ['coverage', 'run', '--branch', '--omit=**/.tox/*', 'runtests.py'],
+    )
+    yield
+    pathlib.Path('.coverage').unlink(missing_ok=True)
+
+
+@pytest.mark.usefixtures('example_coverage')
+@mock.patch.dict(os.environ, {'COVERALLS_RUN_AT': 'now'}, clear=True)
+def test_streamed_report_matches_create_report() -> None:
+    streamed, built = Coveralls(repo_token='xxx'), Coveralls(repo_token='xxx')
+    for api in (streamed, built):
+        api.merge(str(EXAMPLE_DIR / 'example.json'))
+    stream = io.StringIO()
+    streamed.write_report(stream)
+
+    assert stream.getvalue() == built.create_report()
+    assert len(json.loads(stream.getvalue())['source_files']) == 4
+
+
+@pytest.mark.usefixtures('example_coverage')
+@mock.patch.dict(os.environ, {}, clear=True)
+def test_save_report_streams_without_building_payload(
+        tmp_path: pathlib.Path,
+) -> None:
+    api = Coveralls(repo_token='xxx')
+    with mock.patch.object(
+        api, 'create_data', side_effect=AssertionError('payload built'),
+    ), mock.patch('json.dumps', wraps=json.dumps) as dumps:
+        api.save_report(str(tmp_path / 'report.json'))
+
+    report = json.loads((tmp_path / 'report.json').read_text('utf-8'))
+    assert [f['name'] for f in report['source_files']] == [
+        'project.py', 'runtests.py',
+    ]
+    # each source file is serialized on its own, never the whole report
+    assert not any(
+        isinstance(call.args[0], dict) and 'source_files' in call.args[0]
+        for call in dumps.call_args_list
+    )
+
+
+@mock.patch.dict(os.environ, {}, clear=True)
+def test_save_report_failure_leaves_no_file(tmp_path: pathlib.Path) -> None:
+    api = Coveralls(repo_token='xxx')
+    report = tmp_path / 'report.json'
+    with mock.patch.object(
+        api, 'iter_coverage',
+        side_effect=coverage.CoverageException('No data to report'),
+    ):
+        api.save_report(str(report))
+
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.mark.usefixtures('example_coverage')
+@mock.patch.dict(os.environ, {'COVERALLS_RUN_AT': 'now'}, clear=True)
+def test_save_report_compress_writes_gzip(tmp_path: pathlib.Path) -> None:
+    api = Coveralls(repo_token='xxx', compress=True)
+    api.save_report(str(tmp_path / 'report.json'))
+
+    assert [p.name for p in tmp_path.iterdir()] == ['report.json.gz']
+    with gzip.open(tmp_path / 'report.json.gz', 'rt', encoding='utf-8') as f:
+        assert f.read() == Coveralls(repo_token='xxx').create_report()
+
+
+@pytest.mark.usefixtures('example_coverage')
+@mock.patch.dict(os.environ, {}, clear=True)
+def test_save_report_gz_path_is_compressed(tmp_path: pathlib.Path) -> None:
+    Coveralls(repo_token='xxx').save_report(str(tmp_path / 'out.gz'))
+    with gzip.open(tmp_path / 'out.gz', 'rt', encoding='utf-8') as f:
+        assert json.load(f)['repo_token'] == 'xxx'
@@ -0,0 +1,53 @@
+import gzip
+import json
+import pathlib
+from unittest import mock
+
+import coveralls.cli
+
+
+@mock.patch('coveralls.cli.combine_reports')
+def test_combine(mock_combine: mock.MagicMock) -> None:
+    coveralls.cli.main(argv=['combine', 'out.json', 'a.json', 'shards/*'])
+    mock_combine.assert_called_once_with(
+        'out.json', ['a.json', 'shards/*'], jobs=1, tree=False,
+    )
+
+
+@mock.patch('coveralls.cli.combine_reports')
+def test_combine_tree(mock_combine: mock.MagicMock) -> None:
+    coveralls.cli.main(
+        argv=['combine', '--tree', '--jobs=4', 'out.json', 'shards/*'],
+    )
+    mock_combine.assert_called_once_with(
+        'out.json', ['shards/*'], jobs=4, tree=True,
+    )
+
+
+def test_combine_saved_reports(tmp_path: pathlib.Path) -> None:
+    for i in range(3):
+        (tmp_path / f'shard{i}.json').write_text(
+            json.dumps({
+                'source_files': [{'name': 'a.py', 'coverage': [i, None]}],
+                'service_job_id': str(i),
+            }), encoding='utf-8',
+        )
+    (tmp_path / 'shard3.json.gz').write_bytes(
+        gzip.compress(
+            json.dumps({
+                'source_files': [{'name': 'b.py', 'coverage': [1]}],
+            }).encode(),
+        ),
+    )
+
+    coveralls.cli.main(
+        argv=['combine', str(tmp_path / 'out.json'), str(tmp_path / 'shard*')],
+    )
+
+    combined = json.loads((tmp_path / 'out.json').read_text('utf-8'))
+    assert combined == {
+        'source_files': [
+            {'name': 'a.py', 'coverage': [3, None]},
+            {'name': 'b.py', 'coverage': [1]},
+        ],
+    }
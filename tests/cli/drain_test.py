@@ -0,0 +1,37 @@
+import os
+import pathlib
+from unittest import mock
+
+import pytest
+
+import coveralls.cli
+from tests.api.conftest import stand_in_server
+
+
+@mock.patch.dict(os.environ, {}, clear=True)
+def test_drain(tmp_path: pathlib.Path) -> None:
+    for job in range(2):
+        (tmp_path / f'{job}.json').write_text('{"source_files": []}', 'utf-8')
+
+    env = {'COVERALLS_SPOOL_DIR': str(tmp_path)}
+    with stand_in_server(200) as (host, received):
+        with mock.patch.dict(os.environ, env):
+            coveralls.cli.main(argv=['drain', f'--host={host}'])
+
+    assert len(received) == 2
+    assert not list(tmp_path.iterdir())
+
+
+@mock.patch.dict(os.environ, {}, clear=True)
+def test_drain_needs_spool_dir() -> None:
+    with pytest.raises(SystemExit) as exc:
+        coveralls.cli.main(argv=['drain'])
+    assert exc.value.code == 2
+
+
+@mock.patch.dict(os.environ, {'TRAVIS': 'True'}, clear=True)
+@mock.patch('coveralls.cli.Coveralls')
+def test_spool_dir_arg(mock_coveralls: mock.MagicMock) -> None:
+    coveralls.cli.main(argv=['--spool-dir=spool'])
+    assert mock_coveralls.call_args.kwargs['spool_dir'] == 'spool'
+    mock_coveralls.return_value.wear.assert_called_once_with()
@@ -0,0 +1,45 @@
+import pathlib
+import sys
+
+import coverage
+import pytest
+
+import coveralls.cli
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 12), reason='sys.monitoring needs 3.12+',
+)
+def test_run(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'script.py').write_text(
+        'import sys\n'
+        'if sys.argv[1:] == ["--fail"]:\n'
+        '    sys.exit(5)\n',
+        encoding='utf-8',
+    )
+
+    coveralls.cli.main(
+        argv=['run', '--branch', '--data-file=data', '--', 'script.py'],
+    )
+    data = coverage.CoverageData('data')
+    data.read()
+    assert data.has_arcs()
+    assert data.lines(str(tmp_path / 'script.py')) == [1, 2]
+
+    with pytest.raises(SystemExit) as exc:
+        coveralls.cli.main(argv=['run', 'script.py', '--fail'])
+    assert exc.value.code == 5
+
+    with pytest.raises(SystemExit) as exc:
+        coveralls.cli.main(argv=['run', 'no-such-program'])
+    assert exc.value.code == 2
+
+
+@pytest.mark.skipif(
+    sys.version_info >= (3, 12), reason='sys.monitoring is available',
+)
+def test_run_needs_sys_monitoring() -> None:
+    with pytest.raises(SystemExit) as exc:
+        coveralls.cli.main(argv=['run', 'script.py'])
+    assert exc.value.code == 1
@@ -47,3 +47,12 @@ def test_submit_family_accepts_merge_and_parallel(
     )
     mock_coveralls.return_value.merge.assert_called_once_with('extra.json')
     mock_coveralls.return_value.save_report.assert_called_once_with('o')
+
+
+@mock.patch.dict(os.environ, {'TRAVIS': 'True'}, clear=True)
+@mock.patch('coveralls.cli.Coveralls')
+def test_save_compress_args(mock_coveralls: mock.MagicMock) -> None:
+    coveralls.cli.main(argv=['save', 'o', '--compress', '--compress-level=9'])
+    mock_coveralls.assert_called_with(
+        False, **coveralls_kwargs(compress=True, compress_level=9),
+    )
@@ -0,0 +1,101 @@
+import json
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+
+# The slowest imports a command can pull in: coverage.py (plus our reporter)
+# for measuring, requests (plus urllib3) for talking to the API.
+MEASURING = {'coverage', 'coveralls.reporter', 'coveralls.cache'}
+POSTING = {'requests', 'urllib3', 'coveralls.transport', 'coveralls.upload'}
+# Cumulative `python -X importtime` budget for importing the CLI, which every
+# command pays before doing anything. Importing it currently takes well under
+# half of this; eagerly importing coverage.py and requests again blows it.
+STARTUP_BUDGET_US = 250_000
+
+RUN_COMMAND = '''
+import json, sys, unittest.mock
+import coveralls.cli
+
+# Stand in for the network without importing anything from it up front.
+response = unittest.mock.Mock(status_code=200)
+response.json.return_value = {'done': True, 'url': 'u', 'message': 'm'}
+transport = sys.modules['coveralls.transport'] = unittest.mock.Mock()
+transport.Client.return_value.post.return_value = response
+try:
+    coveralls.cli.main(sys.argv[1:])
+except SystemExit as e:
+    assert not e.code, e.code
+del sys.modules['coveralls.transport']
+print(json.dumps(sorted(sys.modules)))
+'''
+
+
+def _modules_after(cwd: pathlib.Path, *argv: str) -> set[str]:
+    env = {
+        key: value for key, value in os.environ.items()
+        if not key.startswith(('COVERALLS_', 'GITHUB_', 'CI'))
+    }
+    env['COVERALLS_REPO_TOKEN'] = 'xxx'
+    result = subprocess.run(
+        [sys.executable, '-c', RUN_COMMAND, *argv],
+        cwd=cwd, env=env, check=True, capture_output=True, text=True,
+    )
+    modules: list[str] = json.loads(result.stdout.splitlines()[-1])
+    # top-level packages, plus our own submodules
+    return {name.split('.')[0] for name in modules} | {
+        name for name in modules if name.startswith('coveralls.')
+    }
+
+
+def _import_time_us() -> int:
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import coveralls.cli'],
+        check=True, capture_output=True, text=True,
+    )
+    # import time: self [us] | cumulative | imported package
+    for line in result.stderr.splitlines():
+        _, cumulative, name = line.rsplit('|', 2)
+        if name.strip() == 'coveralls.cli':
+            return int(cumulative)
+    raise AssertionError(f'coveralls.cli not imported:\n{result.stderr}')
+
+
+def test_finish_never_imports_coverage(tmp_path: pathlib.Path) -> None:
+    modules = _modules_after(tmp_path, 'finish')
+    assert not modules & MEASURING
+
+
+def test_save_never_imports_requests(tmp_path: pathlib.Path) -> None:
+    (tmp_path / 'project.py').write_text('x = 1\n', encoding='utf-8')
+    subprocess.run(
+        [sys.executable, '-m', 'coverage', 'run', 'project.py'],
+        cwd=tmp_path, check=True,
+    )
+
+    modules = _modules_after(tmp_path, 'save', 'report.json')
+    assert 'coverage' in modules
+    assert not modules & POSTING
+    report = json.loads((tmp_path / 'report.json').read_text('utf-8'))
+    assert [f['name'] for f in report['source_files']] == ['project.py']
+
+
+def test_version_imports_neither(tmp_path: pathlib.Path) -> None:
+    modules = _modules_after(tmp_path, '--version')
+    assert not modules & (MEASURING | POSTING)
+
+
+@pytest.mark.skipif(
+    sys.flags.dev_mode or 'COVERAGE_RUN' in os.environ,
+    reason='import time is only meaningful without tracing overhead',
+)
+def test_startup_import_time_budget() -> None:
+    # Best of a few runs, to ride out a busy machine.
+    best = min(_import_time_us() for _ in range(3))
+    assert best < STARTUP_BUDGET_US, (
+        f'importing coveralls.cli took {best / 1000:.0f}ms, over the '
+        f'{STARTUP_BUDGET_US / 1000:.0f}ms budget'
+    )
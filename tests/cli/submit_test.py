@@ -85,6 +85,16 @@ def test_merge_before_submit(mock_coveralls: mock.MagicMock) -> None:
     mock_coveralls.return_value.wear.assert_called_once_with()
 
 
+@mock.patch.dict(os.environ, {'TRAVIS': 'True'}, clear=True)
+@mock.patch('coveralls.cli.Coveralls')
+def test_merge_many_before_submit(mock_coveralls: mock.MagicMock) -> None:
+    # --merge repeats; all reports (and glob patterns) go to one merge() call.
+    coveralls.cli.main(argv=['--merge=js.json', '--merge', 'shards/*.json'])
+    mock_coveralls.return_value.merge.assert_called_once_with(
+        'js.json', 'shards/*.json',
+    )
+
+
 @mock.patch.dict(os.environ, {}, clear=True)
 @mock.patch.object(coveralls.cli.log, 'warning')
 @mock.patch('coveralls.cli.Coveralls')
@@ -185,6 +195,28 @@ def test_connect_and_read_timeout_args(mock_coveralls: mock.MagicMock) -> None:
     )
 
 
+@mock.patch.dict(os.environ, {'TRAVIS': 'True'}, clear=True)
+@mock.patch('coveralls.cli.Coveralls')
+def test_jobs_arg(mock_coveralls: mock.MagicMock) -> None:
+    coveralls.cli.main(argv=['--jobs=4'])
+    mock_coveralls.assert_called_with(True, **coveralls_kwargs(jobs=4))
+
+
+@mock.patch.dict(os.environ, {'TRAVIS': 'True'}, clear=True)
+@mock.patch('coveralls.cli.Coveralls')
+def test_cache_args(mock_coveralls: mock.MagicMock) -> None:
+    coveralls.cli.main(
+        argv=[
+            '--cache-dir=.cache', '--cache-size=64', '--cache-max-age=7',
+        ],
+    )
+    mock_coveralls.assert_called_with(
+        True, **coveralls_kwargs(
+            cache_dir='.cache', cache_size=64, cache_max_age=7,
+        ),
+    )
+
+
 @mock.patch.dict(os.environ, {'TRAVIS': 'True'}, clear=True)
 def test_deprecated_verb_flag_with_subcommand_errors() -> None:
     with pytest.raises(SystemExit):
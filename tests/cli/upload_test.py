@@ -1,9 +1,11 @@
 import os
+import pathlib
 from unittest import mock
 
 import pytest
 
 import coveralls.cli
+from tests.api.conftest import stand_in_server
 from tests.cli.conftest import EXAMPLE_DIR
 
 
@@ -12,7 +14,10 @@ from tests.cli.conftest import EXAMPLE_DIR
 def test_upload(mock_submit: mock.MagicMock) -> None:
     json_file = EXAMPLE_DIR / 'example.json'
     coveralls.cli.main(argv=['upload', str(json_file)])
-    mock_submit.assert_called_with(json_file.read_text(encoding='utf-8'))
+    # the saved report is streamed from disk rather than read into memory
+    [report] = mock_submit.call_args.args
+    assert report.name == str(json_file)
+    assert report.mode == 'rb'
 
 
 @mock.patch.object(coveralls.cli.log, 'warning')
@@ -23,7 +28,8 @@ def test_upload_deprecated_submit_warns(
 ) -> None:
     json_file = EXAMPLE_DIR / 'example.json'
     coveralls.cli.main(argv=['--submit=' + str(json_file)])
-    mock_submit.assert_called_with(json_file.read_text(encoding='utf-8'))
+    [report] = mock_submit.call_args.args
+    assert report.name == str(json_file)
     mock_warning.assert_called_once_with(
         '%s is deprecated and will be removed in a future release; use %s '
         'instead.', '--submit', 'coveralls upload FILE',
@@ -49,3 +55,32 @@ def test_deprecated_submit_applies_merge(
 def test_upload_does_not_advertise_merge() -> None:
     with pytest.raises(SystemExit):
         coveralls.cli.main(argv=['upload', 'f', '--merge=extra.json'])
+
+
+@mock.patch.dict(os.environ, {'TRAVIS': 'True'}, clear=True)
+@mock.patch('coveralls.cli.Coveralls')
+def test_upload_compress_args(mock_coveralls: mock.MagicMock) -> None:
+    json_file = EXAMPLE_DIR / 'example.json'
+    coveralls.cli.main(argv=['upload', str(json_file), '--compress'])
+    assert mock_coveralls.call_args.kwargs['compress'] is True
+
+
+@mock.patch.dict(os.environ, {'TRAVIS': 'True'}, clear=True)
+def test_upload_many(tmp_path: pathlib.Path) -> None:
+    for i in range(3):
+        (tmp_path / f'{i}.json').write_text('{"source_files": []}', 'utf-8')
+
+    with stand_in_server(200) as (host, received):
+        coveralls.cli.main(argv=['upload', str(tmp_path), f'--host={host}'])
+    assert len(received) == 3
+
+    with stand_in_server(500) as (host, received):
+        with pytest.raises(SystemExit) as exc:
+            coveralls.cli.main(
+                argv=[
+                    'upload', f'{tmp_path}/*.json', f'--host={host}',
+                    '--jobs=2', '--retries=0',
+                ],
+            )
+    assert exc.value.code == 1
+    assert len(received) == 3
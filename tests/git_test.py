@@ -8,6 +8,7 @@ import pytest
 
 import coveralls.git
 from coveralls.git import run_command
+from coveralls.gitobjects import UnsupportedRepository
 
 
 GIT_COMMIT_MSG = 'first commit'
@@ -179,3 +180,61 @@ class TestGitInfoOverrides:
     def test_gitinfo_github_tag(self) -> None:
         git_info = coveralls.git.git_info()
         assert git_info['git']['branch'] == 'v1.0'
+
+
+@pytest.mark.usefixtures('git_repo')
+class TestGitInfoCommands:
+    @unittest.mock.patch.dict(os.environ, {}, clear=True)
+    def test_gitinfo_spawns_no_git_process(self) -> None:
+        expected = run_command('git', 'rev-parse', '--abbrev-ref', 'HEAD')
+        with unittest.mock.patch(
+            'coveralls.git.subprocess.run',
+            side_effect=AssertionError('spawned git'),
+        ):
+            git_info = coveralls.git.git_info()
+
+        assert git_info['git']['branch'] == expected
+        assert git_info['git']['head']['message'] == GIT_COMMIT_MSG
+        assert git_info['git']['remotes'] == [
+            {'name': GIT_REMOTE, 'url': GIT_URL},
+        ]
+
+    @unittest.mock.patch.dict(os.environ, {}, clear=True)
+    def test_gitinfo_fallback_runs_two_git_commands(self) -> None:
+        native = coveralls.git.git_info()
+        with unittest.mock.patch(
+            'coveralls.git.read_repository',
+            side_effect=UnsupportedRepository('test'),
+        ), unittest.mock.patch(
+            'coveralls.git.subprocess.run', wraps=subprocess.run,
+        ) as run:
+            git_info = coveralls.git.git_info()
+
+        # one `git log` for every head field and the branch, one for remotes
+        assert run.call_count == 2
+        assert git_info == native
+
+    @unittest.mock.patch.dict(os.environ, {}, clear=True)
+    def test_gitinfo_detached_head(self) -> None:
+        subprocess.check_call(['git', 'checkout', '-q', '--detach'])
+        assert coveralls.git.git_info()['git']['branch'] == 'HEAD'
+
+    @unittest.mock.patch.dict(os.environ, {}, clear=True)
+    def test_gitinfo_ignores_excluded_decorations(self) -> None:
+        subprocess.check_call(
+            ['git', 'config', 'log.excludeDecoration', 'refs/heads/*'],
+        )
+        expected = run_command('git', 'rev-parse', '--abbrev-ref', 'HEAD')
+        assert coveralls.git.git_info()['git']['branch'] == expected
+
+    def test_git_head_multiline_message(self) -> None:
+        subprocess.check_call(
+            [
+                'git', 'commit', '-q', '--allow-empty',
+                '-m', 'subject: with, odd -> chars\n\nand a body',
+            ],
+        )
+        head, refs = coveralls.git.git_head()
+        assert head['message'] == 'subject: with, odd -> chars'
+        assert head['author_name'] == GIT_NAME
+        assert refs.startswith('HEAD -> ')
@@ -0,0 +1,234 @@
+import os
+import pathlib
+import subprocess
+import unittest.mock
+from collections.abc import Callable
+
+import pytest
+
+from coveralls.gitdir import GitDir
+from coveralls.gitdir import parse_commit
+from coveralls.gitdir import parse_config
+from coveralls.gitdir import read_repository
+from coveralls.gitobjects import OBJ_COMMIT
+from coveralls.gitobjects import UnsupportedRepository
+
+
+Git = Callable[..., str]
+
+
+@pytest.fixture(name='git')
+def git_fixture(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch,
+) -> Git:
+    # An isolated repository: no global or system config may leak in, for
+    # either git or the native reader.
+    for var in list(os.environ):
+        if var not in {'PATH', 'TMPDIR'}:
+            monkeypatch.delenv(var)
+    monkeypatch.setenv('HOME', str(tmp_path / 'home'))
+    monkeypatch.setenv('GIT_CONFIG_NOSYSTEM', '1')
+    repo = tmp_path / 'repo'
+    repo.mkdir()
+    monkeypatch.chdir(repo)
+
+    def git(*args: str) -> str:
+        env = os.environ | {
+            'GIT_AUTHOR_NAME': 'Daniël Ünïcode',
+            'GIT_AUTHOR_EMAIL': 'author@example.com',
+            'GIT_COMMITTER_NAME': 'Committer',
+            'GIT_COMMITTER_EMAIL': 'committer@example.com',
+        }
+        return subprocess.run(
+            ['git', *args], check=True, capture_output=True, env=env,
+        ).stdout.decode('utf-8').strip()
+
+    git('init', '-q', '-b', 'main')
+    (repo / 'README').write_text('hello\n', encoding='utf-8')
+    git('add', 'README')
+    git('commit', '-q', '-m', 'first commit')
+    git('remote', 'add', 'upstream', 'https://example.com/upstream.git')
+    git('remote', 'add', 'origin', 'git@example.com:me/repo.git')
+    return git
+
+
+def read_with_git(git: Git) -> tuple[object, ...]:
+    fmt = '%x00'.join(('%H', '%aN', '%ae', '%cN', '%ce', '%s'))
+    fields = git('log', '-1', f'--pretty=format:{fmt}').split('\0')
+    head = dict(
+        zip(
+            (
+                'id', 'author_name', 'author_email', 'committer_name',
+                'committer_email', 'message',
+            ),
+            fields,
+        ),
+    )
+    remotes = [
+        {'name': line.split()[0], 'url': line.split()[1]}
+        for line in git('remote', '-v').splitlines() if '(fetch)' in line
+    ]
+    return head, git('rev-parse', '--abbrev-ref', 'HEAD'), remotes
+
+
+def read_natively() -> tuple[object, ...]:
+    with unittest.mock.patch(
+        'subprocess.run', side_effect=AssertionError('spawned a process'),
+    ):
+        return read_repository()
+
+
+def test_loose_objects_match_git(git: Git) -> None:
+    git(
+        'commit', '-q', '--allow-empty', '-m',
+        'multi-line\nsubject line\n\n  body text\n',
+    )
+    assert read_natively() == read_with_git(git)
+
+
+def test_packed_objects_and_refs_match_git(
+        git: Git, tmp_path: pathlib.Path,
+) -> None:
+    git('gc', '-q')
+    dotgit = tmp_path / 'repo' / '.git'
+    assert (dotgit / 'packed-refs').exists()
+    assert not (dotgit / 'refs/heads/main').exists()
+    assert read_natively() == read_with_git(git)
+
+
+def test_detached_head_matches_git(git: Git) -> None:
+    git('commit', '-q', '--allow-empty', '-m', 'second')
+    git('checkout', '-q', 'HEAD~1')
+    head, branch, _ = read_natively()
+    assert branch == 'HEAD'
+    assert (head, branch) == read_with_git(git)[:2]
+
+
+def test_deltified_commits_match_git(
+        git: Git, tmp_path: pathlib.Path,
+) -> None:
+    # Near-identical large commit messages get stored as deltas of each other.
+    body = ''.join(f'line {i} of a repetitive body\n' for i in range(200))
+    for i in range(20):
+        git('commit', '-q', '--allow-empty', '-m', f'commit {i}\n\n{body}')
+    git('repack', '-adfq', '--window=50', '--depth=50')
+    verify = git(
+        'verify-pack', '-v',
+        *map(str, (tmp_path / 'repo/.git/objects/pack').glob('*.idx')),
+    )
+    assert 'chain length' in verify
+
+    repo = GitDir.discover()
+    for sha in git('rev-list', '--all').split():
+        kind, body_ = repo.read_object(sha)
+        assert kind == OBJ_COMMIT
+        assert body_.decode('utf-8') == git('cat-file', 'commit', sha) + '\n'
+    assert read_natively() == read_with_git(git)
+
+
+def test_gpg_signature_header_is_skipped() -> None:
+    body = (
+        b'tree abc\nauthor A <a@x> 1 +0000\ncommitter C <c@x> 1 +0000\n'
+        b'gpgsig -----BEGIN PGP SIGNATURE-----\n \n abc\n'
+        b' -----END PGP SIGNATURE-----\n\nsubject\n\nbody\n'
+    )
+    assert parse_commit(body) == {
+        'author_name': 'A', 'author_email': 'a@x',
+        'committer_name': 'C', 'committer_email': 'c@x',
+        'message': 'subject',
+    }
+
+
+@pytest.mark.parametrize(
+    'setup',
+    [
+        pytest.param(
+            lambda git, repo: (repo / '.mailmap').write_text(
+                'Other <author@example.com>\n', encoding='utf-8',
+            ),
+            id='mailmap',
+        ),
+        pytest.param(
+            lambda git, repo: git(
+                'config', 'url.https://mirror/.insteadOf', 'https://example',
+            ),
+            id='url-rewrite',
+        ),
+        pytest.param(
+            lambda git, repo: git('config', 'include.path', 'other'),
+            id='include',
+        ),
+        pytest.param(
+            lambda git, repo: git('tag', 'main'),
+            id='ambiguous-branch',
+        ),
+        pytest.param(
+            lambda git, repo: (
+                git('commit', '-q', '--allow-empty', '-m', 'second'),
+                git('replace', 'HEAD', 'HEAD~1'),
+            ),
+            id='replace-refs',
+        ),
+    ],
+)
+def test_unsupported_layouts_are_left_to_git(
+        git: Git, tmp_path: pathlib.Path,
+        setup: Callable[[Git, pathlib.Path], object],
+) -> None:
+    setup(git, tmp_path / 'repo')
+    with pytest.raises(UnsupportedRepository):
+        read_repository()
+
+
+def test_git_environment_is_left_to_git(
+        git: Git, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv('GIT_DIR', str(tmp_path / 'repo' / '.git'))
+    with pytest.raises(UnsupportedRepository, match='GIT_DIR'):
+        read_repository()
+    # the fixture's git is still usable with the variable set
+    assert git('rev-parse', '--abbrev-ref', 'HEAD') == 'main'
+
+
+def test_worktree_is_left_to_git(
+        git: Git, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    git('worktree', 'add', '-q', str(tmp_path / 'tree'))
+    monkeypatch.chdir(tmp_path / 'tree')
+    with pytest.raises(UnsupportedRepository, match='worktree'):
+        read_repository()
+
+
+def test_not_a_repository_is_left_to_git(
+        tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(UnsupportedRepository):
+        read_repository()
+
+
+def test_parse_config() -> None:
+    text = '''
+        # comment
+        [core]
+            bare = false
+        [remote "or\\"igin"]  ; comment
+            URL = "https://example.com/a b.git" # trailing
+            mirror
+        [Branch.Main]
+            remote = origin
+    '''
+    assert list(parse_config(text)) == [
+        ('core', None, 'bare', 'false'),
+        ('remote', 'or"igin', 'url', 'https://example.com/a b.git'),
+        ('remote', 'or"igin', 'mirror', 'true'),
+        ('branch', 'main', 'remote', 'origin'),
+    ]
+
+
+@pytest.mark.parametrize(
+    'text', ['[core]\nkey = a \\\n b\n', '[core]\nkey = "open\n', 'key = v\n'],
+)
+def test_parse_config_unsupported(text: str) -> None:
+    with pytest.raises(UnsupportedRepository):
+        list(parse_config(text))